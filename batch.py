@@ -0,0 +1,171 @@
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import pulp
+
+from number_partition_problem import BranchAndBoundNPPTotal
+from quasi_clique_partitioning import BranchAndBoundQCPP
+from portfolio import criterion_2_solvers, criterion_2_evaluator
+from symmetry import SymmetryBreaking
+
+
+name_2_solver = {cls.__name__: cls for solvers in
+                 criterion_2_solvers.values() for cls in solvers}
+
+# run arguments of the default (greedy) solver of a criterion
+criterion_2_default_kwargs = {"mean": {"batched": True},
+                              "density": {"bucketed": True}}
+
+
+# an instance is a dict with "id", "criterion", "number_of_groups",
+# "min_size", "max_size" and "student_2_score" (or "student_2_group" for
+# the density criterion); "solver" and "kwargs" are optional
+def read_jsonl(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_csv(path, criterion="total"):
+    # one row per student: id, student, value, number_of_groups, min_size,
+    # max_size; the rows of an instance are consecutive
+    with open(path, newline="") as f:
+        for instance_id, rows in itertools.groupby(csv.DictReader(f),
+                                                   key=lambda r: r["id"]):
+            rows = list(rows)
+            instance = {"id": instance_id,
+                        "criterion": rows[0].get("criterion") or criterion,
+                        "number_of_groups": int(rows[0]["number_of_groups"]),
+                        "min_size": int(rows[0]["min_size"]),
+                        "max_size": int(rows[0]["max_size"])}
+            if instance["criterion"] == "density":
+                instance["student_2_group"] = {r["student"]: r["value"]
+                                               for r in rows}
+            else:
+                instance["student_2_score"] = {r["student"]: float(r["value"])
+                                               for r in rows}
+            yield instance
+
+
+def read_instances(path, criterion="total"):
+    if path.endswith(".csv"):
+        return read_csv(path, criterion)
+    return read_jsonl(path)
+
+
+def get_data(instance):
+    if "student_2_group" in instance:
+        return instance["student_2_group"]
+    return instance["student_2_score"]
+
+
+def solve_instance(instance, solver=None, ip_kwargs=None,
+                   local_search=False):
+    start = time.perf_counter()
+    criterion = instance.get("criterion", "total")
+    arguments = (get_data(instance), instance["number_of_groups"],
+                 instance["min_size"], instance["max_size"])
+    solver = instance.get("solver") or solver
+    if solver is None:
+        cls = criterion_2_solvers[criterion][0]
+        kwargs = dict(criterion_2_default_kwargs.get(criterion, {}))
+    else:
+        cls = name_2_solver[solver]
+        kwargs = {}
+    if issubclass(cls, SymmetryBreaking):
+        kwargs.update(ip_kwargs or {})
+    elif issubclass(cls, (BranchAndBoundNPPTotal, BranchAndBoundQCPP)) \
+            and ip_kwargs:
+        kwargs["timelimit"] = ip_kwargs["timelimit"]
+    kwargs.update(instance.get("kwargs", {}))
+    result = {"id": instance.get("id")}
+    try:
+        group_2_students = cls(*arguments).run(**kwargs)
+        evaluator = criterion_2_evaluator[criterion](*arguments)
+        if local_search:
+            group_2_students = evaluator.run(group_2_students)
+        else:
+            evaluator.set_partition(group_2_students)
+        result.update(group_2_students=group_2_students,
+                      objective_value=float(evaluator.get_objective_value()))
+    except Exception as error:
+        result["error"] = repr(error)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def redirect_output():
+    # standard output may carry the results, so the solver logs of a worker
+    # (CBC writes to file descriptor 1) go to standard error
+    sys.stdout.flush()
+    os.dup2(2, 1)
+
+
+def solve_instance_star(arguments):
+    return solve_instance(*arguments)
+
+
+def run_batch(instances, output, solver=None, ip_kwargs=None,
+              local_search=False, number_of_workers=None, chunksize=16):
+    # results are written as soon as they arrive, in completion order
+    jobs = ((instance, solver, ip_kwargs, local_search) for instance in
+            instances)
+    number_of_results = 0
+    with multiprocessing.Pool(number_of_workers,
+                              initializer=redirect_output) as pool:
+        for result in pool.imap_unordered(solve_instance_star, jobs,
+                                          chunksize):
+            output.write(json.dumps(result, default=str) + "\n")
+            output.flush()
+            number_of_results += 1
+    return number_of_results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Divide students into groups for many instances.")
+    parser.add_argument("instances", help="JSONL or CSV file of instances")
+    parser.add_argument("-o", "--output", help="JSONL result file "
+                                               "(default: standard output)")
+    parser.add_argument("--criterion", default="total",
+                        choices=list(criterion_2_solvers),
+                        help="criterion of CSV instances")
+    parser.add_argument("--solver", choices=list(name_2_solver),
+                        help="solver for instances without one")
+    parser.add_argument("--local-search", action="store_true",
+                        help="improve each result with local search")
+    parser.add_argument("--timelimit", type=int, default=60,
+                        help="time limit of the IP solvers")
+    parser.add_argument("--ip-solver", default="PULP_CBC_CMD",
+                        help="pulp solver command of the IP solvers")
+    parser.add_argument("--workers", type=int, help="number of processes")
+    parser.add_argument("--chunksize", type=int, default=16,
+                        help="instances sent to a worker at a time")
+    args = parser.parse_args(argv)
+
+    ip_kwargs = {"solver": getattr(pulp, args.ip_solver),
+                 "timelimit": args.timelimit}
+
+    start = time.perf_counter()
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        number_of_results = run_batch(
+            read_instances(args.instances, args.criterion), output,
+            args.solver, ip_kwargs, args.local_search, args.workers,
+            args.chunksize)
+    finally:
+        if args.output:
+            output.close()
+    print(f"{number_of_results} instances in "
+          f"{time.perf_counter() - start:.2f} seconds", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.generators import get_student_2_score, get_student_2_group, \
+    get_size_bounds
+from evaluation import get_evaluator
+from portfolio import criterion_2_evaluator
+
+
+group_size = 25
+number_of_partitions = 1_000
+reference_partitions = 20
+sizes = [1_000, 10_000]
+
+
+def get_instance(number_of_students, criterion, seed=0):
+    number_of_groups = max(2, number_of_students // group_size)
+    data = get_student_2_group(number_of_students, "uniform", seed) \
+        if criterion == "density" \
+        else get_student_2_score(number_of_students, "normal", seed)
+    return (data, number_of_groups,
+            *get_size_bounds(number_of_students, number_of_groups))
+
+
+def measure(number_of_students, criterion):
+    # seconds per partition, one by one with the local search evaluator
+    # and in a single batch
+    instance = get_instance(number_of_students, criterion)
+    evaluator = get_evaluator(*instance, criterion)
+    rng = np.random.default_rng(0)
+    labels = rng.integers(0, instance[1],
+                          (number_of_partitions, number_of_students))
+
+    start = time.perf_counter()
+    for partition_labels in labels[:reference_partitions]:
+        reference = criterion_2_evaluator[criterion](*instance)
+        reference.set_partition(evaluator.table.get_group_2_students(
+            partition_labels, instance[1]))
+        reference.get_objective_value()
+    reference_seconds = (time.perf_counter() - start) / reference_partitions
+
+    start = time.perf_counter()
+    evaluator.get_objective_values(evaluator.get_labels(labels), criterion)
+    seconds = (time.perf_counter() - start) / number_of_partitions
+    return reference_seconds, seconds
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sizes = [int(n) for n in sys.argv[1:]]
+
+    print("n", "criterion", "reference_ms", "batch_ms", sep="\t")
+    for n in sizes:
+        for criterion in criterion_2_evaluator:
+            reference_seconds, seconds = measure(n, criterion)
+            print(n, criterion, round(1000 * reference_seconds, 3),
+                  round(1000 * seconds, 3), sep="\t")
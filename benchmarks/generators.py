@@ -0,0 +1,67 @@
+import numpy as np
+
+
+# score distributions: the normal one of main.py, a right-skewed lognormal
+# and a heavy-tailed Pareto, all rounded and at least 1 so that Gini indices
+# are defined
+def get_normal_scores(number_of_students, rng):
+    return np.round(rng.normal(loc=1500,
+                               scale=1000,
+                               size=number_of_students)).clip(1)
+
+
+def get_skewed_scores(number_of_students, rng):
+    return np.round(rng.lognormal(mean=7,
+                                  sigma=0.6,
+                                  size=number_of_students)).clip(1)
+
+
+def get_heavy_tailed_scores(number_of_students, rng):
+    return np.round(500 * (1 + rng.pareto(a=1.5,
+                                          size=number_of_students))).clip(1)
+
+
+# cohort layouts: uniform labels as in main.py, and a few large cohorts
+# with a long tail of small ones
+def get_uniform_cohorts(number_of_students, rng):
+    return rng.integers(low=0,
+                        high=max(1, number_of_students // 4),
+                        size=number_of_students)
+
+
+def get_clustered_cohorts(number_of_students, rng):
+    return rng.zipf(a=1.6, size=number_of_students) \
+        % max(1, number_of_students // 2)
+
+
+score_distributions = {
+    "normal": get_normal_scores,
+    "skewed": get_skewed_scores,
+    "heavy_tailed": get_heavy_tailed_scores,
+}
+
+cohort_layouts = {
+    "uniform": get_uniform_cohorts,
+    "clustered": get_clustered_cohorts,
+}
+
+
+def get_student_2_score(number_of_students, distribution="normal", seed=0):
+    rng = np.random.default_rng(seed)
+    scores = score_distributions[distribution](number_of_students, rng)
+    return dict(zip(range(number_of_students), scores.tolist()))
+
+
+def get_student_2_group(number_of_students, layout="uniform", seed=0):
+    rng = np.random.default_rng(seed)
+    cohorts = cohort_layouts[layout](number_of_students, rng)
+    return dict(zip(range(number_of_students), cohorts.tolist()))
+
+
+def get_size_bounds(number_of_students, number_of_groups, slack=1):
+    # sizes around the even split; slack=None leaves them free
+    if slack is None:
+        return 1, number_of_students
+    size = number_of_students // number_of_groups
+    return max(1, size - slack), -(-number_of_students // number_of_groups) \
+        + slack
@@ -0,0 +1,59 @@
+import sys
+import time
+
+import numpy as np
+import pulp
+
+from gini import GiniMinimization, CompactGiniMinimization
+
+
+timelimit = 60
+instances = [(8, 2, 3, 5),
+             (12, 3, 3, 5),
+             (20, 4, 4, 6),
+             (60, 6, 8, 12)]
+
+
+def get_student_2_score(number_of_students, seed=0):
+    rng = np.random.default_rng(seed)
+    return dict(zip(range(number_of_students),
+                    np.round(rng.normal(loc=1500,
+                                        scale=500,
+                                        size=number_of_students)).clip(1)))
+
+
+def measure(cls, number_of_students, number_of_groups, min_size, max_size):
+    gini_min = cls(get_student_2_score(number_of_students),
+                   number_of_groups,
+                   min_size,
+                   max_size)
+
+    start = time.perf_counter()
+    gini_min.create_model()
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    gini_min.model.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=timelimit))
+    solve = time.perf_counter() - start
+
+    return (build,
+            gini_min.model.numVariables(),
+            gini_min.model.numConstraints(),
+            solve,
+            pulp.LpStatus[gini_min.model.status],
+            gini_min.model.objective.value())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        timelimit = int(sys.argv[1])
+
+    print("n", "k", "model", "build_s", "vars", "cons", "solve_s", "status",
+          "gamma", sep="\t")
+    for instance in instances:
+        for cls in (GiniMinimization, CompactGiniMinimization):
+            build, variables, constraints, solve, status, gamma = \
+                measure(cls, *instance)
+            print(instance[0], instance[1], cls.__name__, round(build, 3),
+                  variables, constraints, round(solve, 3), status,
+                  gamma if gamma is None else round(gamma, 6), sep="\t")
@@ -0,0 +1,41 @@
+import sys
+import time
+
+from benchmarks.generators import get_student_2_group, get_size_bounds
+from quasi_clique_partitioning import GreedyQCPP
+
+
+group_size = 25
+reference_sizes = [1_000, 5_000]
+bucketed_sizes = [1_000, 5_000, 20_000, 100_000]
+
+
+def get_instance(number_of_students, layout="uniform", seed=0):
+    number_of_groups = max(2, number_of_students // group_size)
+    return (get_student_2_group(number_of_students, layout, seed),
+            number_of_groups,
+            *get_size_bounds(number_of_students, number_of_groups))
+
+
+def measure(number_of_students, layout, bucketed):
+    instance = get_instance(number_of_students, layout)
+    greedy = GreedyQCPP(*instance)
+    start = time.perf_counter()
+    group_2_students = greedy.run(bucketed=bucketed)
+    seconds = time.perf_counter() - start
+    return seconds, min(greedy.get_density(students)
+                        for students in group_2_students.values())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        bucketed_sizes = [int(n) for n in sys.argv[1:]]
+
+    print("n", "layout", "mode", "seconds", "min_density", sep="\t")
+    for n in bucketed_sizes:
+        for layout in ("uniform", "clustered"):
+            if n in reference_sizes:
+                seconds, of = measure(n, layout, bucketed=False)
+                print(n, layout, "scan", round(seconds, 3), of, sep="\t")
+            seconds, of = measure(n, layout, bucketed=True)
+            print(n, layout, "bucketed", round(seconds, 3), of, sep="\t")
@@ -0,0 +1,51 @@
+import sys
+import time
+
+import pulp
+
+from benchmarks.generators import get_student_2_score, get_student_2_group, \
+    get_size_bounds
+from lns import LargeNeighbourhoodSearch, criterion_2_lns
+from portfolio import criterion_2_evaluator
+
+
+group_size = 25
+timelimit = 60
+sub_timelimit = 5
+sizes = [500, 2_000]
+
+
+def get_instance(number_of_students, criterion, seed=0):
+    number_of_groups = max(2, number_of_students // group_size)
+    data = get_student_2_group(number_of_students, "uniform", seed) \
+        if criterion == "density" \
+        else get_student_2_score(number_of_students, "normal", seed)
+    return (data, number_of_groups,
+            *get_size_bounds(number_of_students, number_of_groups))
+
+
+def measure(number_of_students, criterion):
+    instance = get_instance(number_of_students, criterion)
+    cls, kwargs, _ = criterion_2_lns[criterion]
+    evaluator = criterion_2_evaluator[criterion](*instance)
+    evaluator.set_partition(cls(*instance).run(**kwargs))
+    greedy_of = evaluator.get_objective_value()
+
+    lns = LargeNeighbourhoodSearch(*instance, criterion)
+    start = time.perf_counter()
+    lns.run(pulp.PULP_CBC_CMD, timelimit, sub_timelimit)
+    return (time.perf_counter() - start, greedy_of, lns.objective_value,
+            lns.metrics.counts.get("number_of_improvements", 0))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sizes = [int(n) for n in sys.argv[1:]]
+
+    print("n", "criterion", "seconds", "greedy_of", "lns_of", "improvements",
+          sep="\t")
+    for n in sizes:
+        for criterion in criterion_2_lns:
+            seconds, greedy_of, lns_of, improvements = measure(n, criterion)
+            print(n, criterion, round(seconds, 1), greedy_of, lns_of,
+                  improvements, sep="\t")
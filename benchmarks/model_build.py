@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from number_partition_problem import NPPIPTotal, NPPIPMean
+from quasi_clique_partitioning import QCPPIP, CohortQCPPIP
+from gini import GiniMinimization, CompactGiniMinimization
+
+
+number_of_students = 60
+
+
+def get_instances(n, seed=0):
+    rng = np.random.default_rng(seed)
+    student_2_score = dict(zip(range(n),
+                               np.round(rng.normal(loc=1500,
+                                                   scale=1000,
+                                                   size=n)).clip(1)))
+    student_2_group = dict(zip(range(n), rng.integers(low=0, high=n // 4,
+                                                      size=n)))
+    number_of_groups = n // 5
+    return [(cls, data, number_of_groups, 4, 6) for cls, data in
+            [(NPPIPTotal, student_2_score),
+             (NPPIPMean, student_2_score),
+             (QCPPIP, student_2_group),
+             (CohortQCPPIP, student_2_group),
+             (GiniMinimization, student_2_score),
+             (CompactGiniMinimization, student_2_score)]]
+
+
+def measure(cls, data, number_of_groups, min_size, max_size, directory):
+    # build and write the same model with both backends
+    ip = cls(data, number_of_groups, min_size, max_size)
+    start = time.perf_counter()
+    ip.create_model()
+    ip.model.writeMPS(os.path.join(directory, "pulp.mps"))
+    pulp_seconds = time.perf_counter() - start
+
+    ip = cls(data, number_of_groups, min_size, max_size)
+    start = time.perf_counter()
+    ip.create_sparse_model()
+    ip.sparse_model.write_mps(os.path.join(directory, "sparse.mps"))
+    sparse_seconds = time.perf_counter() - start
+
+    return (pulp_seconds, sparse_seconds, ip.sparse_model.number_of_vars,
+            ip.sparse_model.get_number_of_nonzeros())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        number_of_students = int(sys.argv[1])
+
+    print("model", "students", "variables", "nonzeros", "pulp seconds",
+          "sparse seconds", sep="\t")
+    with tempfile.TemporaryDirectory() as directory:
+        for cls, *instance in get_instances(number_of_students):
+            pulp_seconds, sparse_seconds, number_of_vars, nonzeros = \
+                measure(cls, *instance, directory)
+            print(cls.__name__, number_of_students, number_of_vars,
+                  nonzeros, round(pulp_seconds, 3), round(sparse_seconds, 3),
+                  sep="\t")
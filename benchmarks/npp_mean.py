@@ -0,0 +1,41 @@
+import sys
+import time
+
+import numpy as np
+
+from number_partition_problem import GreedyNPPMean
+
+
+number_of_groups = 10
+reference_sizes = [50, 100, 200]
+batched_sizes = [50, 100, 200, 1_000, 10_000]
+
+
+def get_instance(number_of_students, seed=0):
+    rng = np.random.default_rng(seed)
+    student_2_score = dict(zip(range(number_of_students),
+                               np.round(rng.normal(loc=1500,
+                                                   scale=1000,
+                                                   size=number_of_students))))
+    size = number_of_students // number_of_groups
+    return student_2_score, number_of_groups, size - 1, size + 1
+
+
+def measure(number_of_students, batched):
+    greedy = GreedyNPPMean(*get_instance(number_of_students))
+    start = time.perf_counter()
+    greedy.run(batched=batched)
+    return time.perf_counter() - start, min(greedy.group_2_mean_score.values())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        batched_sizes = [int(n) for n in sys.argv[1:]]
+
+    print("n", "mode", "seconds", "min_mean", sep="\t")
+    for n in batched_sizes:
+        if n in reference_sizes:
+            seconds, of = measure(n, batched=False)
+            print(n, "loop", round(seconds, 3), of, sep="\t")
+        seconds, of = measure(n, batched=True)
+        print(n, "batched", round(seconds, 3), of, sep="\t")
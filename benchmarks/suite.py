@@ -0,0 +1,211 @@
+import argparse
+import concurrent.futures
+import itertools
+import json
+import os
+import sys
+import time
+
+import pulp
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from benchmarks.generators import score_distributions, cohort_layouts, \
+    get_student_2_score, get_student_2_group, get_size_bounds
+from number_partition_problem import BranchAndBoundNPPTotal
+from portfolio import criterion_2_solvers, criterion_2_evaluator, is_optimal
+from quasi_clique_partitioning import BranchAndBoundQCPP
+from symmetry import SymmetryBreaking
+
+
+number_of_students = [20, 50, 100, 200]
+group_sizes = [5, 10]
+slacks = [1, 3]
+seeds = [0]
+timelimit = 10
+
+# larger instances are skipped, the models or the original greedy scans
+# grow too fast
+solver_2_max_students = {
+    "NPPIPTotal": 50,
+    "NPPIPMean": 50,
+    "QCPPIP": 50,
+    "CohortQCPPIP": 100,
+    "GiniMinimization": 20,
+    "CompactGiniMinimization": 50,
+    "ParametricGiniMinimization": 50,
+}
+
+configuration_keys = ["solver", "distribution", "seed", "students", "groups",
+                      "min_size", "max_size"]
+
+
+def get_configurations(sizes, instance_seeds):
+    for criterion, solvers in criterion_2_solvers.items():
+        distributions = cohort_layouts if criterion == "density" \
+            else score_distributions
+        for cls, distribution, n, size, slack, seed in itertools.product(
+                solvers, distributions, sizes, group_sizes, slacks,
+                instance_seeds):
+            if n > solver_2_max_students.get(cls.__name__, n) \
+                    or n // size < 2:
+                continue
+            min_size, max_size = get_size_bounds(n, n // size, slack)
+            yield {"solver": cls.__name__, "criterion": criterion,
+                   "distribution": distribution, "seed": seed,
+                   "students": n, "groups": n // size,
+                   "min_size": min_size, "max_size": max_size}
+
+
+def get_peak_memory():
+    # kilobytes on Linux
+    if resource is None:
+        return None, None
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def get_model_size(solver):
+    model = getattr(solver, "model", None)
+    if not isinstance(model, pulp.LpProblem):
+        return None, None, None
+    return (len(model.variables()), len(model.constraints),
+            sum(len(constraint) for constraint in model.constraints.values()))
+
+
+def measure(configuration):
+    # runs in its own process: the solvers' output is silenced and the
+    # memory peak belongs to this run alone
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+
+    record = dict(configuration)
+    if configuration["criterion"] == "density":
+        data = get_student_2_group(configuration["students"],
+                                   configuration["distribution"],
+                                   configuration["seed"])
+    else:
+        data = get_student_2_score(configuration["students"],
+                                   configuration["distribution"],
+                                   configuration["seed"])
+    instance = (data, configuration["groups"], configuration["min_size"],
+                configuration["max_size"])
+    cls = next(cls for solvers in criterion_2_solvers.values()
+               for cls in solvers if cls.__name__ == configuration["solver"])
+    kwargs = {}
+    if issubclass(cls, SymmetryBreaking):
+        kwargs = {"solver": pulp.PULP_CBC_CMD, "timelimit": timelimit}
+    elif issubclass(cls, (BranchAndBoundNPPTotal, BranchAndBoundQCPP)):
+        kwargs = {"timelimit": timelimit}
+
+    baseline, _ = get_peak_memory()
+    start = time.perf_counter()
+    try:
+        solver = cls(*instance)
+        group_2_students = solver.run(**kwargs)
+    except Exception as error:
+        record.update(seconds=time.perf_counter() - start,
+                      error=repr(error))
+        return record
+    record["seconds"] = time.perf_counter() - start
+
+    peak, children_peak = get_peak_memory()
+    record["peak_memory_kb"] = None if peak is None else peak - baseline
+    record["solver_memory_kb"] = children_peak or None
+    record["variables"], record["constraints"], record["nonzeros"] = \
+        get_model_size(solver)
+
+    evaluator = criterion_2_evaluator[configuration["criterion"]](*instance)
+    evaluator.set_partition(group_2_students)
+    record["objective_value"] = float(evaluator.get_objective_value())
+    record["optimal"] = is_optimal(solver)
+    return record
+
+
+def get_regressions(record, baseline, slowdown):
+    # slower by more than the given factor (ignoring runs under 50 ms) or
+    # a worse objective value
+    regressions = []
+    if record.get("error") and not baseline.get("error"):
+        regressions.append("error")
+    if baseline.get("seconds", 0) > 0.05 \
+            and record["seconds"] > slowdown * baseline["seconds"]:
+        regressions.append("slower")
+    if record.get("objective_value") is not None \
+            and baseline.get("objective_value") is not None:
+        sense = criterion_2_evaluator[record["criterion"]].sense
+        if sense * record["objective_value"] \
+                < sense * baseline["objective_value"] - 1e-9:
+            regressions.append("worse")
+    return regressions
+
+
+def get_configuration_key(record):
+    return tuple(record[key] for key in configuration_keys)
+
+
+def set_timelimit(ip_timelimit):
+    global timelimit
+    timelimit = ip_timelimit
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Sweep every solver over generated instances.")
+    parser.add_argument("-o", "--output", help="JSONL result file "
+                                               "(default: standard output)")
+    parser.add_argument("--students", type=int, nargs="+",
+                        default=number_of_students)
+    parser.add_argument("--seeds", type=int, nargs="+", default=seeds)
+    parser.add_argument("--solvers", nargs="+",
+                        help="solver class names (default: all)")
+    parser.add_argument("--timelimit", type=int, default=timelimit,
+                        help="time limit of the IP solvers")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="parallel runs; more than one skews timings")
+    parser.add_argument("--baseline", help="earlier result file to compare "
+                                           "against")
+    parser.add_argument("--slowdown", type=float, default=1.5,
+                        help="slowdown factor counted as a regression")
+    args = parser.parse_args(argv)
+
+    baselines = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            for line in f:
+                record = json.loads(line)
+                baselines[get_configuration_key(record)] = record
+
+    configurations = [configuration for configuration in
+                      get_configurations(args.students, args.seeds)
+                      if args.solvers is None
+                      or configuration["solver"] in args.solvers]
+    output = open(args.output, "w") if args.output else sys.stdout
+    number_of_regressions = 0
+    # one process per run, so that the memory peaks do not accumulate
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=args.workers, max_tasks_per_child=1,
+            initializer=set_timelimit,
+            initargs=(args.timelimit,)) as executor:
+        for record in executor.map(measure, configurations):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            baseline = baselines.get(get_configuration_key(record))
+            if baseline is None:
+                continue
+            regressions = get_regressions(record, baseline, args.slowdown)
+            if regressions:
+                number_of_regressions += 1
+                print(" ".join(str(record[key]) for key in
+                               configuration_keys), ",".join(regressions),
+                      file=sys.stderr)
+    if args.output:
+        output.close()
+    return 1 if number_of_regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import sys
+import time
+
+import numpy as np
+import pulp
+
+from number_partition_problem import NPPIPTotal, NPPIPMean
+from quasi_clique_partitioning import QCPPIP
+from gini import GiniMinimization
+
+
+timelimit = 120
+symmetry_breakings = [None, "size", "total", "fix", "orbitope"]
+
+
+def get_instances(seed=0):
+    rng = np.random.default_rng(seed)
+    student_2_score = dict(zip(range(14),
+                               np.round(rng.normal(loc=1500,
+                                                   scale=1000,
+                                                   size=14)).clip(1)))
+    student_2_group = dict(zip(range(14), rng.integers(low=0, high=5,
+                                                       size=14)))
+    return [(NPPIPTotal, student_2_score, 4, 2, 5),
+            (NPPIPMean, student_2_score, 4, 2, 5),
+            (QCPPIP, student_2_group, 4, 2, 5),
+            (GiniMinimization, dict(list(student_2_score.items())[:9]),
+             3, 2, 4)]
+
+
+def measure(cls, data, number_of_groups, min_size, max_size,
+            symmetry_breaking):
+    ip = cls(data, number_of_groups, min_size, max_size)
+    ip.create_model()
+    if symmetry_breaking is not None:
+        ip.create_symmetry_con(symmetry_breaking)
+
+    start = time.perf_counter()
+    ip.model.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=timelimit))
+    return (time.perf_counter() - start,
+            pulp.LpStatus[ip.model.status],
+            ip.model.objective.value())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        timelimit = int(sys.argv[1])
+
+    print("model", "symmetry", "seconds", "status", "objective", sep="\t")
+    for cls, *instance in get_instances():
+        for symmetry_breaking in symmetry_breakings:
+            if symmetry_breaking is not None \
+                    and symmetry_breaking not in cls.symmetry_breakings:
+                continue
+            seconds, status, objective = measure(cls, *instance,
+                                                 symmetry_breaking)
+            print(cls.__name__, symmetry_breaking, round(seconds, 2), status,
+                  round(objective, 6), sep="\t")
@@ -0,0 +1,84 @@
+from heapq import heapify, heapreplace
+
+import numpy as np
+
+
+class ScoreBounds:
+    # extreme values over all groups of a given size, read off the sorted
+    # scores; the IP models take their big-M constants from them
+    def __init__(self, scores, min_size, max_size):
+        self.scores = np.sort(np.fromiter(scores, dtype=float))
+        self.sizes = range(min_size, max_size + 1)
+        self.prefix = np.concatenate(([0], np.cumsum(self.scores)))
+
+    def get_size(self, size):
+        return min(size, len(self.scores))
+
+    def get_lowest_total(self, size):
+        return float(self.prefix[self.get_size(size)])
+
+    def get_highest_total(self, size):
+        return float(self.prefix[-1]
+                     - self.prefix[len(self.scores) - self.get_size(size)])
+
+    def get_mean(self):
+        # the smallest group mean is at most the mean of all scores
+        return float(self.prefix[-1] / max(len(self.scores), 1))
+
+    def get_max_difference_sum(self, size):
+        # sum of |r - r'| over the unordered pairs of a group: the student of
+        # rank i counts 2 * i - size - 1 times, so the lower half is taken
+        # from the smallest scores and the upper half from the largest
+        size = self.get_size(size)
+        values = np.concatenate((
+            self.scores[:size // 2],
+            self.scores[len(self.scores) - (size - size // 2):]))
+        return float(np.dot(2 * np.arange(1, size + 1) - size - 1, values))
+
+    def get_max_gini(self):
+        # |r - r'| <= r + r' for non-negative scores, so a group of size m
+        # has a Gini index of at most (m - 1) / m
+        if len(self.scores) == 0 or self.scores[0] < 0:
+            return None
+        size = self.get_size(self.sizes[-1])
+        return (size - 1) / size if size else 0
+
+
+class CohortBounds:
+    # same-cohort pair counts over all groups of a given size
+    def __init__(self, cohort_sizes, min_size, max_size):
+        self.cohort_sizes = sorted(cohort_sizes, reverse=True)
+        self.sizes = range(min_size, max_size + 1)
+
+    @staticmethod
+    def get_max_pairs(size):
+        return size * (size - 1) / 2
+
+    def get_most_pairs(self, size):
+        # the largest cohorts first
+        pairs = 0
+        for cohort_size in self.cohort_sizes:
+            count = min(cohort_size, size)
+            pairs += count * (count - 1) // 2
+            size -= count
+        return pairs
+
+    def get_fewest_pairs(self, size):
+        # every student joins the cohort with the fewest members in the
+        # group and adds a pair with each of them
+        pairs = 0
+        heap = [(0, cohort_size) for cohort_size in self.cohort_sizes]
+        heapify(heap)
+        for _ in range(min(size, sum(self.cohort_sizes))):
+            count, cohort_size = heap[0]
+            pairs += count
+            heapreplace(heap, (count + 1, cohort_size) if count + 1
+                        < cohort_size else (float("inf"), cohort_size))
+        return pairs
+
+    def get_max_density(self):
+        # groups of one student have density 1 and no pairs to bound gamma
+        if self.sizes[0] <= 1:
+            return 1
+        return min(1, max(self.get_most_pairs(size) / self.get_max_pairs(size)
+                          for size in self.sizes))
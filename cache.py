@@ -0,0 +1,164 @@
+import hashlib
+import inspect
+import json
+import sqlite3
+import time
+
+from portfolio import criterion_2_solvers, criterion_2_evaluator, is_optimal
+
+
+solver_2_criterion = {cls: criterion for criterion, solvers in
+                      criterion_2_solvers.items() for cls in solvers}
+
+# run arguments that change how fast a solution is found, but not which
+# instance is solved
+ignored_kwargs = {"solver", "timelimit", "symmetry_breaking",
+                  "initial_partition", "backend", "node_limit",
+                  "max_iterations"}
+
+
+def get_data(solver):
+    if hasattr(solver, "student_2_score"):
+        return solver.student_2_score
+    return solver.student_2_group
+
+
+def get_canonical_students(solver):
+    # students in canonical order with the values that define the instance:
+    # sorted scores, or students cohort by cohort with cohorts by size
+    if hasattr(solver, "student_2_score"):
+        students = sorted(solver.student_2_score,
+                          key=lambda s: solver.student_2_score[s])
+        return students, [float(solver.student_2_score[s])
+                          for s in students]
+    cohort_2_students = {}
+    for s, c in get_data(solver).items():
+        cohort_2_students.setdefault(c, []).append(s)
+    cohorts = sorted(cohort_2_students.values(), key=len, reverse=True)
+    return ([s for cohort in cohorts for s in cohort],
+            [len(cohort) for cohort in cohorts])
+
+
+def get_timelimit(solver, kwargs):
+    if "timelimit" in kwargs:
+        return kwargs["timelimit"]
+    parameter = inspect.signature(solver.run).parameters.get("timelimit")
+    return None if parameter is None else parameter.default
+
+
+class SolutionCache:
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.number_of_hits = 0
+        self.number_of_misses = 0
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS solutions ("
+                                "key TEXT PRIMARY KEY, "
+                                "labels TEXT NOT NULL, "
+                                "objective_value REAL, "
+                                "optimal INTEGER NOT NULL, "
+                                "timelimit REAL, "
+                                "seconds REAL, "
+                                "size INTEGER NOT NULL, "
+                                "last_used REAL NOT NULL)")
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def get_key(self, solver, values, kwargs):
+        instance = {"solver": type(solver).__name__,
+                    "criterion": solver_2_criterion.get(type(solver)),
+                    "values": values,
+                    "number_of_groups": solver.number_of_groups,
+                    "min_size": solver.min_size,
+                    "max_size": solver.max_size,
+                    "kwargs": {key: repr(value) for key, value in
+                               kwargs.items() if key not in ignored_kwargs}}
+        return hashlib.sha256(json.dumps(instance, sort_keys=True)
+                              .encode()).hexdigest()
+
+    def get(self, key, timelimit):
+        # an entry serves a request if it is optimal, or was solved with at
+        # least as much time
+        row = self.connection.execute(
+            "SELECT labels, optimal, timelimit FROM solutions WHERE key = ?",
+            (key,)).fetchone()
+        if row is None:
+            return None
+        labels, optimal, entry_timelimit = row
+        if not optimal and timelimit is not None \
+                and (entry_timelimit is None or entry_timelimit < timelimit):
+            return None
+        self.connection.execute(
+            "UPDATE solutions SET last_used = ? WHERE key = ?",
+            (time.time(), key))
+        self.connection.commit()
+        return json.loads(labels)
+
+    def put(self, key, labels, objective_value, optimal, timelimit, seconds):
+        # keep the existing entry if it is optimal and the new one is not,
+        # or if it had more time
+        row = self.connection.execute(
+            "SELECT optimal, timelimit FROM solutions WHERE key = ?",
+            (key,)).fetchone()
+        if row is not None and (row[0], float("inf") if row[1] is None
+                                else row[1]) \
+                > (optimal, float("inf") if timelimit is None else timelimit):
+            return
+        labels = json.dumps(labels)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, labels, objective_value, int(optimal), timelimit, seconds,
+             len(labels), time.time()))
+        self.evict()
+        self.connection.commit()
+
+    def evict(self):
+        # least recently used entries go first
+        size, = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM solutions").fetchone()
+        for key, entry_size in self.connection.execute(
+                "SELECT key, size FROM solutions ORDER BY last_used"
+        ).fetchall():
+            if size <= self.max_bytes:
+                break
+            self.connection.execute("DELETE FROM solutions WHERE key = ?",
+                                    (key,))
+            size -= entry_size
+
+    def run(self, algorithm, **kwargs):
+        # algorithm is a constructed solver, kwargs are its run arguments
+        students, values = get_canonical_students(algorithm)
+        key = self.get_key(algorithm, values, kwargs)
+        timelimit = get_timelimit(algorithm, kwargs)
+
+        labels = self.get(key, timelimit)
+        if labels is not None:
+            self.number_of_hits += 1
+            algorithm.group_2_students = {
+                g: [] for g in range(algorithm.number_of_groups)}
+            for s, g in zip(students, labels):
+                algorithm.group_2_students[g].append(s)
+            return algorithm.group_2_students
+
+        self.number_of_misses += 1
+        start = time.perf_counter()
+        group_2_students = algorithm.run(**kwargs)
+        seconds = time.perf_counter() - start
+
+        student_2_label = {s: g for g, group in group_2_students.items()
+                           for s in group}
+        objective_value = None
+        criterion = solver_2_criterion.get(type(algorithm))
+        if criterion is not None:
+            evaluator = criterion_2_evaluator[criterion](
+                get_data(algorithm), algorithm.number_of_groups,
+                algorithm.min_size, algorithm.max_size)
+            evaluator.set_partition(group_2_students)
+            objective_value = float(evaluator.get_objective_value())
+        self.put(key, [int(student_2_label[s]) for s in students],
+                 objective_value, is_optimal(algorithm), timelimit, seconds)
+        return group_2_students
@@ -0,0 +1,152 @@
+import numpy as np
+
+from student_table import StudentTable
+
+
+class PartitionEvaluator:
+    # group metrics of many partitions of one instance at once; labels are
+    # the int arrays of StudentTable, one row per partition, and every
+    # metric is an array with one row per partition and one column per group
+    def __init__(self,
+                 table,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 ):
+        self.table = table
+        self.number_of_groups = number_of_groups
+        self.min_size = min_size
+        self.max_size = max_size
+
+        if table.scores is not None:
+            # students by score, so that a stable sort by group keeps the
+            # scores of every group sorted
+            self.score_order = np.argsort(table.scores, kind="stable")
+            self.sorted_scores = table.scores[self.score_order]
+
+    def get_labels(self, partitions):
+        # a label array, a stack of them, or group_2_students dicts
+        if isinstance(partitions, dict):
+            partitions = [partitions]
+        if isinstance(partitions, (list, tuple)) \
+                and any(isinstance(p, dict) for p in partitions):
+            partitions = [self.table.get_labels(p) if isinstance(p, dict)
+                          else p for p in partitions]
+        labels = np.atleast_2d(np.asarray(partitions, dtype=np.int64))
+        if labels.shape[1] != len(self.table):
+            raise ValueError(f"expected {len(self.table)} labels per "
+                             f"partition, got {labels.shape[1]}")
+        if np.any(labels < 0) or np.any(labels >= self.number_of_groups):
+            raise ValueError("every student needs a group label in "
+                             f"0, ..., {self.number_of_groups - 1}")
+        return labels
+
+    def get_keys(self, labels):
+        # one key per (partition, group), for bincount
+        return labels + self.number_of_groups \
+            * np.arange(len(labels))[:, None]
+
+    def reduce(self, keys, weights=None):
+        return np.bincount(keys.ravel(), weights=None if weights is None
+                           else weights.ravel(),
+                           minlength=len(keys) * self.number_of_groups
+                           ).reshape(len(keys), self.number_of_groups)
+
+    def get_sizes(self, labels):
+        return self.reduce(self.get_keys(labels))
+
+    def get_totals(self, labels):
+        return self.reduce(self.get_keys(labels),
+                           np.broadcast_to(self.table.scores, labels.shape))
+
+    def get_means(self, labels):
+        # an empty group has no mean and is the worst of all
+        sizes = self.get_sizes(labels)
+        return np.where(sizes > 0, self.get_totals(labels)
+                        / np.maximum(sizes, 1), -np.inf)
+
+    def get_gini_indices(self, labels):
+        # the student of rank i in a sorted group of size m adds
+        # (2 * i - m - 1) * score to the sum of |r - r'| over its unordered
+        # pairs, so a stable sort by group replaces the pairwise sum
+        labels = labels[:, self.score_order]
+        # numpy radix sorts small integers
+        order = np.argsort(labels.astype(np.int16) if self.number_of_groups
+                           <= np.iinfo(np.int16).max else labels,
+                           axis=1, kind="stable")
+        keys = self.get_keys(np.take_along_axis(labels, order, axis=1)
+                             ).ravel()
+        scores = self.sorted_scores[order].ravel()
+        sizes = np.bincount(keys, minlength=len(labels)
+                            * self.number_of_groups)
+        starts = np.cumsum(sizes) - sizes
+        ranks = np.arange(len(keys)) - starts[keys] + 1
+        difference_sums = np.bincount(
+            keys, weights=(2 * ranks - sizes[keys] - 1) * scores,
+            minlength=len(sizes))
+        totals = np.bincount(keys, weights=scores, minlength=len(sizes))
+        # an empty group has a Gini index of 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gini_indices = np.where(sizes > 0, difference_sums
+                                    / (sizes * totals), 0)
+        return gini_indices.reshape(len(labels), self.number_of_groups)
+
+    def get_number_of_pairs(self, labels):
+        # same-cohort pairs per group, from the member counts of every
+        # (partition, group, cohort) present
+        number_of_cohorts = len(self.table.cohort_labels)
+        keys, counts = np.unique((self.get_keys(labels) * number_of_cohorts
+                                  + self.table.cohorts).ravel(),
+                                 return_counts=True)
+        return np.bincount(keys // number_of_cohorts,
+                           weights=counts * (counts - 1) // 2,
+                           minlength=len(labels) * self.number_of_groups
+                           ).reshape(len(labels), self.number_of_groups)
+
+    def get_densities(self, labels):
+        # groups of at most one student have density 1
+        sizes = self.get_sizes(labels)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(sizes > 1, 2 * self.get_number_of_pairs(labels)
+                            / (sizes * (sizes - 1)), 1)
+
+    def get_objective_values(self, labels, criterion):
+        # the objective of the criterion as the local search evaluators
+        # report it
+        if criterion == "total":
+            return self.get_totals(labels).min(axis=1)
+        if criterion == "mean":
+            return self.get_means(labels).min(axis=1)
+        if criterion == "gini":
+            return self.get_gini_indices(labels).max(axis=1)
+        if criterion == "density":
+            return self.get_densities(labels).min(axis=1)
+        raise ValueError(f"unknown criterion {criterion!r}")
+
+    def is_feasible(self, labels):
+        sizes = self.get_sizes(labels)
+        return np.all((sizes >= self.min_size) & (sizes <= self.max_size),
+                      axis=1)
+
+    def evaluate(self, partitions):
+        labels = self.get_labels(partitions)
+        metrics = {"sizes": self.get_sizes(labels),
+                   "feasible": self.is_feasible(labels)}
+        if self.table.scores is not None:
+            metrics["totals"] = self.get_totals(labels)
+            metrics["means"] = self.get_means(labels)
+            metrics["gini_indices"] = self.get_gini_indices(labels)
+        if self.table.cohorts is not None:
+            metrics["densities"] = self.get_densities(labels)
+        return metrics
+
+
+def get_evaluator(student_2_data, number_of_groups, min_size, max_size,
+                  criterion):
+    # the evaluator of a solver instance, scores or cohorts by criterion
+    if not isinstance(student_2_data, StudentTable):
+        student_2_data = StudentTable.from_groups(student_2_data) \
+            if criterion == "density" \
+            else StudentTable.from_scores(student_2_data)
+    return PartitionEvaluator(student_2_data, number_of_groups, min_size,
+                              max_size)
@@ -1,10 +1,88 @@
-from copy import deepcopy
+import time
+from bisect import bisect_left
+from itertools import islice
 
 import pulp
 import numpy as np
 
-
-class GreedyGini:
+from bounds import ScoreBounds
+from metrics import Instrumented, measured, get_gap
+from seats import SeatTracker
+from sparse_model import SparseBackend
+from student_table import read_scores
+from symmetry import SymmetryBreaking
+
+
+class GiniState:
+    def __init__(self):
+        self.scores = np.empty(0)
+        self.prefix_sums = np.zeros(1)
+        self.total_score = 0
+        self.abs_diff_sum = 0
+
+    def __len__(self):
+        return len(self.scores)
+
+    def get_gini_index(self):
+        if len(self.scores) == 0:
+            return 0
+        return self.abs_diff_sum / (2 * len(self.scores) * self.total_score)
+
+    def get_abs_diff_to(self, score):
+        # sum of |score - r| over the group, split at the insertion position
+        m = len(self.scores)
+        pos = bisect_left(self.scores, score)
+        return (score * pos - self.prefix_sums[pos]
+                + self.total_score - self.prefix_sums[pos]
+                - score * (m - pos))
+
+    def get_abs_diffs_to(self, scores):
+        m = len(self.scores)
+        pos = np.searchsorted(self.scores, scores)
+        return (scores * pos - self.prefix_sums[pos]
+                + self.total_score - self.prefix_sums[pos]
+                - scores * (m - pos))
+
+    def get_gini_index_after(self, score):
+        return ((self.abs_diff_sum + 2 * self.get_abs_diff_to(score))
+                / (2 * (len(self.scores) + 1) * (self.total_score + score)))
+
+    def get_gini_indices_after(self, scores):
+        return ((self.abs_diff_sum + 2 * self.get_abs_diffs_to(scores))
+                / (2 * (len(self.scores) + 1) * (self.total_score + scores)))
+
+    def add(self, score):
+        self.abs_diff_sum += 2 * self.get_abs_diff_to(score)
+        self.total_score += score
+        pos = np.searchsorted(self.scores, score)
+        self.scores = np.insert(self.scores, pos, score)
+        self.prefix_sums = np.concatenate(([0], np.cumsum(self.scores)))
+
+    def get_gini_indices_without(self, scores):
+        # scores are members of the group, so |r - r| adds nothing
+        if len(self.scores) <= 1:
+            return np.zeros(np.shape(scores))
+        return ((self.abs_diff_sum - 2 * self.get_abs_diffs_to(scores))
+                / (2 * (len(self.scores) - 1) * (self.total_score - scores)))
+
+    def get_gini_indices_replaced(self, scores, new_scores):
+        # scores are members of the group, each replaced by its new score
+        abs_diff_sum = self.abs_diff_sum - 2 * self.get_abs_diffs_to(scores) \
+            + 2 * (self.get_abs_diffs_to(new_scores)
+                   - np.abs(new_scores - scores))
+        return (abs_diff_sum
+                / (2 * len(self.scores)
+                   * (self.total_score - scores + new_scores)))
+
+    def remove(self, score):
+        self.abs_diff_sum -= 2 * self.get_abs_diff_to(score)
+        self.total_score -= score
+        pos = np.searchsorted(self.scores, score)
+        self.scores = np.delete(self.scores, pos)
+        self.prefix_sums = np.concatenate(([0], np.cumsum(self.scores)))
+
+
+class GreedyGini(Instrumented):
     def __init__(self,
                  student_2_score,
                  number_of_groups,
@@ -12,87 +90,146 @@ class GreedyGini:
                  max_size,
                  ):
 
-        self.student_2_score = student_2_score
+        self.table, self.student_2_score = read_scores(student_2_score)
         self.number_of_groups = number_of_groups
         self.min_size = min_size
         self.max_size = max_size
 
         self.group_2_students = {g: [] for g in range(self.number_of_groups)}
         self.group_2_gini_index = {g: 0 for g in range(self.number_of_groups)}
-        self.group_2_number_of_students = {g: 0 for g in
-                                           range(self.number_of_groups)}
-        self.number_of_students = len(student_2_score)
+        self.group_2_state = {g: GiniState() for g in
+                              range(self.number_of_groups)}
+        self.number_of_students = len(self.student_2_score)
+        self.seats = SeatTracker(self.number_of_students,
+                                 self.number_of_groups,
+                                 self.min_size,
+                                 self.max_size)
+        self.group_2_number_of_students = \
+            self.seats.group_2_number_of_students
 
     def get_remaining_seats(self, g):
-        return np.sum(np.clip(np.array(
-            [self.min_size - self.group_2_number_of_students[g_] for g_ in
-             self.group_2_gini_index if g_ != g]),
-            min=0))
+        return self.seats.get_remaining_seats(g)
 
-    def get_group_candidates(self, i):
-        return [g for g in self.group_2_gini_index
-                if self.get_remaining_seats(g) <= self.number_of_students - i]
+    def get_group_candidates(self):
+        return self.seats.get_group_candidates()
 
     def get_gini_index(self, group):
-        index = sum(abs(self.student_2_score[s] - self.student_2_score[c]) for
-                    s in group for c in group) / (2 * len(group)
-                                                  * sum(self.student_2_score[s]
-                                                        for s in group))
-        return index
-
+        scores = np.fromiter((self.student_2_score[s] for s in group),
+                             dtype=float, count=len(group))
+        return float(np.abs(scores[:, None] - scores).sum()
+                     / (2 * len(scores) * scores.sum()))
+
+    def get_min_other_gini_indices(self, candidates):
+        gini_indices = np.array(list(self.group_2_gini_index.values()),
+                                dtype=float)
+        if len(gini_indices) == 1:
+            return np.full(len(candidates), np.inf)
+        first, second = np.argsort(gini_indices, kind="stable")[:2]
+        return np.array([gini_indices[second] if g == first
+                         else gini_indices[first] for g in candidates])
+
+    def get_best_of(self, candidates, min_others, scores, remaining,
+                    extremes):
+        # for a positive group total the Gini index after an insertion is
+        # quasiconvex in the inserted score, so it peaks at an extreme one
+        if extremes[0] + min(self.group_2_state[g].total_score
+                             for g in candidates) > 0:
+            return max(min(c, self.group_2_state[g].get_gini_indices_after(
+                extremes).max()) for g, c in zip(candidates, min_others))
+        return max(np.minimum(c, self.group_2_state[g].get_gini_indices_after(
+            scores[remaining])).max() for g, c in zip(candidates, min_others))
+
+    @measured
     def run(self):
+        index_2_student = list(self.student_2_score)
+        student_2_index = {s: j for j, s in enumerate(index_2_student)}
+        scores = np.array([self.student_2_score[s] for s in index_2_student],
+                          dtype=float)
+        remaining = np.ones(len(index_2_student), dtype=bool)
+        by_score = np.argsort(scores, kind="stable")
+        lo, hi = 0, len(by_score) - 1
+
         students = set(self.student_2_score.keys())
-        i = 1
         while students:
-            group_2_of = {}
-            group_2_gini_index = {}
-            for student in students:
-                for group in self.get_group_candidates(i):
-                    group_2_student_pre = deepcopy(self.group_2_students)
-                    group_2_student_pre[group].append(student)
-                    group_2_gini_index[group, student] = self.get_gini_index(
-                        group_2_student_pre[group])
-                    min_mean_score = min([score for g, score in
-                                          self.group_2_gini_index.items()
-                                          if g != group])
-                    group_2_of[group, student] = min(min_mean_score,
-                                                     group_2_gini_index[group,
-                                                                        student
-                                                                        ])
-
-            group, student = max(group_2_of,
-                                 key=lambda seq:
-                                 group_2_of[seq[0], seq[1]])
+            while not remaining[by_score[lo]]:
+                lo += 1
+            while not remaining[by_score[hi]]:
+                hi -= 1
+
+            candidates = self.get_group_candidates()
+            min_others = self.get_min_other_gini_indices(candidates)
+            best_of = self.get_best_of(candidates, min_others, scores,
+                                       remaining,
+                                       scores[[by_score[lo], by_score[hi]]])
+
+            # ties are broken as a scan over students, then groups, would
+            students_iter = iter(students)
+            chunk_size = 64
+            while True:
+                chunk = list(islice(students_iter, chunk_size))
+                indices = np.fromiter(map(student_2_index.__getitem__, chunk),
+                                      dtype=int, count=len(chunk))
+                is_best = np.array(
+                    [np.minimum(c, self.group_2_state[g]
+                                .get_gini_indices_after(scores[indices]))
+                     >= best_of for g, c in zip(candidates, min_others)])
+                cols = np.flatnonzero(is_best.any(axis=0))
+                self.count("evaluations", is_best.size)
+                if len(cols):
+                    break
+                chunk_size *= 2
+            student = chunk[cols[0]]
+            self.count("iterations")
+            group = candidates[np.argmax(is_best[:, cols[0]])]
+            j = student_2_index[student]
 
             students = students - {student}
+            remaining[j] = False
 
             self.group_2_students[group].append(student)
-            self.group_2_gini_index[group] = group_2_gini_index[group, student]
-            self.group_2_number_of_students[group] += 1
-            i += 1
+            self.group_2_state[group].add(scores[j])
+            self.group_2_gini_index[group] = \
+                self.group_2_state[group].get_gini_index()
+            self.seats.add(group)
 
         return self.group_2_students
 
 
-class GiniMinimization:
+class GiniMinimization(SymmetryBreaking, SparseBackend, Instrumented):
     def __init__(self,
                  student_2_score,
                  number_of_groups,
                  min_size,
                  max_size,
                  ):
-        self.student_2_score = student_2_score
+        self.table, self.student_2_score = read_scores(student_2_score)
         self.number_of_groups = number_of_groups
         self.min_size = min_size
         self.max_size = max_size
 
-        self.big_M = max(self.student_2_score.values()) \
-                     - min(self.student_2_score.values())
+        self.bounds = ScoreBounds(self.student_2_score.values(),
+                                  self.min_size,
+                                  self.max_size)
+        # gamma and y stay below the largest Gini index of a group
+        self.big_M = self.bounds.get_max_gini()
+        if self.big_M is None:
+            self.big_M = max(self.student_2_score.values()) \
+                         - min(self.student_2_score.values())
+        self.gini_big_M = {size: self.get_gini_big_M(size, self.big_M) for
+                           size in range(self.min_size, self.max_size + 1)}
 
         self.group_2_students = {g: [] for g in range(self.number_of_groups)}
 
         self.model = pulp.LpProblem("Gini", pulp.LpMinimize)
 
+    def get_gini_big_M(self, size, max_gamma):
+        # sum(d) - 2 * size * sum(r * y) <= M for the groups of every other
+        # size, d counting every pair twice
+        return max([0] + [2 * self.bounds.get_max_difference_sum(other)
+                          + 2 * size * max_gamma
+                          * max(0, -self.bounds.get_lowest_total(other))
+                          for other in self.bounds.sizes if other != size])
+
     def create_vars(self):
         x_indices = [(k, v) for k in range(self.number_of_groups)
                      for v in self.student_2_score]
@@ -121,7 +258,8 @@ class GiniMinimization:
                                             lowBound=0)
         self.gamma = pulp.LpVariable(name="gamma",
                                      cat=pulp.LpContinuous,
-                                     lowBound=0)
+                                     lowBound=0,
+                                     upBound=self.big_M)
 
     def create_of(self):
         self.model += self.gamma
@@ -151,14 +289,12 @@ class GiniMinimization:
                           + self.x_vars[k, c] - 1
 
     def create_abs_diff_con(self):
+        # d >= |r[s] - r[c]| - M * (1 - o) with the tightest M, |r[s] - r[c]|
         for k, s, c in self.d_vars:
-            self.model += self.d_vars[k, s, c] >= self.student_2_score[s] \
-                          - self.student_2_score[c] - self.big_M \
-                          * (1 - self.o_vars[k, s, c])
-
-            self.model += self.d_vars[k, s, c] >= self.student_2_score[c] \
-                          - self.student_2_score[s] - self.big_M \
-                          * (1 - self.o_vars[k, s, c])
+            self.model += self.d_vars[k, s, c] \
+                          >= abs(self.student_2_score[s]
+                                 - self.student_2_score[c]) \
+                          * self.o_vars[k, s, c]
 
     def create_gini_coef_con(self):
         for k, size in self.z_vars:
@@ -167,8 +303,7 @@ class GiniMinimization:
                                                 ) \
                           >= pulp.lpSum(var for (k_, _, _), var in
                                         self.d_vars.items() if k_ == k) \
-                          - 10 * sum(r for r in self.student_2_score.values())\
-                          * (1 - self.z_vars[k, size])
+                          - self.gini_big_M[size] * (1 - self.z_vars[k, size])
 
     def create_y_vars_con(self):
         for k, s in self.y_vars:
@@ -180,28 +315,507 @@ class GiniMinimization:
             self.model += self.y_vars[k, s] <= self.big_M * self.x_vars[k, s]
 
     def get_gini_index(self, group):
-        index = sum(abs(self.student_2_score[s] - self.student_2_score[c]) for
-                    s in group for c in group) / (2 * len(group)
-                                                  * sum(self.student_2_score[s]
-                                                        for s in group))
-        return index
-
-    def run(self, solver=pulp.COIN, timelimit=1800):
-        self.create_vars()
-        self.create_of()
-        self.create_assignment_con()
-        self.create_size_con()
-        self.create_one_size_con()
-        self.create_pair_in_one_group_con()
-        self.create_abs_diff_con()
-        self.create_gini_coef_con()
-        self.create_y_vars_con()
-
-        self.model.solve(solver(msg=True, timeLimit=timelimit))
-
-        for (k, s), var in self.x_vars.items():
-            if round(var.varValue) == 1:
-                self.group_2_students[k].append(s)
+        scores = np.fromiter((self.student_2_score[s] for s in group),
+                             dtype=float, count=len(group))
+        return float(np.abs(scores[:, None] - scores).sum()
+                     / (2 * len(scores) * scores.sum()))
+
+    def create_model(self):
+        self.run_phase(self.create_vars)
+        self.run_phase(self.create_of)
+        self.run_phase(self.create_assignment_con)
+        self.run_phase(self.create_size_con)
+        self.run_phase(self.create_one_size_con)
+        self.run_phase(self.create_pair_in_one_group_con)
+        self.run_phase(self.create_abs_diff_con)
+        self.run_phase(self.create_gini_coef_con)
+        self.run_phase(self.create_y_vars_con)
+
+    def set_initial_pair_values(self, k, students):
+        for s in students:
+            for c in students:
+                if s != c:
+                    self.o_vars[k, s, c].setInitialValue(1)
+                    self.d_vars[k, s, c].setInitialValue(
+                        abs(self.student_2_score[s] - self.student_2_score[c]))
+
+    def set_initial_values(self, group_2_students):
+        super().set_initial_values(group_2_students)
+        gamma = max(self.get_gini_index(students) for students in
+                    group_2_students.values())
+        self.gamma.setInitialValue(gamma)
+        for k, students in group_2_students.items():
+            self.z_vars[k, len(students)].setInitialValue(1)
+            for s in students:
+                self.y_vars[k, s].setInitialValue(gamma)
+            self.set_initial_pair_values(k, students)
+
+    @measured
+    def run(self, solver=pulp.COIN, timelimit=1800, symmetry_breaking=None,
+            initial_partition=None, backend="pulp"):
+        if backend == "sparse":
+            return self.run_sparse(solver, timelimit, symmetry_breaking,
+                                   initial_partition)
+
+        self.create_model()
+        if symmetry_breaking is not None:
+            self.run_phase(self.create_symmetry_con, symmetry_breaking)
+        if initial_partition is not None:
+            self.run_phase(self.set_initial_values,
+                           self.order_groups(initial_partition,
+                                             symmetry_breaking))
+
+        self.solve(self.model.solve,
+                   self.get_solver(solver, msg=True, timeLimit=timelimit,
+                                   warmStart=initial_partition is not None))
+
+        self.run_phase(self.extract_solution)
 
         return self.group_2_students
 
+    def get_sparse_scores(self):
+        return np.array([self.student_2_score[s] for s in
+                         self.sparse_students], dtype=float)
+
+    def get_sparse_pairs(self):
+        n = len(self.sparse_students)
+        return np.nonzero(~np.eye(n, dtype=bool))
+
+    def create_sparse_y_vars(self):
+        self.sparse_y = self.sparse_model.add_vars("y", self.sparse_x.shape)
+        self.sparse_gamma = self.sparse_model.add_vars("gamma", 1,
+                                                       up=self.big_M)[0]
+        self.sparse_model.set_objective(self.sparse_gamma, 1)
+
+    def create_sparse_pair_con(self):
+        s, c = self.get_sparse_pairs()
+        k = self.number_of_groups
+        self.sparse_o = self.sparse_model.add_vars("o", (k, len(s)), up=1,
+                                                   integer=True)
+        self.sparse_d = self.sparse_model.add_vars("d", (k, len(s)))
+
+        # o >= x[s] + x[c] - 1
+        rows = np.tile(np.arange(self.sparse_o.size), 3)
+        self.sparse_model.add_cons(
+            rows,
+            np.concatenate((self.sparse_o.ravel(),
+                            self.sparse_x[:, s].ravel(),
+                            self.sparse_x[:, c].ravel())),
+            np.repeat([1, -1, -1], self.sparse_o.size),
+            "G", np.full(self.sparse_o.size, -1))
+
+        # d >= |r[s] - r[c]| * o
+        scores = self.get_sparse_scores()
+        diffs = np.tile(np.abs(scores[s] - scores[c]), k)
+        self.sparse_model.add_cons(
+            np.tile(np.arange(self.sparse_d.size), 2),
+            np.concatenate((self.sparse_d.ravel(), self.sparse_o.ravel())),
+            np.concatenate((np.ones(self.sparse_d.size), -diffs)),
+            "G", np.zeros(self.sparse_d.size))
+
+    def create_sparse_gini_coef_con(self, cols, vals):
+        # 2 * size * sum(r * y) + sum(vals * cols) - M * z >= -M for each
+        # (group, size), where vals[j] are the coefficients for size j
+        sizes = self.get_sparse_sizes()
+        scores = self.get_sparse_scores()
+        big_M = np.array([self.gini_big_M[size] for size in sizes.tolist()])
+        k, m = cols.shape
+        n = len(scores)
+        rows = np.arange(k * len(sizes)).reshape(k, len(sizes))
+        row_cols = np.concatenate((
+            np.broadcast_to(self.sparse_y[:, None, :], (k, len(sizes), n)),
+            np.broadcast_to(cols[:, None, :], (k, len(sizes), m)),
+            self.sparse_z[:, :, None]), axis=2)
+        row_vals = np.concatenate((
+            2 * sizes[:, None] * scores[None, :],
+            np.broadcast_to(vals, (len(sizes), m)),
+            -big_M[:, None]), axis=1)
+        self.sparse_model.add_cons(
+            np.repeat(rows.ravel(), n + m + 1), row_cols,
+            np.broadcast_to(row_vals, row_cols.shape), "G",
+            np.tile(-big_M, k))
+
+    def create_sparse_y_con(self):
+        # y equals gamma for the members of a group and 0 otherwise
+        size = self.sparse_y.size
+        rows = np.tile(np.arange(size), 3)
+        cols = np.concatenate((self.sparse_y.ravel(),
+                               np.full(size, self.sparse_gamma),
+                               self.sparse_x.ravel()))
+        for sign, sense in ((1, "G"), (-1, "L")):
+            self.sparse_model.add_cons(
+                rows, cols, np.repeat([1, -1, -sign * self.big_M], size),
+                sense, np.full(size, -sign * self.big_M))
+            self.sparse_model.add_cons(
+                np.tile(np.arange(size), 2),
+                np.concatenate((self.sparse_y.ravel(),
+                                self.sparse_x.ravel())),
+                np.repeat([1, sign * self.big_M], size), sense,
+                np.zeros(size))
+
+    def create_sparse_model(self):
+        self.create_sparse_x_vars(pulp.LpMinimize)
+        self.create_sparse_z_vars()
+        self.create_sparse_y_vars()
+        self.create_sparse_assignment_con()
+        self.create_sparse_size_con()
+        self.create_sparse_one_size_con()
+        self.create_sparse_pair_con()
+        self.create_sparse_gini_coef_con(
+            self.sparse_d,
+            -np.ones((len(self.get_sparse_sizes()), self.sparse_d.shape[1])))
+        self.create_sparse_y_con()
+
+    def set_sparse_initial_pair_values(self, x):
+        s, c = self.get_sparse_pairs()
+        scores = self.get_sparse_scores()
+        o = x[:, s] & x[:, c]
+        self.sparse_model.set_start(self.sparse_o, o)
+        self.sparse_model.set_start(self.sparse_d,
+                                    o * np.abs(scores[s] - scores[c]))
+
+    def set_sparse_initial_values(self, group_2_students):
+        x = super().set_sparse_initial_values(group_2_students)
+        gamma = max(self.get_gini_index(students) for students in
+                    group_2_students.values())
+        self.sparse_model.set_start(self.sparse_gamma, gamma)
+        self.sparse_model.set_start(self.sparse_y, gamma * x)
+        self.set_sparse_initial_pair_values(x)
+
+
+class CompactGiniMinimization(GiniMinimization):
+    # with the students of a group sorted by score, the sum of absolute
+    # differences over its ordered pairs is 2 * sum(r * (2 * rank - size - 1)),
+    # and rank * x is linear in the running count of the group's members
+    def __init__(self,
+                 student_2_score,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 ):
+        super().__init__(student_2_score,
+                         number_of_groups,
+                         min_size,
+                         max_size)
+
+        self.sorted_students = sorted(self.student_2_score,
+                                      key=lambda s: self.student_2_score[s])
+
+    def get_gini_big_M(self, size, max_gamma):
+        # 2 * sum(r * (2 * q - (size + 1) * x)) - 2 * size * sum(r * y) <= M
+        # for the groups of every other size: with ranks q up to other it is
+        # twice the pair difference sum plus 2 * (other - size) * total
+        return max([0] + [2 * self.bounds.get_max_difference_sum(other)
+                          + 2 * (other - size)
+                          * (self.bounds.get_highest_total(other)
+                             if other > size
+                             else self.bounds.get_lowest_total(other))
+                          + 2 * size * max_gamma
+                          * max(0, -self.bounds.get_lowest_total(other))
+                          for other in self.bounds.sizes if other != size])
+
+    def create_vars(self):
+        x_indices = [(k, v) for k in range(self.number_of_groups)
+                     for v in self.student_2_score]
+        z_indices = [(k, size) for k in range(self.number_of_groups)
+                     for size in range(self.min_size, self.max_size + 1)]
+        self.x_vars = pulp.LpVariable.dicts(name="x",
+                                            indices=x_indices,
+                                            cat=pulp.LpBinary)
+        self.z_vars = pulp.LpVariable.dicts(name="z",
+                                            indices=z_indices,
+                                            cat=pulp.LpBinary)
+        self.c_vars = pulp.LpVariable.dicts(name="c",
+                                            indices=x_indices,
+                                            cat=pulp.LpContinuous,
+                                            lowBound=0,
+                                            upBound=self.max_size)
+        self.q_vars = pulp.LpVariable.dicts(name="q",
+                                            indices=x_indices,
+                                            cat=pulp.LpContinuous,
+                                            lowBound=0,
+                                            upBound=self.max_size)
+        self.y_vars = pulp.LpVariable.dicts(name="y",
+                                            indices=x_indices,
+                                            cat=pulp.LpContinuous,
+                                            lowBound=0)
+        self.gamma = pulp.LpVariable(name="gamma",
+                                     cat=pulp.LpContinuous,
+                                     lowBound=0,
+                                     upBound=self.big_M)
+
+    def create_count_con(self):
+        for k in range(self.number_of_groups):
+            previous = 0
+            for s in self.sorted_students:
+                self.model += self.c_vars[k, s] == previous + self.x_vars[k, s]
+                previous = self.c_vars[k, s]
+
+    def create_rank_con(self):
+        for k, s in self.q_vars:
+            self.model += self.q_vars[k, s] <= self.c_vars[k, s]
+            self.model += self.q_vars[k, s] >= self.c_vars[k, s] \
+                - self.max_size * (1 - self.x_vars[k, s])
+            self.model += self.q_vars[k, s] <= self.max_size \
+                * self.x_vars[k, s]
+
+    def create_gini_coef_con(self):
+        for k, size in self.z_vars:
+            self.model += 2 * size * pulp.lpSum(r * self.y_vars[k, s] for s, r
+                                                in self.student_2_score.items()
+                                                ) \
+                          >= 2 * pulp.lpSum(r * (2 * self.q_vars[k, s]
+                                                 - (size + 1)
+                                                 * self.x_vars[k, s])
+                                            for s, r
+                                            in self.student_2_score.items()) \
+                          - self.gini_big_M[size] * (1 - self.z_vars[k, size])
+
+    def set_initial_pair_values(self, k, students):
+        students = set(students)
+        count = 0
+        for s in self.sorted_students:
+            if s in students:
+                count += 1
+                self.q_vars[k, s].setInitialValue(count)
+            self.c_vars[k, s].setInitialValue(count)
+
+    def create_sparse_rank_con(self):
+        k, n = self.sparse_x.shape
+        self.sparse_c = self.sparse_model.add_vars("c", (k, n),
+                                                   up=self.max_size)
+        self.sparse_q = self.sparse_model.add_vars("q", (k, n),
+                                                   up=self.max_size)
+        order = self.get_sparse_order()
+        c = self.sparse_c[:, order]
+        x = self.sparse_x[:, order]
+
+        # c[s_i] - c[s_i-1] - x[s_i] == 0 in sorted order
+        rows = np.arange(k * n).reshape(k, n)
+        self.sparse_model.add_cons(
+            np.concatenate((rows.ravel(), rows[:, 1:].ravel(),
+                            rows.ravel())),
+            np.concatenate((c.ravel(), c[:, :-1].ravel(), x.ravel())),
+            np.concatenate((np.ones(k * n), -np.ones(k * (n - 1)),
+                            -np.ones(k * n))),
+            "E", np.zeros(k * n))
+
+        size = self.sparse_q.size
+        rows = np.tile(np.arange(size), 2)
+        self.sparse_model.add_cons(
+            rows, np.concatenate((self.sparse_q.ravel(),
+                                  self.sparse_c.ravel())),
+            np.repeat([1, -1], size), "L", np.zeros(size))
+        self.sparse_model.add_cons(
+            np.tile(np.arange(size), 3),
+            np.concatenate((self.sparse_q.ravel(), self.sparse_c.ravel(),
+                            self.sparse_x.ravel())),
+            np.repeat([1, -1, -self.max_size], size), "G",
+            np.full(size, -self.max_size))
+        self.sparse_model.add_cons(
+            rows, np.concatenate((self.sparse_q.ravel(),
+                                  self.sparse_x.ravel())),
+            np.repeat([1, -self.max_size], size), "L", np.zeros(size))
+
+    def get_sparse_order(self):
+        student_2_position = {s: i for i, s in
+                              enumerate(self.sparse_students)}
+        return np.array([student_2_position[s] for s in
+                         self.sorted_students])
+
+    def create_sparse_model(self):
+        self.create_sparse_x_vars(pulp.LpMinimize)
+        self.create_sparse_z_vars()
+        self.create_sparse_y_vars()
+        self.create_sparse_assignment_con()
+        self.create_sparse_size_con()
+        self.create_sparse_one_size_con()
+        self.create_sparse_rank_con()
+
+        # the right-hand side 2 * sum(r * (2 * q - (size + 1) * x)) moved
+        # to the left
+        sizes = self.get_sparse_sizes()
+        scores = self.get_sparse_scores()
+        self.create_sparse_gini_coef_con(
+            np.concatenate((self.sparse_q, self.sparse_x), axis=1),
+            np.concatenate((np.broadcast_to(-4 * scores,
+                                            (len(sizes), len(scores))),
+                            2 * (sizes[:, None] + 1) * scores[None, :]),
+                           axis=1))
+        self.create_sparse_y_con()
+
+    def set_sparse_initial_pair_values(self, x):
+        counts = np.cumsum(x[:, self.get_sparse_order()], axis=1)
+        c = np.empty(counts.shape)
+        c[:, self.get_sparse_order()] = counts
+        self.sparse_model.set_start(self.sparse_c, c)
+        self.sparse_model.set_start(self.sparse_q, c * x)
+
+    def create_model(self):
+        self.run_phase(self.create_vars)
+        self.run_phase(self.create_of)
+        self.run_phase(self.create_assignment_con)
+        self.run_phase(self.create_size_con)
+        self.run_phase(self.create_one_size_con)
+        self.run_phase(self.create_count_con)
+        self.run_phase(self.create_rank_con)
+        self.run_phase(self.create_gini_coef_con)
+        self.run_phase(self.create_y_vars_con)
+
+
+class ParametricGiniMinimization(CompactGiniMinimization):
+    # Dinkelbach iterations: with gamma fixed at the largest Gini index of
+    # the incumbent, a MILP without the products y = gamma * x looks for a
+    # partition whose largest violation t of
+    # sum |r - r'| - 2 * gamma * size * total <= 0 is negative by a margin;
+    # it has no objective, so the solver stops at the first such partition,
+    # whose largest Gini index is the next gamma, and an infeasible MILP
+    # proves gamma optimal up to the margin
+    tolerance = 1e-9
+    # relative to the largest violation possible
+    margin = 1e-4
+
+    def create_vars(self):
+        x_indices = [(k, v) for k in range(self.number_of_groups)
+                     for v in self.student_2_score]
+        z_indices = [(k, size) for k in range(self.number_of_groups)
+                     for size in range(self.min_size, self.max_size + 1)]
+        self.x_vars = pulp.LpVariable.dicts(name="x",
+                                            indices=x_indices,
+                                            cat=pulp.LpBinary)
+        self.z_vars = pulp.LpVariable.dicts(name="z",
+                                            indices=z_indices,
+                                            cat=pulp.LpBinary)
+        self.c_vars = pulp.LpVariable.dicts(name="c",
+                                            indices=x_indices,
+                                            cat=pulp.LpContinuous,
+                                            lowBound=0,
+                                            upBound=self.max_size)
+        self.q_vars = pulp.LpVariable.dicts(name="q",
+                                            indices=x_indices,
+                                            cat=pulp.LpContinuous,
+                                            lowBound=0,
+                                            upBound=self.max_size)
+        self.t = pulp.LpVariable(name="t", cat=pulp.LpContinuous)
+
+    def create_of(self):
+        self.model += pulp.LpAffineExpression()
+
+    def create_gini_coef_con(self):
+        # 2 * sum(r * (2 * q - (size + 1) * x)) - 2 * gamma * size * sum(r * x)
+        # - t <= M * (1 - z), the coefficients of x and z are set by set_gamma
+        self.gini_cons = {}
+        for k, size in self.z_vars:
+            self.gini_cons[k, size] = \
+                4 * pulp.lpSum(r * self.q_vars[k, s] for s, r
+                               in self.student_2_score.items()) \
+                + pulp.lpSum(self.x_vars[k, s] for s
+                             in self.student_2_score) \
+                - self.t + self.z_vars[k, size] <= 0
+            self.model += self.gini_cons[k, size], f"gini_{k}_{size}"
+        self.set_gamma(self.gamma_value)
+
+    def set_gamma(self, gamma):
+        # the active constraints are at least -2 * gamma * size * total
+        self.gamma_value = gamma
+        self.t.lowBound = -2 * gamma * max(
+            size * self.bounds.get_highest_total(size)
+            for size in self.bounds.sizes)
+        self.t.upBound = self.margin * self.t.lowBound
+        for (k, size), con in self.gini_cons.items():
+            big_M = self.get_gini_big_M(size, gamma) - self.t.lowBound
+            for s, r in self.student_2_score.items():
+                con[self.x_vars[k, s]] = -2 * r * (size + 1 + gamma * size)
+            con[self.z_vars[k, size]] = big_M
+            con.constant = -big_M
+
+    def create_model(self):
+        self.run_phase(self.create_vars)
+        self.run_phase(self.create_of)
+        self.run_phase(self.create_assignment_con)
+        self.run_phase(self.create_size_con)
+        self.run_phase(self.create_one_size_con)
+        self.run_phase(self.create_count_con)
+        self.run_phase(self.create_rank_con)
+        self.run_phase(self.create_gini_coef_con)
+
+    def get_max_gini_index(self, group_2_students):
+        return max(self.get_gini_index(students) for students in
+                   group_2_students.values())
+
+    def get_violation(self, students):
+        scores = [self.student_2_score[s] for s in students]
+        return sum(abs(r - r_) for r in scores for r_ in scores) \
+            - 2 * self.gamma_value * len(scores) * sum(scores)
+
+    def set_model_metrics(self):
+        super().set_model_metrics()
+        self.metrics.objective_value = self.gamma_value
+        self.metrics.best_bound = self.gamma_value if self.optimal else None
+        self.metrics.gap = get_gap(self.metrics.objective_value,
+                                   self.metrics.best_bound)
+        self.metrics.iterations = self.iterations
+
+    @measured
+    def run(self, solver=pulp.COIN, timelimit=1800, symmetry_breaking=None,
+            initial_partition=None, max_iterations=20, sub_timelimit=300):
+        # each MILP stops after sub_timelimit seconds
+        start = time.perf_counter()
+        if initial_partition is None:
+            initial_partition = GreedyGini(self.student_2_score,
+                                           self.number_of_groups,
+                                           self.min_size,
+                                           self.max_size).run()
+        partition = self.order_groups(initial_partition, symmetry_breaking)
+        self.gamma_value = self.get_max_gini_index(partition)
+        self.optimal = False
+        self.iterations = []
+
+        self.create_model()
+        if symmetry_breaking is not None:
+            self.run_phase(self.create_symmetry_con, symmetry_breaking)
+
+        for _ in range(max_iterations):
+            remaining = timelimit - (time.perf_counter() - start)
+            if remaining < 1:
+                break
+            if self.gamma_value <= self.tolerance:
+                # no Gini index is negative
+                self.optimal = True
+                break
+            # the incumbent violates the margin, so there is no warm start
+            self.run_phase(self.set_gamma, self.gamma_value)
+            iteration_start = time.perf_counter()
+            self.solve(self.model.solve,
+                       self.get_solver(solver, msg=True,
+                                       timeLimit=int(min(sub_timelimit,
+                                                         remaining))))
+            self.count("iterations")
+            if self.model.status == pulp.LpStatusInfeasible:
+                # no partition keeps every group below gamma
+                self.optimal = True
+                break
+            if self.model.sol_status not in (pulp.LpSolutionOptimal,
+                                             pulp.LpSolutionIntegerFeasible):
+                break
+
+            self.group_2_students = {g: [] for g in
+                                     range(self.number_of_groups)}
+            self.run_phase(self.extract_solution)
+            gini_index = self.get_max_gini_index(self.group_2_students)
+            self.iterations.append({
+                "gamma": self.gamma_value,
+                "violation": max(self.get_violation(students) for students
+                                 in self.group_2_students.values()),
+                "gini_index": gini_index,
+                "seconds": time.perf_counter() - iteration_start})
+
+            if gini_index >= self.gamma_value - self.tolerance:
+                # a solution within the solver's tolerances only
+                break
+            partition = self.order_groups(self.group_2_students,
+                                          symmetry_breaking)
+            self.gamma_value = gini_index
+
+        self.group_2_students = partition
+        return self.group_2_students
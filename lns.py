@@ -0,0 +1,206 @@
+import concurrent.futures
+import os
+import time
+
+import numpy as np
+import pulp
+
+from evaluation import get_evaluator
+from gini import GreedyGini, CompactGiniMinimization
+from metrics import Instrumented, measured
+from number_partition_problem import GreedyNPPTotal, NPPIPTotal, \
+    GreedyNPPMean, NPPIPMean
+from quasi_clique_partitioning import GreedyQCPP, CohortQCPPIP
+
+
+# the greedy start with its run arguments, and the IP model that
+# re-optimizes the students of a few groups
+criterion_2_lns = {
+    "total": (GreedyNPPTotal, {}, NPPIPTotal),
+    "mean": (GreedyNPPMean, {"batched": True}, NPPIPMean),
+    "gini": (GreedyGini, {}, CompactGiniMinimization),
+    "density": (GreedyQCPP, {"bucketed": True}, CohortQCPPIP),
+}
+
+
+def silence():
+    # the sub-problems run in worker processes without their CBC logs
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+
+
+def solve_neighbourhood(cls, instance, initial_partition, kwargs):
+    try:
+        return cls(*instance).run(initial_partition=initial_partition,
+                                  **kwargs), None
+    except Exception as error:
+        return None, repr(error)
+
+
+class LargeNeighbourhoodSearch(Instrumented):
+    # starts from the greedy partition and repeatedly re-optimizes the
+    # students of 2 to 4 groups, the worst group and random others, with the
+    # IP model of the criterion; neighbourhoods of one round share no group
+    # and are solved in parallel, and a result replaces its groups when it
+    # raises their smallest value
+    tolerance = 1e-9
+
+    def __init__(self,
+                 student_2_data,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 criterion,
+                 ):
+        self.number_of_groups = number_of_groups
+        self.min_size = min_size
+        self.max_size = max_size
+        self.criterion = criterion
+
+        self.evaluator = get_evaluator(student_2_data, number_of_groups,
+                                       min_size, max_size, criterion)
+        self.table = self.evaluator.table
+        self.student_2_data = self.table.get_student_2_group() \
+            if criterion == "density" else self.table.get_student_2_score()
+        # group values are negated Gini indices, so that min-max Gini
+        # becomes max-min
+        self.sense = -1 if criterion == "gini" else 1
+
+        self.labels = None
+        self.group_2_students = {g: [] for g in range(self.number_of_groups)}
+        self.objective_value = None
+        self.errors = []
+
+    def get_group_values(self, labels):
+        labels = labels[None, :]
+        if self.criterion == "total":
+            values = self.evaluator.get_totals(labels)
+        elif self.criterion == "mean":
+            values = self.evaluator.get_means(labels)
+        elif self.criterion == "gini":
+            values = -self.evaluator.get_gini_indices(labels)
+        else:
+            values = self.evaluator.get_densities(labels)
+        return values[0]
+
+    def get_initial_labels(self, initial_partition):
+        if initial_partition is None:
+            cls, kwargs, _ = criterion_2_lns[self.criterion]
+            initial_partition = cls(self.student_2_data,
+                                    self.number_of_groups,
+                                    self.min_size,
+                                    self.max_size).run(**kwargs)
+        return self.table.get_labels(initial_partition)
+
+    def get_neighbourhoods(self, values, rng, neighbourhood_sizes,
+                           number_of_neighbourhoods):
+        # the worst group left and random others, until too few groups are
+        # left
+        groups = list(np.argsort(values, kind="stable"))
+        neighbourhoods = []
+        while len(neighbourhoods) < number_of_neighbourhoods \
+                and len(groups) >= 2:
+            size = min(int(rng.choice(neighbourhood_sizes)), len(groups))
+            others = rng.choice(len(groups) - 1, size - 1, replace=False) + 1
+            neighbourhood = [groups[0]] + [groups[i] for i in others]
+            neighbourhoods.append([int(g) for g in neighbourhood])
+            groups = [g for g in groups if g not in neighbourhood]
+        return neighbourhoods
+
+    def get_sub_instance(self, neighbourhood):
+        indices = np.flatnonzero(np.isin(self.labels, neighbourhood))
+        students = self.table.ids[indices].tolist()
+        student_2_data = {s: self.student_2_data[s] for s in students}
+        initial_partition = {
+            i: self.table.ids[indices[self.labels[indices] == g]].tolist()
+            for i, g in enumerate(neighbourhood)}
+        return ((student_2_data, len(neighbourhood), self.min_size,
+                 self.max_size), initial_partition)
+
+    def is_valid(self, neighbourhood, group_2_students):
+        # a sub-problem stopped without a solution leaves groups empty or
+        # students out
+        if group_2_students is None:
+            return False
+        sizes = [len(students) for students in group_2_students.values()]
+        return len(sizes) == len(neighbourhood) \
+            and sum(sizes) == np.isin(self.labels, neighbourhood).sum() \
+            and all(self.min_size <= size <= self.max_size for size in sizes)
+
+    def accept(self, neighbourhood, group_2_students, values):
+        if not self.is_valid(neighbourhood, group_2_students):
+            return False
+        labels = self.labels.copy()
+        for i, students in group_2_students.items():
+            labels[self.table.get_indices(students)] = neighbourhood[i]
+        new_values = self.get_group_values(labels)
+        if new_values[neighbourhood].min() \
+                <= values[neighbourhood].min() + self.tolerance:
+            return False
+        self.labels = labels
+        return True
+
+    @measured
+    def run(self, solver=pulp.COIN, timelimit=60, sub_timelimit=10,
+            initial_partition=None, neighbourhood_sizes=(2, 3, 4),
+            number_of_workers=None, max_iterations=None, patience=20,
+            seed=0, ip_kwargs=None):
+        # stops at the time limit, after max_iterations rounds or after
+        # patience rounds without an improvement; failed sub-problems are
+        # recorded in errors, and a round in which all of them fail raises
+        start = time.perf_counter()
+        rng = np.random.default_rng(seed)
+        number_of_workers = number_of_workers or os.cpu_count()
+        cls = criterion_2_lns[self.criterion][2]
+
+        with self.phase("initial_partition"):
+            self.labels = self.get_initial_labels(initial_partition)
+
+        self.errors = []
+        iteration = 0
+        rounds_without_improvement = 0
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=number_of_workers,
+                initializer=silence) as executor:
+            while (max_iterations is None or iteration < max_iterations) \
+                    and rounds_without_improvement < patience:
+                remaining = timelimit - (time.perf_counter() - start)
+                if remaining < 1:
+                    break
+                values = self.get_group_values(self.labels)
+                neighbourhoods = self.get_neighbourhoods(
+                    values, rng, neighbourhood_sizes, number_of_workers)
+                kwargs = {"solver": solver,
+                          "timelimit": int(min(sub_timelimit, remaining)),
+                          **(ip_kwargs or {})}
+                with self.phase("solve"):
+                    futures = [executor.submit(solve_neighbourhood, cls,
+                                               *self.get_sub_instance(
+                                                   neighbourhood), kwargs)
+                               for neighbourhood in neighbourhoods]
+                    results = [future.result() for future in futures]
+                self.count("number_of_subproblems", len(neighbourhoods))
+
+                errors = [error for _, error in results if error is not None]
+                self.errors += errors
+                self.count("number_of_errors", len(errors))
+                if errors and len(errors) == len(results):
+                    raise RuntimeError(f"every sub-problem of round "
+                                       f"{iteration} failed: {errors[0]}")
+
+                improved = False
+                for neighbourhood, (group_2_students, _) in zip(
+                        neighbourhoods, results):
+                    if self.accept(neighbourhood, group_2_students, values):
+                        self.count("number_of_improvements")
+                        improved = True
+                rounds_without_improvement = 0 if improved \
+                    else rounds_without_improvement + 1
+                iteration += 1
+
+        self.count("number_of_iterations", iteration)
+        self.objective_value = float(
+            self.sense * self.get_group_values(self.labels).min())
+        self.group_2_students = self.table.get_group_2_students(
+            self.labels, self.number_of_groups)
+        return self.group_2_students
@@ -0,0 +1,317 @@
+import time
+
+import numpy as np
+
+from gini import GiniState
+
+
+class LocalSearch:
+    # move and swap search for max-min criteria: a step is taken when it
+    # raises the smaller value of the two groups it changes, so the sorted
+    # vector of group values grows lexicographically and the search ends
+    sense = 1
+    tolerance = 1e-9
+
+    def __init__(self,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 ):
+        self.number_of_groups = number_of_groups
+        self.min_size = min_size
+        self.max_size = max_size
+
+        self.group_2_students = {g: [] for g in range(self.number_of_groups)}
+        self.group_2_value = {}
+        self.number_of_moves = 0
+        self.number_of_swaps = 0
+
+    def create_group_state(self, g):
+        raise NotImplementedError
+
+    def get_value(self, g):
+        raise NotImplementedError
+
+    def get_values_after_moves(self, g, h):
+        # values of g and h after moving each student of g to h
+        raise NotImplementedError
+
+    def get_values_after_swaps(self, g, h):
+        # values of g and h after swapping each student of g (rows) with
+        # each student of h (columns)
+        raise NotImplementedError
+
+    def add_to_state(self, g, s):
+        raise NotImplementedError
+
+    def remove_from_state(self, g, s):
+        raise NotImplementedError
+
+    def set_partition(self, group_2_students):
+        self.group_2_students = {g: list(students) for g, students in
+                                 group_2_students.items()}
+        for g in self.group_2_students:
+            self.create_group_state(g)
+            self.group_2_value[g] = self.get_value(g)
+
+    def get_objective_value(self):
+        return self.sense * min(self.group_2_value.values())
+
+    def get_best(self, values_g, values_h, g, h):
+        # the best step between g and h, if it beats their current minimum;
+        # an empty group has no students to move or swap
+        values = np.minimum(values_g, values_h)
+        if values.size == 0:
+            return None
+        index = np.unravel_index(np.argmax(values), values.shape)
+        if values[index] <= min(self.group_2_value[g],
+                                self.group_2_value[h]) + self.tolerance:
+            return None
+        return index
+
+    def move(self, s, g, h):
+        self.group_2_students[g].remove(s)
+        self.remove_from_state(g, s)
+        self.group_2_students[h].append(s)
+        self.add_to_state(h, s)
+
+    def update_values(self, g, h):
+        self.group_2_value[g] = self.get_value(g)
+        self.group_2_value[h] = self.get_value(h)
+
+    def improve(self):
+        # the first pair of groups with an improving step, starting from the
+        # worst groups
+        order = sorted(self.group_2_students,
+                       key=lambda g: self.group_2_value[g])
+        for i, g in enumerate(order):
+            for j, h in enumerate(order):
+                if h == g:
+                    continue
+                if len(self.group_2_students[g]) > self.min_size \
+                        and len(self.group_2_students[h]) < self.max_size:
+                    index = self.get_best(
+                        *self.get_values_after_moves(g, h), g, h)
+                    if index is not None:
+                        self.move(self.group_2_students[g][index[0]], g, h)
+                        self.update_values(g, h)
+                        self.number_of_moves += 1
+                        return True
+                # swaps between g and h were tried from the worse group
+                if j < i:
+                    continue
+                index = self.get_best(
+                    *self.get_values_after_swaps(g, h), g, h)
+                if index is not None:
+                    s = self.group_2_students[g][index[0]]
+                    t = self.group_2_students[h][index[1]]
+                    self.move(s, g, h)
+                    self.move(t, h, g)
+                    self.update_values(g, h)
+                    self.number_of_swaps += 1
+                    return True
+        return False
+
+    def run(self, group_2_students, max_iterations=None, timelimit=None):
+        self.set_partition(group_2_students)
+
+        start = time.perf_counter()
+        iteration = 0
+        while max_iterations is None or iteration < max_iterations:
+            if timelimit is not None \
+                    and time.perf_counter() - start > timelimit:
+                break
+            if not self.improve():
+                break
+            iteration += 1
+
+        return self.group_2_students
+
+
+class LocalSearchNPPTotal(LocalSearch):
+    def __init__(self,
+                 student_2_score,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 ):
+        super().__init__(number_of_groups, min_size, max_size)
+        self.student_2_score = student_2_score
+
+        self.group_2_total_score = {}
+
+    def get_scores(self, g):
+        return np.array([self.student_2_score[s] for s in
+                         self.group_2_students[g]], dtype=float)
+
+    def create_group_state(self, g):
+        self.group_2_total_score[g] = sum(self.student_2_score[s] for s in
+                                          self.group_2_students[g])
+
+    def get_value(self, g):
+        return self.group_2_total_score[g]
+
+    def get_totals_after_moves(self, g, h):
+        scores = self.get_scores(g)
+        return (self.group_2_total_score[g] - scores,
+                self.group_2_total_score[h] + scores)
+
+    def get_totals_after_swaps(self, g, h):
+        deltas = self.get_scores(h)[None, :] - self.get_scores(g)[:, None]
+        return (self.group_2_total_score[g] + deltas,
+                self.group_2_total_score[h] - deltas)
+
+    def get_values_after_moves(self, g, h):
+        return self.get_totals_after_moves(g, h)
+
+    def get_values_after_swaps(self, g, h):
+        return self.get_totals_after_swaps(g, h)
+
+    def add_to_state(self, g, s):
+        self.group_2_total_score[g] += self.student_2_score[s]
+
+    def remove_from_state(self, g, s):
+        self.group_2_total_score[g] -= self.student_2_score[s]
+
+
+class LocalSearchNPPMean(LocalSearchNPPTotal):
+    def get_value(self, g):
+        # an empty group has no mean and is the worst of all
+        if not self.group_2_students[g]:
+            return -np.inf
+        return self.group_2_total_score[g] / len(self.group_2_students[g])
+
+    def get_values_after_moves(self, g, h):
+        totals_g, totals_h = self.get_totals_after_moves(g, h)
+        # moving the last student out leaves g empty, the worst of all
+        if len(self.group_2_students[g]) == 1:
+            return (np.full(len(totals_g), -np.inf),
+                    totals_h / (len(self.group_2_students[h]) + 1))
+        return (totals_g / (len(self.group_2_students[g]) - 1),
+                totals_h / (len(self.group_2_students[h]) + 1))
+
+    def get_values_after_swaps(self, g, h):
+        totals_g, totals_h = self.get_totals_after_swaps(g, h)
+        return (totals_g / len(self.group_2_students[g]),
+                totals_h / len(self.group_2_students[h]))
+
+
+class LocalSearchGini(LocalSearchNPPTotal):
+    # group values are negated Gini indices, so that min-max Gini becomes
+    # max-min
+    sense = -1
+
+    def __init__(self,
+                 student_2_score,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 ):
+        super().__init__(student_2_score,
+                         number_of_groups,
+                         min_size,
+                         max_size)
+
+        self.group_2_state = {}
+
+    def create_group_state(self, g):
+        self.group_2_state[g] = GiniState()
+        for s in self.group_2_students[g]:
+            self.add_to_state(g, s)
+
+    def get_value(self, g):
+        return -self.group_2_state[g].get_gini_index()
+
+    def get_values_after_moves(self, g, h):
+        scores = self.get_scores(g)
+        return (-self.group_2_state[g].get_gini_indices_without(scores),
+                -self.group_2_state[h].get_gini_indices_after(scores))
+
+    def get_values_after_swaps(self, g, h):
+        scores_g = self.get_scores(g)[:, None]
+        scores_h = self.get_scores(h)[None, :]
+        return (-self.group_2_state[g].get_gini_indices_replaced(scores_g,
+                                                                 scores_h),
+                -self.group_2_state[h].get_gini_indices_replaced(scores_h,
+                                                                 scores_g))
+
+    def add_to_state(self, g, s):
+        self.group_2_state[g].add(self.student_2_score[s])
+
+    def remove_from_state(self, g, s):
+        self.group_2_state[g].remove(self.student_2_score[s])
+
+
+class LocalSearchQCPP(LocalSearch):
+    def __init__(self,
+                 student_2_group,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 ):
+        super().__init__(number_of_groups, min_size, max_size)
+        self.student_2_group = student_2_group
+
+        # per group: cohort sizes and the number of same-cohort pairs
+        self.group_2_cohort_2_size = {}
+        self.group_2_number_of_pairs = {}
+
+    @staticmethod
+    def get_density(size, number_of_pairs):
+        if size <= 1:
+            return np.ones(np.shape(number_of_pairs))
+        return 2 * number_of_pairs / (size * (size - 1))
+
+    def get_cohort_sizes(self, g, students):
+        # sizes in g of the cohorts of the given students
+        cohort_2_size = self.group_2_cohort_2_size[g]
+        return np.array([cohort_2_size.get(self.student_2_group[s], 0) for s
+                         in students])
+
+    def create_group_state(self, g):
+        self.group_2_cohort_2_size[g] = {}
+        self.group_2_number_of_pairs[g] = 0
+        for s in self.group_2_students[g]:
+            self.add_to_state(g, s)
+
+    def get_value(self, g):
+        return float(self.get_density(len(self.group_2_students[g]),
+                                      self.group_2_number_of_pairs[g]))
+
+    def get_values_after_moves(self, g, h):
+        students = self.group_2_students[g]
+        return (self.get_density(len(students) - 1,
+                                 self.group_2_number_of_pairs[g]
+                                 - self.get_cohort_sizes(g, students) + 1),
+                self.get_density(len(self.group_2_students[h]) + 1,
+                                 self.group_2_number_of_pairs[h]
+                                 + self.get_cohort_sizes(h, students)))
+
+    def get_values_after_swaps(self, g, h):
+        students_g = self.group_2_students[g]
+        students_h = self.group_2_students[h]
+        # a swap inside one cohort leaves both groups unchanged
+        same = np.array([self.student_2_group[s] for s in students_g]
+                        )[:, None] \
+            == np.array([self.student_2_group[t] for t in students_h]
+                        )[None, :]
+        pairs_g = self.group_2_number_of_pairs[g] \
+            - self.get_cohort_sizes(g, students_g)[:, None] + 1 \
+            + self.get_cohort_sizes(g, students_h)[None, :] - same
+        pairs_h = self.group_2_number_of_pairs[h] \
+            - self.get_cohort_sizes(h, students_h)[None, :] + 1 \
+            + self.get_cohort_sizes(h, students_g)[:, None] - same
+        return (self.get_density(len(students_g), pairs_g),
+                self.get_density(len(students_h), pairs_h))
+
+    def add_to_state(self, g, s):
+        cohort_2_size = self.group_2_cohort_2_size[g]
+        c = self.student_2_group[s]
+        self.group_2_number_of_pairs[g] += cohort_2_size.get(c, 0)
+        cohort_2_size[c] = cohort_2_size.get(c, 0) + 1
+
+    def remove_from_state(self, g, s):
+        cohort_2_size = self.group_2_cohort_2_size[g]
+        c = self.student_2_group[s]
+        cohort_2_size[c] -= 1
+        self.group_2_number_of_pairs[g] -= cohort_2_size[c]
@@ -2,9 +2,14 @@ import numpy as np
 import pulp
 
 from number_partition_problem import GreedyNPPTotal, NPPIPTotal, NPPIPMean, \
-    GreedyNPPMean
-from quasi_clique_partitioning import GreedyQCPP, QCPPIP
+    GreedyNPPMean, BranchAndBoundNPPTotal
+from quasi_clique_partitioning import GreedyQCPP, QCPPIP, BranchAndBoundQCPP
 from gini import GiniMinimization, GreedyGini
+from evaluation import get_evaluator
+from local_search import LocalSearchNPPTotal
+from lns import LargeNeighbourhoodSearch
+from similarity import SimilarityAssignment
+from student_table import StudentTable
 
 
 number_of_students = 10
@@ -18,6 +23,11 @@ student_2_score = dict(zip(range(number_of_students),
                                                      size=number_of_students)))
                        )
 print(student_2_score)
+score_evaluator = get_evaluator(student_2_score,
+                                number_of_groups,
+                                min_size,
+                                max_size,
+                                "total")
 
 student_2_group = dict(zip(range(number_of_students),
                            np.random.randint(low=0,
@@ -36,17 +46,42 @@ print([len(studs) for studs in greedy_npp_total_sol.values()])
 print(npp_total.group_2_total_score.values())
 print(min(npp_total.group_2_total_score.values()))
 
+local_search_npp_total = LocalSearchNPPTotal(student_2_score,
+                                             number_of_groups,
+                                             min_size,
+                                             max_size)
+local_search_npp_total.run(greedy_npp_total_sol, timelimit=10)
+print(local_search_npp_total.get_objective_value())
+
 
 npp_ip_total = NPPIPTotal(student_2_score,
                           number_of_groups,
                           min_size,
                           max_size)
-ip_npp_total_sol = npp_ip_total.run(pulp.CPLEX, 30)
+ip_npp_total_sol = npp_ip_total.run(pulp.CPLEX, 30,
+                                    initial_partition=greedy_npp_total_sol)
 print([len(studs) for studs in ip_npp_total_sol.values()])
-print([sum([student_2_score[s] for s in studs])
-       for studs in ip_npp_total_sol.values()])
+print(score_evaluator.evaluate(ip_npp_total_sol)["totals"])
 print(npp_ip_total.model.objective.value())
 
+bb_npp_total = BranchAndBoundNPPTotal(student_2_score,
+                                      number_of_groups,
+                                      min_size,
+                                      max_size)
+bb_npp_total_sol = bb_npp_total.run(timelimit=30)
+print([len(studs) for studs in bb_npp_total_sol.values()])
+print(bb_npp_total.objective_value, bb_npp_total.best_bound, bb_npp_total.gap)
+
+lns_npp_total = LargeNeighbourhoodSearch(student_2_score,
+                                         number_of_groups,
+                                         min_size,
+                                         max_size,
+                                         "total")
+lns_npp_total_sol = lns_npp_total.run(pulp.PULP_CBC_CMD, 30,
+                                      initial_partition=greedy_npp_total_sol)
+print([len(studs) for studs in lns_npp_total_sol.values()])
+print(lns_npp_total.objective_value)
+
 
 npp_mean = GreedyNPPMean(student_2_score,
                          number_of_groups,
@@ -63,10 +98,10 @@ npp_ip_mean = NPPIPMean(student_2_score,
                         number_of_groups,
                         min_size,
                         max_size)
-ip_npp_mean_sol = npp_ip_mean.run(pulp.CPLEX, 30)
+ip_npp_mean_sol = npp_ip_mean.run(pulp.CPLEX, 30,
+                                  initial_partition=greedy_npp_mean_sol)
 print([len(studs) for studs in ip_npp_mean_sol.values()])
-print([np.mean([student_2_score[s] for s in studs])
-       for studs in ip_npp_mean_sol.values()])
+print(score_evaluator.evaluate(ip_npp_mean_sol)["means"])
 print(npp_ip_mean.model.objective.value())
 
 
@@ -86,12 +121,21 @@ ip_qcpp = QCPPIP(student_2_group,
                  min_size,
                  max_size)
 
-ip_qcpp_sol = ip_qcpp.run(pulp.PULP_CBC_CMD, 30)
+ip_qcpp_sol = ip_qcpp.run(pulp.PULP_CBC_CMD, 30,
+                          initial_partition=greedy_qcpp_sol)
 print([len(val) for val in ip_qcpp_sol.values()])
 
 for studs in ip_qcpp_sol.values():
     print(greedy_qcpp.get_density(studs))
 
+bb_qcpp = BranchAndBoundQCPP(student_2_group,
+                             number_of_groups,
+                             min_size,
+                             max_size)
+bb_qcpp_sol = bb_qcpp.run(timelimit=30)
+print([len(val) for val in bb_qcpp_sol.values()])
+print(bb_qcpp.objective_value, bb_qcpp.best_bound, bb_qcpp.optimal)
+
 
 ip_gini = GiniMinimization(student_2_group,
                            number_of_groups,
@@ -119,3 +163,27 @@ for studs in greedy_gini_sol.values():
     print(greedy_gini.get_gini_index(studs))
 
 
+# next term: two students leave, three enroll
+students = [s for s in student_2_score if s not in (0, 1)] \
+           + list(range(number_of_students, number_of_students + 3))
+similarity = SimilarityAssignment(greedy_gini_sol,
+                                  students,
+                                  number_of_groups,
+                                  min_size,
+                                  max_size)
+similarity_sol = similarity.run()
+
+print([len(val) for val in similarity_sol.values()])
+print(similarity.similarity)
+
+
+# the same instance as columns, with the partition as an array of labels
+table = StudentTable.from_scores(student_2_score)
+table_npp_total = GreedyNPPTotal(table,
+                                 number_of_groups,
+                                 min_size,
+                                 max_size)
+labels = table.get_labels(table_npp_total.run())
+
+print(labels)
+print(score_evaluator.get_totals(score_evaluator.get_labels(labels)))
@@ -0,0 +1,181 @@
+import functools
+import inspect
+import json
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+
+import pulp
+
+
+class RunMetrics:
+    def __init__(self, solver):
+        self.solver = solver
+        self.seconds = None
+        self.phases = {}
+        self.counts = {}
+        self.variables = {}
+        self.constraints = {}
+        self.nonzeros = None
+        self.status = None
+        self.sol_status = None
+        self.objective_value = None
+        self.best_bound = None
+        self.gap = None
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+def get_bound(log):
+    # the result block of a CBC log has "Lower bound:" when minimizing and
+    # "Upper bound:" when maximizing
+    match = re.search(r"^(?:Lower|Upper) bound:\s+(\S+)", log, re.MULTILINE)
+    return None if match is None else float(match.group(1))
+
+
+def get_gap(objective_value, best_bound):
+    if objective_value is None or best_bound is None:
+        return None
+    return abs(objective_value - best_bound) \
+        / max(abs(objective_value), 1e-10)
+
+
+def get_family(name):
+    # pulp names variables "<family>_<index>"
+    return name.split("_", 1)[0]
+
+
+def measured(run):
+    # a run method wrapped to collect metrics; nested run calls (a run
+    # that dispatches to run_lpt, for example) share the outer metrics
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        if self.metrics_depth:
+            return run(self, *args, **kwargs)
+        self.metrics = RunMetrics(type(self).__name__)
+        self.metrics_depth = 1
+        start = time.perf_counter()
+        try:
+            return run(self, *args, **kwargs)
+        finally:
+            self.metrics_depth = 0
+            self.metrics.seconds = time.perf_counter() - start
+            self.set_model_metrics()
+            self.emit("run", self.metrics.seconds)
+    return wrapper
+
+
+class Instrumented:
+    # set on a class or an instance: metrics_callback(event) is called and
+    # event is appended to the JSON lines file metrics_log_path after every
+    # phase and every run; the CBC bound is read only when one of them is
+    metrics_callback = None
+    metrics_log_path = None
+    metrics = None
+    metrics_depth = 0
+
+    def emit(self, phase, seconds):
+        if self.metrics_callback is None and self.metrics_log_path is None:
+            return
+        event = {"solver": self.metrics.solver,
+                 "phase": phase,
+                 "seconds": seconds,
+                 "time": time.time()}
+        if phase == "run":
+            event["metrics"] = self.metrics.to_dict()
+        # looked up statically, a function set on a class is not bound
+        callback = inspect.getattr_static(self, "metrics_callback")
+        if callback is not None:
+            callback(event)
+        if self.metrics_log_path is not None:
+            with open(self.metrics_log_path, "a") as f:
+                f.write(json.dumps(event, default=str) + "\n")
+
+    def count(self, name, number=1):
+        if self.metrics is not None:
+            self.metrics.counts[name] = \
+                self.metrics.counts.get(name, 0) + number
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if self.metrics is not None:
+                self.metrics.phases[name] = \
+                    self.metrics.phases.get(name, 0) + seconds
+                self.emit(name, seconds)
+
+    def get_number_of_constraints(self):
+        sparse_model = getattr(self, "sparse_model", None)
+        if sparse_model is not None:
+            return sum(len(rhs) for rhs in sparse_model.rhs)
+        model = getattr(self, "model", None)
+        if isinstance(model, pulp.LpProblem):
+            return len(model.constraints)
+        return 0
+
+    def run_phase(self, method, *args):
+        # constraints added by a create_*_con method are counted under its
+        # name
+        number_of_constraints = self.get_number_of_constraints()
+        with self.phase(method.__name__):
+            result = method(*args)
+        if self.metrics is not None \
+                and self.get_number_of_constraints() > number_of_constraints:
+            self.metrics.constraints[method.__name__] = \
+                self.get_number_of_constraints() - number_of_constraints
+        return result
+
+    def set_model_metrics(self):
+        sparse_model = getattr(self, "sparse_model", None)
+        model = getattr(self, "model", None)
+        if sparse_model is not None:
+            self.metrics.variables = {name: int(cols.size) for name, cols in
+                                      sparse_model.vars.items()}
+            self.metrics.nonzeros = sparse_model.get_number_of_nonzeros()
+            self.metrics.status = pulp.LpStatus[sparse_model.status]
+            self.metrics.sol_status = \
+                pulp.LpSolution[sparse_model.sol_status]
+            self.metrics.objective_value = sparse_model.objective_value
+        elif isinstance(model, pulp.LpProblem) and model.variables():
+            for var in model.variables():
+                family = get_family(var.name)
+                self.metrics.variables[family] = \
+                    self.metrics.variables.get(family, 0) + 1
+            self.metrics.nonzeros = sum(len(constraint) for constraint in
+                                        model.constraints.values())
+            self.metrics.status = pulp.LpStatus[model.status]
+            self.metrics.sol_status = pulp.LpSolution[model.sol_status]
+            self.metrics.objective_value = model.objective.value()
+        if self.metrics.sol_status == pulp.LpSolution[
+                pulp.LpSolutionOptimal]:
+            self.metrics.best_bound = self.metrics.objective_value
+        self.metrics.gap = get_gap(self.metrics.objective_value,
+                                   self.metrics.best_bound)
+
+    def get_solver(self, solver, **kwargs):
+        # with hooks set, CBC writes its log to a file to read the bound from
+        if (self.metrics_callback is not None
+                or self.metrics_log_path is not None) \
+                and "logPath" in inspect.signature(solver).parameters:
+            handle, self.solver_log_path = tempfile.mkstemp(suffix=".log")
+            os.close(handle)
+            kwargs.update(msg=False, logPath=self.solver_log_path)
+        else:
+            self.solver_log_path = None
+        return solver(**kwargs)
+
+    def solve(self, solve, solver):
+        with self.phase("solve"):
+            solve(solver)
+        if self.solver_log_path is not None and self.metrics is not None:
+            with open(self.solver_log_path) as f:
+                self.metrics.best_bound = get_bound(f.read())
+            os.remove(self.solver_log_path)
+            self.solver_log_path = None
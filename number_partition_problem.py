@@ -1,10 +1,20 @@
+import time
 from copy import deepcopy
+from heapq import heapify, heappop, heappush
 
 import pulp
 import numpy as np
 
+from bounds import ScoreBounds
+from local_search import LocalSearchNPPTotal
+from metrics import Instrumented, measured, get_gap
+from seats import SeatTracker
+from sparse_model import SparseBackend
+from student_table import read_scores
+from symmetry import SymmetryBreaking
 
-class GreedyNPPTotal:
+
+class GreedyNPPTotal(Instrumented):
     def __init__(self,
                  student_2_score,
                  number_of_groups,
@@ -12,43 +22,152 @@ class GreedyNPPTotal:
                  max_size,
                  ):
 
-        self.student_2_score = student_2_score
+        self.table, self.student_2_score = read_scores(student_2_score)
         self.number_of_groups = number_of_groups
         self.min_size = min_size
         self.max_size = max_size
 
         self.group_2_students = {g: [] for g in range(self.number_of_groups)}
         self.group_2_total_score = {g: 0 for g in range(self.number_of_groups)}
-        self.group_2_number_of_students = {g: 0 for g in
-                                           range(self.number_of_groups)}
-        self.number_of_students = len(student_2_score)
+        self.number_of_students = len(self.student_2_score)
+        self.seats = SeatTracker(self.number_of_students,
+                                 self.number_of_groups,
+                                 self.min_size,
+                                 self.max_size)
+        self.group_2_number_of_students = \
+            self.seats.group_2_number_of_students
 
     def get_remaining_seats(self, g):
-        return np.sum(np.clip(np.array(
-            [self.min_size - self.group_2_number_of_students[g_] for g_ in
-             self.group_2_total_score if g_ != g]),
-            min=0))
-
-    def get_group_candidates(self, i):
-        return [g for g in self.group_2_total_score
-                if self.get_remaining_seats(g) <= self.number_of_students - i]
-
-    def run(self):
-        for i, student in enumerate(sorted(self.student_2_score,
-                                           key=lambda s: self.student_2_score[s],
-                                           reverse=True),
-                                    start=1):
-
-            group = min(self.get_group_candidates(i),
-                        key=lambda g: self.group_2_total_score[g])
+        return self.seats.get_remaining_seats(g)
+
+    def get_group_candidates(self):
+        return self.seats.get_group_candidates()
+
+    def get_scores(self):
+        index_2_student = list(self.student_2_score)
+        scores = np.fromiter(self.student_2_score.values(), dtype=float,
+                             count=len(index_2_student))
+        return index_2_student, scores
+
+    def set_labels(self, index_2_student, scores, order, labels):
+        for j in order:
+            self.group_2_students[labels[j]].append(index_2_student[j])
+        totals = np.bincount(labels, weights=scores,
+                             minlength=self.number_of_groups)
+        sizes = np.bincount(labels, minlength=self.number_of_groups)
+        for g in range(self.number_of_groups):
+            self.group_2_total_score[g] += totals[g]
+            self.seats.add(g, int(sizes[g]))
+
+    @measured
+    def run_lpt(self):
+        index_2_student, scores = self.get_scores()
+        order = np.argsort(-scores, kind="stable")
+        labels = np.empty(len(scores), dtype=int)
+
+        totals = [0.0] * self.number_of_groups
+        sizes = [0] * self.number_of_groups
+        heap = [(0.0, g) for g in range(self.number_of_groups)]
+        deficit = self.number_of_groups * self.min_size
+        remaining = len(scores)
+        tight = False
+        for j in order.tolist():
+            # once the deficit equals the remaining students, only groups
+            # below min_size may receive one, and that lasts until the end
+            if not tight and deficit == remaining:
+                tight = True
+                heap = [(totals[g], g) for g in range(self.number_of_groups)
+                        if sizes[g] < self.min_size]
+                heapify(heap)
+
+            total, g = heappop(heap)
+            labels[j] = g
+            totals[g] = total + scores[j]
+            if sizes[g] < self.min_size:
+                deficit -= 1
+            sizes[g] += 1
+            remaining -= 1
+
+            if sizes[g] < (self.min_size if tight else self.max_size):
+                heappush(heap, (totals[g], g))
+
+        self.set_labels(index_2_student, scores, order, labels)
+        self.count("iterations", len(scores))
+        return self.group_2_students
+
+    @measured
+    def run_karmarkar_karp(self):
+        # balanced differencing: every k-tuple gives one student to each
+        # group, so the sizes end up within one of each other, which is
+        # feasible whenever any partition within min_size/max_size is
+        index_2_student, scores = self.get_scores()
+        order = np.argsort(-scores, kind="stable")
+        k = self.number_of_groups
+        number_of_tuples = -(-len(scores) // k)
+
+        padded = np.zeros(number_of_tuples * k)
+        padded[:len(scores)] = scores[order]
+        parents = np.arange(number_of_tuples * k)
+
+        heap = []
+        for t in range(number_of_tuples):
+            # the zero pads of the last tuple go above negative scores
+            slots = np.arange(t * k, (t + 1) * k)
+            slots = slots[np.argsort(-padded[slots], kind="stable")]
+            sums = padded[slots]
+            heap.append((sums[-1] - sums[0], t, sums, slots))
+        heapify(heap)
+
+        counter = number_of_tuples
+        while len(heap) > 1:
+            _, _, sums_a, slots_a = heappop(heap)
+            _, _, sums_b, slots_b = heappop(heap)
+            parents[slots_b[::-1]] = slots_a
+            sums = sums_a + sums_b[::-1]
+            slot_order = np.argsort(-sums, kind="stable")
+            sums, slots = sums[slot_order], slots_a[slot_order]
+            heappush(heap, (sums[-1] - sums[0], counter, sums, slots))
+            counter += 1
+            self.count("iterations")
+
+        while True:
+            grand_parents = parents[parents]
+            if np.array_equal(grand_parents, parents):
+                break
+            parents = grand_parents
+
+        _, _, _, slots = heap[0]
+        slot_2_group = np.empty(len(parents), dtype=int)
+        slot_2_group[slots] = np.arange(k)
+        labels = np.empty(len(scores), dtype=int)
+        labels[order] = slot_2_group[parents[:len(scores)]]
+
+        self.set_labels(index_2_student, scores, order, labels)
+        return self.group_2_students
+
+    @measured
+    def run(self, method="scan"):
+        if method == "lpt":
+            return self.run_lpt()
+        if method == "kk":
+            return self.run_karmarkar_karp()
+
+        for student in sorted(self.student_2_score,
+                              key=lambda s: self.student_2_score[s],
+                              reverse=True):
+
+            candidates = self.get_group_candidates()
+            group = min(candidates, key=lambda g: self.group_2_total_score[g])
+            self.count("iterations")
+            self.count("evaluations", len(candidates))
             self.group_2_students[group].append(student)
             self.group_2_total_score[group] += self.student_2_score[student]
-            self.group_2_number_of_students[group] += 1
+            self.seats.add(group)
 
         return self.group_2_students
 
 
-class GreedyNPPMean:
+class GreedyNPPMean(Instrumented):
     def __init__(self,
                  student_2_score,
                  number_of_groups,
@@ -56,38 +175,138 @@ class GreedyNPPMean:
                  max_size,
                  ):
 
-        self.student_2_score = student_2_score
+        self.table, self.student_2_score = read_scores(student_2_score)
         self.number_of_groups = number_of_groups
         self.min_size = min_size
         self.max_size = max_size
 
         self.group_2_students = {g: [] for g in range(self.number_of_groups)}
         self.group_2_mean_score = {g: 0 for g in range(self.number_of_groups)}
-        self.group_2_number_of_students = {g: 0 for g in
-                                           range(self.number_of_groups)}
-        self.number_of_students = len(student_2_score)
+        self.number_of_students = len(self.student_2_score)
+        self.seats = SeatTracker(self.number_of_students,
+                                 self.number_of_groups,
+                                 self.min_size,
+                                 self.max_size)
+        self.group_2_number_of_students = \
+            self.seats.group_2_number_of_students
 
     def get_remaining_seats(self, g):
-        return np.sum(np.clip(np.array(
-            [self.min_size - self.group_2_number_of_students[g_] for g_ in
-             self.group_2_mean_score if g_ != g]),
-            min=0))
+        return self.seats.get_remaining_seats(g)
 
-    def get_group_candidates(self, i):
-        return [g for g in self.group_2_mean_score
-                if self.get_remaining_seats(g) <= self.number_of_students - i]
+    def get_group_candidates(self):
+        return self.seats.get_group_candidates()
 
     def get_mean_score(self, students):
         return np.mean([self.student_2_score[s] for s in students])
 
-    def run(self):
+    def get_min_other_mean_scores(self, mean_scores, candidates):
+        if len(mean_scores) == 1:
+            return np.full(len(candidates), np.inf)
+        first, second = np.argsort(mean_scores, kind="stable")[:2]
+        return np.where(candidates == first, mean_scores[second],
+                        mean_scores[first])
+
+    def get_exact_objective_values(self, candidates, indices, rows, cols,
+                                   index_2_student, min_mean_scores):
+        # the objective values of the given (row, col) pairs as run computes
+        # them, with np.mean over the group and the student, once per group
+        # and score
+        values = np.empty(len(rows))
+        for row in np.unique(rows).tolist():
+            group = self.group_2_students[int(candidates[row])]
+            positions = np.flatnonzero(rows == row)
+            students = [index_2_student[j] for j in indices[cols[positions]]]
+            score_2_value = {}
+            for position, s in zip(positions.tolist(), students):
+                score = self.student_2_score[s]
+                if score not in score_2_value:
+                    score_2_value[score] = min(
+                        min_mean_scores[row],
+                        self.get_mean_score(group + [s]))
+                values[position] = score_2_value[score]
+        return values
+
+    @measured
+    def run_batched(self):
+        # the running totals only shortlist the best steps; the shortlisted
+        # ones are recomputed with np.mean as run does, so that float ties
+        # break the same way
+        index_2_student = list(self.student_2_score)
+        student_2_index = {s: j for j, s in enumerate(index_2_student)}
+        scores = np.array([self.student_2_score[s] for s in index_2_student],
+                          dtype=float)
+        remaining = np.ones(len(index_2_student), dtype=bool)
+        tolerance = 1e-9 * (np.abs(scores).max(initial=0) + 1)
+
+        total_scores = np.zeros(self.number_of_groups)
+        numbers_of_students = np.zeros(self.number_of_groups)
+        mean_scores = np.zeros(self.number_of_groups)
+
+        students = set(self.student_2_score.keys())
+        while students:
+            candidates = np.array(self.get_group_candidates())
+            indices = np.flatnonzero(remaining)
+
+            group_2_mean_score = ((total_scores[candidates, None]
+                                   + scores[None, indices])
+                                  / (numbers_of_students[candidates, None]
+                                     + 1))
+            min_mean_scores = self.get_min_other_mean_scores(mean_scores,
+                                                             candidates)
+            group_2_of = np.minimum(min_mean_scores[:, None],
+                                    group_2_mean_score)
+
+            rows, cols = np.nonzero(group_2_of
+                                    >= group_2_of.max() - tolerance)
+            # a step whose mean clearly exceeds the smallest other mean has
+            # that mean as its value, exactly
+            values = min_mean_scores[rows]
+            exact = group_2_mean_score[rows, cols] <= values + tolerance
+            values[exact] = self.get_exact_objective_values(
+                candidates, indices, rows[exact], cols[exact],
+                index_2_student, min_mean_scores)
+            best = values == values.max()
+            rows, cols = rows[best], cols[best]
+
+            # ties are broken as a scan over students, then groups, would
+            if np.all(cols == cols[0]):
+                j = indices[cols[0]]
+                student = index_2_student[j]
+            else:
+                tied = np.zeros(len(index_2_student), dtype=bool)
+                tied[indices[cols]] = True
+                student = next(s for s in students
+                               if tied[student_2_index[s]])
+                j = student_2_index[student]
+            group = int(candidates[rows[indices[cols] == j].min()])
+            self.count("iterations")
+            self.count("evaluations", len(candidates) * len(indices))
+
+            students = students - {student}
+            remaining[j] = False
+
+            total_scores[group] += scores[j]
+            numbers_of_students[group] += 1
+            self.group_2_students[group].append(student)
+            mean_scores[group] = self.get_mean_score(
+                self.group_2_students[group])
+
+            self.group_2_mean_score[group] = mean_scores[group]
+            self.seats.add(group)
+
+        return self.group_2_students
+
+    @measured
+    def run(self, batched=False):
+        if batched:
+            return self.run_batched()
+
         students = set(self.student_2_score.keys())
-        i = 1
         while students:
             group_2_of = {}
             group_2_mean_score = {}
             for student in students:
-                for group in self.get_group_candidates(i):
+                for group in self.get_group_candidates():
                     group_2_student_pre = deepcopy(self.group_2_students)
                     group_2_student_pre[group].append(student)
                     group_2_mean_score[group, student] = self.get_mean_score(
@@ -103,25 +322,26 @@ class GreedyNPPMean:
             group, student = max(group_2_of,
                                  key=lambda seq:
                                  group_2_of[seq[0], seq[1]])
+            self.count("iterations")
+            self.count("evaluations", len(group_2_of))
 
             students = students - {student}
 
             self.group_2_students[group].append(student)
             self.group_2_mean_score[group] = group_2_mean_score[group, student]
-            self.group_2_number_of_students[group] += 1
-            i += 1
+            self.seats.add(group)
 
         return self.group_2_students
 
 
-class NPPIPTotal:
+class NPPIPTotal(SymmetryBreaking, SparseBackend, Instrumented):
     def __init__(self,
                  student_2_score,
                  number_of_groups,
                  min_size,
                  max_size,
                  ):
-        self.student_2_score = student_2_score
+        self.table, self.student_2_score = read_scores(student_2_score)
         self.number_of_groups = number_of_groups
         self.min_size = min_size
         self.max_size = max_size
@@ -164,40 +384,245 @@ class NPPIPTotal:
                                                    self.student_2_score.items()
                                                    )
 
-    def run(self, solver=pulp.COIN, timelimit=1800):
-        self.create_vars()
-        self.create_of()
-        self.create_assignment_con()
-        self.create_size_con()
-        self.create_gamma_con()
+    def create_model(self):
+        self.run_phase(self.create_vars)
+        self.run_phase(self.create_of)
+        self.run_phase(self.create_assignment_con)
+        self.run_phase(self.create_size_con)
+        self.run_phase(self.create_gamma_con)
+
+    def set_initial_values(self, group_2_students):
+        super().set_initial_values(group_2_students)
+        self.gamma.setInitialValue(min(
+            sum(self.student_2_score[s] for s in students)
+            for students in group_2_students.values()))
+
+    def create_sparse_model(self):
+        self.create_sparse_x_vars(pulp.LpMaximize)
+        k, n = self.sparse_x.shape
+        scores = np.array([self.student_2_score[s] for s in
+                           self.sparse_students], dtype=float)
+        gamma = self.sparse_model.add_vars("gamma", 1, up=scores.sum())[0]
+        self.sparse_model.set_objective(gamma, 1)
+
+        self.create_sparse_assignment_con()
+        rows = np.repeat(np.arange(k), n)
+        self.sparse_model.add_cons(rows, self.sparse_x, 1, "G",
+                                   np.full(k, self.min_size))
+        self.sparse_model.add_cons(rows, self.sparse_x, 1, "L",
+                                   np.full(k, self.max_size))
+        self.sparse_model.add_cons(
+            np.concatenate((np.arange(k), rows)),
+            np.concatenate((np.full(k, gamma), self.sparse_x.ravel())),
+            np.concatenate((np.ones(k), -np.tile(scores, k))),
+            "L", np.zeros(k))
+
+    @measured
+    def run(self, solver=pulp.COIN, timelimit=1800, symmetry_breaking=None,
+            initial_partition=None, backend="pulp"):
+        if backend == "sparse":
+            return self.run_sparse(solver, timelimit, symmetry_breaking,
+                                   initial_partition)
+
+        self.create_model()
+        if symmetry_breaking is not None:
+            self.run_phase(self.create_symmetry_con, symmetry_breaking)
+        if initial_partition is not None:
+            self.run_phase(self.set_initial_values,
+                           self.order_groups(initial_partition,
+                                             symmetry_breaking))
+
+        self.solve(self.model.solve,
+                   self.get_solver(solver, msg=True, timeLimit=timelimit,
+                                   warmStart=initial_partition is not None))
+
+        self.run_phase(self.extract_solution)
 
-        self.model.solve(solver(msg=True, timeLimit=timelimit))
+        return self.group_2_students
 
-        for (k, s), var in self.x_vars.items():
-            if round(var.varValue) == 1:
-                self.group_2_students[k].append(s)
 
+class BranchAndBoundNPPTotal(GreedyNPPTotal):
+    # depth-first search over the students by decreasing score, each one
+    # tried in every group with a free seat, lowest total first; groups with
+    # the same total and size are interchangeable and tried once. A node is
+    # pruned when its bound on the smallest total cannot beat the incumbent:
+    # the water level of the positive remaining scores poured over the
+    # totals, and for every group its total plus the largest sum of
+    # remaining scores it can take
+    tolerance = 1e-9
+
+    def get_incumbent(self, initial_partition, timelimit):
+        partitions = [] if initial_partition is None else [initial_partition]
+        for method in ("lpt", "kk"):
+            partitions.append(GreedyNPPTotal(self.student_2_score,
+                                             self.number_of_groups,
+                                             self.min_size,
+                                             self.max_size).run(method))
+        best, best_value = None, -np.inf
+        for group_2_students in partitions:
+            local_search = LocalSearchNPPTotal(self.student_2_score,
+                                               self.number_of_groups,
+                                               self.min_size,
+                                               self.max_size)
+            group_2_students = local_search.run(group_2_students,
+                                                timelimit=timelimit)
+            if local_search.get_objective_value() > best_value:
+                best = group_2_students
+                best_value = local_search.get_objective_value()
+        return best, best_value
+
+    def get_bounds(self, totals, counts, first):
+        # bounds of the nodes in the rows of totals and counts, with the
+        # sorted scores from position first on still to be placed
+        remaining = len(self.sorted_scores) - first
+        free = self.max_size - counts
+        need = np.maximum(self.min_size - counts, 0)
+        feasible = (need.sum(axis=1) <= remaining) \
+            & (free.sum(axis=1) >= remaining)
+
+        # the sums of the m largest remaining scores grow while the scores
+        # are positive, so the best size lies between need and free
+        positive = max(self.number_of_positive - first, 0)
+        sizes = np.clip(positive, need, np.minimum(free, remaining))
+        largest = self.suffix[first] - self.suffix[first + sizes]
+        level = (np.cumsum(np.sort(totals, axis=1), axis=1)
+                 + self.suffix[first] - self.suffix[first + positive]) \
+            / np.arange(1, totals.shape[1] + 1)
+        bounds = np.minimum((totals + largest).min(axis=1), level.min(axis=1))
+        if self.integral:
+            bounds = np.floor(bounds + self.tolerance)
+        return np.where(feasible, bounds, -np.inf)
+
+    def get_children(self, totals, counts, position, best_value):
+        # (bound, group) pairs, the group to try first at the end
+        candidates, seen = [], set()
+        for g in np.argsort(totals, kind="stable").tolist():
+            if counts[g] < self.max_size \
+                    and (totals[g], counts[g]) not in seen:
+                seen.add((totals[g], counts[g]))
+                candidates.append(g)
+        rows = np.arange(len(candidates))
+        child_totals = np.repeat(totals[None], len(candidates), axis=0)
+        child_totals[rows, candidates] += self.sorted_scores[position]
+        child_counts = np.repeat(counts[None], len(candidates), axis=0)
+        child_counts[rows, candidates] += 1
+        bounds = self.get_bounds(child_totals, child_counts, position + 1)
+        self.count("evaluations", len(candidates))
+        return [(bound, g) for bound, g in
+                zip(bounds.tolist()[::-1], candidates[::-1])
+                if bound > best_value + self.tolerance]
+
+    @measured
+    def run(self, timelimit=60, node_limit=None, initial_partition=None):
+        start = time.perf_counter()
+        index_2_student, scores = self.get_scores()
+        order = np.argsort(-scores, kind="stable")
+        self.sorted_scores = scores[order]
+        self.suffix = np.append(np.cumsum(self.sorted_scores[::-1])[::-1], 0)
+        self.number_of_positive = int(np.sum(self.sorted_scores > 0))
+        self.integral = bool(np.all(scores == np.round(scores)))
+        n, k = len(scores), self.number_of_groups
+
+        incumbent, best_value = self.get_incumbent(initial_partition,
+                                                   timelimit / 10)
+        student_2_position = {index_2_student[j]: p for p, j in
+                              enumerate(order.tolist())}
+        best_labels = np.empty(n, dtype=int)
+        for g, students in incumbent.items():
+            for s in students:
+                best_labels[student_2_position[s]] = g
+
+        totals = np.zeros(k)
+        counts = np.zeros(k, dtype=int)
+        labels = np.full(n, -1)
+        stack = [self.get_children(totals, counts, 0, best_value)] if n \
+            else []
+        self.number_of_nodes = 0
+        complete = True
+        while stack:
+            position = len(stack) - 1
+            children = stack[-1]
+            if labels[position] >= 0:
+                g = labels[position]
+                totals[g] -= self.sorted_scores[position]
+                counts[g] -= 1
+                labels[position] = -1
+            while children and children[-1][0] <= best_value + self.tolerance:
+                children.pop()
+            if not children:
+                stack.pop()
+                continue
+            if node_limit is not None and self.number_of_nodes >= node_limit \
+                    or self.number_of_nodes % 1000 == 0 \
+                    and time.perf_counter() - start > timelimit:
+                complete = False
+                break
+
+            _, g = children.pop()
+            totals[g] += self.sorted_scores[position]
+            counts[g] += 1
+            labels[position] = g
+            self.number_of_nodes += 1
+            if position == n - 1:
+                best_value = totals.min()
+                best_labels = labels.copy()
+            else:
+                stack.append(self.get_children(totals, counts, position + 1,
+                                               best_value))
+
+        # the nodes left on the stack are all that can still beat the
+        # incumbent
+        self.objective_value = float(best_value)
+        self.best_bound = max([self.objective_value]
+                              + [bound for children in stack
+                                 for bound, _ in children])
+        self.optimal = complete
+        self.gap = get_gap(self.objective_value, self.best_bound)
+        self.count("nodes", self.number_of_nodes)
+        if self.metrics is not None:
+            self.metrics.status = pulp.LpStatus[pulp.LpStatusOptimal
+                                                if complete else
+                                                pulp.LpStatusNotSolved]
+            self.metrics.sol_status = pulp.LpSolution[
+                pulp.LpSolutionOptimal if complete
+                else pulp.LpSolutionIntegerFeasible]
+            self.metrics.objective_value = self.objective_value
+            self.metrics.best_bound = self.best_bound
+
+        index_labels = np.empty(n, dtype=int)
+        index_labels[order] = best_labels
+        self.set_labels(index_2_student, scores, order, index_labels)
         return self.group_2_students
 
 
-class NPPIPMean:
+class NPPIPMean(SymmetryBreaking, SparseBackend, Instrumented):
     def __init__(self,
                  student_2_score,
                  number_of_groups,
                  min_size,
                  max_size,
                  ):
-        self.student_2_score = student_2_score
+        self.table, self.student_2_score = read_scores(student_2_score)
         self.number_of_groups = number_of_groups
         self.min_size = min_size
         self.max_size = max_size
 
-        self.big_M = 1_000_000
+        self.bounds = ScoreBounds(self.student_2_score.values(),
+                                  self.min_size,
+                                  self.max_size)
+        self.big_M = {size: self.get_big_M(size) for size in
+                      range(self.min_size, self.max_size + 1)}
 
         self.group_2_students = {g: [] for g in range(self.number_of_groups)}
 
         self.model = pulp.LpProblem("NPP", pulp.LpMaximize)
 
+    def get_big_M(self, size):
+        # gamma - total / size <= M for the groups of every other size
+        return max([0] + [self.bounds.get_mean()
+                          - self.bounds.get_lowest_total(other) / size
+                          for other in self.bounds.sizes if other != size])
+
     def create_vars(self):
         x_indices = [(k, v) for k in range(self.number_of_groups)
                      for v in self.student_2_score]
@@ -212,7 +637,7 @@ class NPPIPMean:
         self.gamma = pulp.LpVariable(name="gamma",
                                      cat=pulp.LpContinuous,
                                      lowBound=0,
-                                     upBound=sum(self.student_2_score.values())
+                                     upBound=self.bounds.get_mean()
                                      )
 
     def create_of(self):
@@ -243,20 +668,72 @@ class NPPIPMean:
                 total_score = pulp.lpSum(r * self.x_vars[k, s] for s, r in
                                          self.student_2_score.items())
                 self.model += self.gamma <= total_score / size \
-                    + self.big_M * (1 - self.z_vars[k, size])
-
-    def run(self, solver=pulp.COIN, timelimit=1800):
-        self.create_vars()
-        self.create_of()
-        self.create_assignment_con()
-        self.create_size_con()
-        self.create_one_size_con()
-        self.create_gamma_con()
-
-        self.model.solve(solver(msg=True, timeLimit=timelimit))
-
-        for (k, s), var in self.x_vars.items():
-            if round(var.varValue) == 1:
-                self.group_2_students[k].append(s)
+                    + self.big_M[size] * (1 - self.z_vars[k, size])
+
+    def create_model(self):
+        self.run_phase(self.create_vars)
+        self.run_phase(self.create_of)
+        self.run_phase(self.create_assignment_con)
+        self.run_phase(self.create_size_con)
+        self.run_phase(self.create_one_size_con)
+        self.run_phase(self.create_gamma_con)
+
+    def set_initial_values(self, group_2_students):
+        super().set_initial_values(group_2_students)
+        for k, students in group_2_students.items():
+            self.z_vars[k, len(students)].setInitialValue(1)
+        self.gamma.setInitialValue(min(
+            sum(self.student_2_score[s] for s in students) / len(students)
+            for students in group_2_students.values()))
+
+    def create_sparse_model(self):
+        self.create_sparse_x_vars(pulp.LpMaximize)
+        self.create_sparse_z_vars()
+        k, n = self.sparse_x.shape
+        sizes = self.get_sparse_sizes()
+        scores = np.array([self.student_2_score[s] for s in
+                           self.sparse_students], dtype=float)
+        gamma = self.sparse_model.add_vars("gamma", 1,
+                                           up=self.bounds.get_mean())[0]
+        self.sparse_model.set_objective(gamma, 1)
+
+        self.create_sparse_assignment_con()
+        self.create_sparse_size_con()
+        self.create_sparse_one_size_con()
+
+        # gamma - total / size + M * z <= M for every (group, size)
+        big_M = np.tile([self.big_M[size] for size in sizes.tolist()], k)
+        rows = np.arange(k * len(sizes)).reshape(k, len(sizes))
+        self.sparse_model.add_cons(
+            np.concatenate((rows.ravel(), rows.ravel(),
+                            np.repeat(rows.ravel(), n))),
+            np.concatenate((np.full(rows.size, gamma), self.sparse_z.ravel(),
+                            np.repeat(self.sparse_x, len(sizes), axis=0)
+                            .ravel())),
+            np.concatenate((np.ones(rows.size), big_M,
+                            -np.tile(scores[None, :] / sizes[:, None],
+                                     (k, 1)).ravel())),
+            "L", big_M)
+
+    @measured
+    def run(self, solver=pulp.COIN, timelimit=1800, symmetry_breaking=None,
+            initial_partition=None, backend="pulp"):
+        if backend == "sparse":
+            return self.run_sparse(solver, timelimit, symmetry_breaking,
+                                   initial_partition)
+
+        self.create_model()
+        if symmetry_breaking is not None:
+            self.run_phase(self.create_symmetry_con, symmetry_breaking)
+        if initial_partition is not None:
+            self.run_phase(self.set_initial_values,
+                           self.order_groups(initial_partition,
+                                             symmetry_breaking))
+
+        self.solve(self.model.solve,
+                   self.get_solver(solver, msg=True, timeLimit=timelimit,
+                                   warmStart=initial_partition is not None))
+
+        self.run_phase(self.extract_solution)
 
         return self.group_2_students
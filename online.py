@@ -0,0 +1,289 @@
+import heapq
+
+from local_search import LocalSearchNPPTotal, LocalSearchNPPMean, \
+    LocalSearchQCPP
+
+
+class GroupHeap:
+    # heap of (key, group) entries; an entry goes stale when the group's key
+    # or status changes and is dropped once it reaches the top, and the heap
+    # is rebuilt from its valid entries when it doubles, so that it stays
+    # within twice the number of groups
+    min_capacity = 16
+
+    def __init__(self, is_valid):
+        self.heap = []
+        self.is_valid = is_valid
+        self.capacity = self.min_capacity
+
+    def push(self, key, g):
+        heapq.heappush(self.heap, (key, g))
+        if len(self.heap) > self.capacity:
+            self.compact()
+
+    def compact(self):
+        # a group has at most one valid key, possibly pushed more than once
+        self.heap = list({entry for entry in self.heap
+                          if self.is_valid(*entry)})
+        heapq.heapify(self.heap)
+        self.capacity = max(2 * len(self.heap), self.min_capacity)
+
+    def get_top(self):
+        while self.heap and not self.is_valid(*self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][1] if self.heap else None
+
+
+class OnlineAssigner:
+    # places arriving students one at a time: groups below min_size are
+    # served first, full groups never; every rebalance_every arrivals a
+    # local search of at most rebalance_steps moves or swaps runs
+    def init_online(self, rebalance_every, rebalance_steps,
+                    initial_partition):
+        # the students given to the constructor keep their groups in
+        # initial_partition, and the others are seated as arrivals would be
+        self.rebalance_every = rebalance_every
+        self.rebalance_steps = rebalance_steps
+        self.number_of_arrivals = 0
+        group_2_students = {g: [] for g in range(self.number_of_groups)}
+        group_2_students.update(initial_partition or {})
+        self.set_partition(group_2_students)
+        seated = {s for students in group_2_students.values()
+                  for s in students}
+        for student in self.get_students():
+            if student not in seated:
+                self.seat(student)
+
+    def is_deficit(self, g):
+        return len(self.group_2_students[g]) < self.min_size
+
+    def is_open(self, g):
+        return len(self.group_2_students[g]) < self.max_size
+
+    def create_heaps(self):
+        raise NotImplementedError
+
+    def push_group(self, g, s):
+        raise NotImplementedError
+
+    def get_group(self, s):
+        raise NotImplementedError
+
+    def set_student(self, s, value):
+        raise NotImplementedError
+
+    def get_students(self):
+        raise NotImplementedError
+
+    def set_partition(self, group_2_students):
+        super().set_partition(group_2_students)
+        self.create_heaps()
+
+    def seat(self, student):
+        group = self.get_group(student)
+        if group is None:
+            raise ValueError("all groups are full")
+
+        self.group_2_students[group].append(student)
+        self.add_to_state(group, student)
+        self.group_2_value[group] = self.get_value(group)
+        self.push_group(group, student)
+        return group
+
+    def add(self, student, value):
+        self.set_student(student, value)
+        group = self.seat(student)
+
+        self.number_of_arrivals += 1
+        if self.rebalance_every \
+                and self.number_of_arrivals % self.rebalance_every == 0:
+            self.rebalance(self.rebalance_steps)
+        return group
+
+    def rebalance(self, max_steps):
+        # while enrolment starts, an empty group pins the minimum and the
+        # next arrivals fill it anyway
+        if not all(self.group_2_students.values()):
+            return
+        for _ in range(max_steps):
+            if not self.improve():
+                break
+        self.create_heaps()
+
+
+class OnlineNPPTotal(OnlineAssigner, LocalSearchNPPTotal):
+    def __init__(self,
+                 student_2_score,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 rebalance_every=0,
+                 rebalance_steps=10,
+                 initial_partition=None,
+                 ):
+        super().__init__(dict(student_2_score),
+                         number_of_groups,
+                         min_size,
+                         max_size)
+        self.init_online(rebalance_every, rebalance_steps, initial_partition)
+
+    def set_student(self, s, value):
+        self.student_2_score[s] = value
+
+    def get_students(self):
+        return list(self.student_2_score)
+
+    def create_heaps(self):
+        self.deficit_heap = GroupHeap(
+            lambda key, g: self.is_deficit(g)
+            and key == self.group_2_total_score[g])
+        self.open_heap = GroupHeap(
+            lambda key, g: self.is_open(g)
+            and key == self.group_2_total_score[g])
+        for g in self.group_2_students:
+            self.push_group(g, None)
+
+    def push_group(self, g, s):
+        if self.is_deficit(g):
+            self.deficit_heap.push(self.group_2_total_score[g], g)
+        if self.is_open(g):
+            self.open_heap.push(self.group_2_total_score[g], g)
+
+    def get_group(self, s):
+        # the smallest total gains the most
+        group = self.deficit_heap.get_top()
+        if group is None:
+            group = self.open_heap.get_top()
+        return group
+
+
+class OnlineNPPMean(OnlineAssigner, LocalSearchNPPMean):
+    def __init__(self,
+                 student_2_score,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 rebalance_every=0,
+                 rebalance_steps=10,
+                 initial_partition=None,
+                 ):
+        super().__init__(dict(student_2_score),
+                         number_of_groups,
+                         min_size,
+                         max_size)
+        self.init_online(rebalance_every, rebalance_steps, initial_partition)
+
+    def set_student(self, s, value):
+        self.student_2_score[s] = value
+
+    def get_students(self):
+        return list(self.student_2_score)
+
+    def create_heaps(self):
+        # (min mean, max mean) heaps of the deficit and of the open groups
+        self.deficit_heaps = (
+            GroupHeap(lambda key, g: self.is_deficit(g)
+                      and key == self.group_2_value[g]),
+            GroupHeap(lambda key, g: self.is_deficit(g)
+                      and key == -self.group_2_value[g]))
+        self.open_heaps = (
+            GroupHeap(lambda key, g: self.is_open(g)
+                      and key == self.group_2_value[g]),
+            GroupHeap(lambda key, g: self.is_open(g)
+                      and key == -self.group_2_value[g]))
+        for g in self.group_2_students:
+            self.push_group(g, None)
+
+    def push_group(self, g, s):
+        value = self.group_2_value[g]
+        if self.is_deficit(g):
+            self.deficit_heaps[0].push(value, g)
+            self.deficit_heaps[1].push(-value, g)
+        if self.is_open(g):
+            self.open_heaps[0].push(value, g)
+            self.open_heaps[1].push(-value, g)
+
+    def get_group(self, s):
+        # a score above the lowest mean lifts it; a lower score goes where
+        # the mean stays highest
+        min_heap, max_heap = self.deficit_heaps
+        if min_heap.get_top() is None:
+            min_heap, max_heap = self.open_heaps
+        group = min_heap.get_top()
+        if group is None \
+                or self.student_2_score[s] >= self.group_2_value[group]:
+            return group
+        return max_heap.get_top()
+
+
+class OnlineQCPP(OnlineAssigner, LocalSearchQCPP):
+    def __init__(self,
+                 student_2_group,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 rebalance_every=0,
+                 rebalance_steps=10,
+                 initial_partition=None,
+                 ):
+        super().__init__(dict(student_2_group),
+                         number_of_groups,
+                         min_size,
+                         max_size)
+        self.init_online(rebalance_every, rebalance_steps, initial_partition)
+
+    def set_student(self, s, value):
+        self.student_2_group[s] = value
+
+    def get_students(self):
+        return list(self.student_2_group)
+
+    def get_cohort_size(self, g, c):
+        return self.group_2_cohort_2_size[g].get(c, 0)
+
+    def get_cohort_heaps(self, c):
+        # (deficit, open) heaps of the groups holding cohort c, by the
+        # number of its students, largest first
+        if c not in self.cohort_2_heaps:
+            self.cohort_2_heaps[c] = (
+                GroupHeap(lambda key, g: self.is_deficit(g)
+                          and key == -self.get_cohort_size(g, c)),
+                GroupHeap(lambda key, g: self.is_open(g)
+                          and key == -self.get_cohort_size(g, c)))
+        return self.cohort_2_heaps[c]
+
+    def create_heaps(self):
+        self.cohort_2_heaps = {}
+        self.size_heaps = (
+            GroupHeap(lambda key, g: self.is_deficit(g)
+                      and key == len(self.group_2_students[g])),
+            GroupHeap(lambda key, g: self.is_open(g)
+                      and key == len(self.group_2_students[g])))
+        for g, cohort_2_size in self.group_2_cohort_2_size.items():
+            for c in cohort_2_size:
+                self.push_cohort(g, c)
+            self.push_group(g, None)
+
+    def push_cohort(self, g, c):
+        size = self.group_2_cohort_2_size[g][c]
+        deficit_heap, open_heap = self.get_cohort_heaps(c)
+        if self.is_deficit(g):
+            deficit_heap.push(-size, g)
+        if self.is_open(g):
+            open_heap.push(-size, g)
+
+    def push_group(self, g, s):
+        if s is not None:
+            self.push_cohort(g, self.student_2_group[s])
+        if self.is_deficit(g):
+            self.size_heaps[0].push(len(self.group_2_students[g]), g)
+        if self.is_open(g):
+            self.size_heaps[1].push(len(self.group_2_students[g]), g)
+
+    def get_group(self, s):
+        # join the most classmates, otherwise the smallest group
+        i = 0 if self.size_heaps[0].get_top() is not None else 1
+        group = self.get_cohort_heaps(self.student_2_group[s])[i].get_top()
+        if group is None:
+            group = self.size_heaps[i].get_top()
+        return group
@@ -0,0 +1,184 @@
+import multiprocessing
+import os
+import queue
+import signal
+import time
+
+import pulp
+
+from number_partition_problem import GreedyNPPTotal, NPPIPTotal, \
+    BranchAndBoundNPPTotal, GreedyNPPMean, NPPIPMean
+from quasi_clique_partitioning import GreedyQCPP, BranchAndBoundQCPP, QCPPIP, \
+    CohortQCPPIP
+from gini import GreedyGini, GiniMinimization, CompactGiniMinimization, \
+    ParametricGiniMinimization
+from local_search import LocalSearchNPPTotal, LocalSearchNPPMean, \
+    LocalSearchGini, LocalSearchQCPP
+from symmetry import SymmetryBreaking
+
+
+criterion_2_solvers = {
+    "total": [GreedyNPPTotal, NPPIPTotal, BranchAndBoundNPPTotal],
+    "mean": [GreedyNPPMean, NPPIPMean],
+    "gini": [GreedyGini, GiniMinimization, CompactGiniMinimization,
+             ParametricGiniMinimization],
+    "density": [GreedyQCPP, QCPPIP, CohortQCPPIP, BranchAndBoundQCPP],
+}
+
+# the local search classes double as the common objective of a criterion
+criterion_2_evaluator = {
+    "total": LocalSearchNPPTotal,
+    "mean": LocalSearchNPPMean,
+    "gini": LocalSearchGini,
+    "density": LocalSearchQCPP,
+}
+
+
+def is_optimal(solver):
+    # only the IP models and the branch and bound can certify optimality;
+    # the solvers that run several searches record it themselves
+    if isinstance(solver, (BranchAndBoundNPPTotal, BranchAndBoundQCPP,
+                           ParametricGiniMinimization)):
+        return getattr(solver, "optimal", False)
+    if not isinstance(solver, SymmetryBreaking):
+        return False
+    model = getattr(solver, "sparse_model", None) or solver.model
+    return model.sol_status == pulp.LpSolutionOptimal
+
+
+def run_solver(index, cls, instance, kwargs, results):
+    # own process group, so that the solver's CBC child is cancelled
+    # together with the worker
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    start = time.perf_counter()
+    try:
+        solver = cls(*instance)
+        group_2_students = solver.run(**kwargs)
+        results.put((index, group_2_students, is_optimal(solver),
+                     time.perf_counter() - start, None))
+    except Exception as error:
+        results.put((index, None, False, time.perf_counter() - start,
+                     repr(error)))
+
+
+def stop_process(process):
+    if process.is_alive() and hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            pass
+    process.terminate()
+    process.join()
+
+
+class Portfolio:
+    def __init__(self,
+                 student_2_data,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 criterion,
+                 solvers=None,
+                 ):
+        self.student_2_data = student_2_data
+        self.number_of_groups = number_of_groups
+        self.min_size = min_size
+        self.max_size = max_size
+        self.criterion = criterion
+
+        # a solver is a class or a (class, run keyword arguments) pair
+        if solvers is None:
+            solvers = criterion_2_solvers[criterion]
+        self.solvers = [(solver, {}) if isinstance(solver, type) else solver
+                        for solver in solvers]
+
+        self.group_2_students = None
+        self.objective_value = None
+        self.best_solver = None
+        self.results = []
+
+    def get_label(self, index):
+        cls, kwargs = self.solvers[index]
+        arguments = ", ".join(f"{key}={value!r}" for key, value in
+                              kwargs.items() if key != "solver")
+        return f"{cls.__name__}({arguments})"
+
+    def get_objective_value(self, group_2_students):
+        evaluator = criterion_2_evaluator[self.criterion](
+            self.student_2_data, self.number_of_groups, self.min_size,
+            self.max_size)
+        evaluator.set_partition(group_2_students)
+        return evaluator.get_objective_value()
+
+    def is_better(self, objective_value):
+        if self.objective_value is None:
+            return True
+        sense = criterion_2_evaluator[self.criterion].sense
+        return sense * objective_value > sense * self.objective_value
+
+    def add_result(self, index, group_2_students, optimal, seconds, error):
+        result = self.results[index]
+        result.update(seconds=seconds, optimal=optimal, error=error,
+                      status="failed" if error else "finished")
+        if group_2_students is None:
+            return
+        result["objective_value"] = \
+            self.get_objective_value(group_2_students)
+        if optimal or self.is_better(result["objective_value"]):
+            self.group_2_students = group_2_students
+            self.objective_value = result["objective_value"]
+            self.best_solver = result["solver"]
+
+    def run(self, timelimit=60, number_of_workers=None, grace=2):
+        # IP models get timelimit - grace seconds, so that they report
+        # their incumbent before the portfolio deadline
+        number_of_workers = number_of_workers or os.cpu_count()
+        instance = (self.student_2_data, self.number_of_groups,
+                    self.min_size, self.max_size)
+        deadline = time.perf_counter() + timelimit
+
+        self.results = [{"solver": self.get_label(i),
+                         "objective_value": None,
+                         "seconds": None,
+                         "optimal": False,
+                         "error": None,
+                         "status": "cancelled"}
+                        for i in range(len(self.solvers))]
+        results = multiprocessing.Queue()
+        pending = list(range(len(self.solvers)))
+        index_2_process = {}
+        optimal = False
+        try:
+            while (pending or index_2_process) and not optimal:
+                while pending and len(index_2_process) < number_of_workers:
+                    index = pending.pop(0)
+                    cls, kwargs = self.solvers[index]
+                    if issubclass(cls, (SymmetryBreaking,
+                                        BranchAndBoundNPPTotal,
+                                        BranchAndBoundQCPP)):
+                        kwargs = {"timelimit": max(1, int(
+                            deadline - time.perf_counter() - grace)),
+                            **kwargs}
+                    process = multiprocessing.Process(
+                        target=run_solver,
+                        args=(index, cls, instance, kwargs, results),
+                        daemon=True)
+                    process.start()
+                    index_2_process[index] = process
+
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    index, *result = results.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                index_2_process.pop(index).join()
+                self.add_result(index, *result)
+                optimal = self.results[index]["optimal"]
+        finally:
+            for process in index_2_process.values():
+                stop_process(process)
+
+        return self.group_2_students
@@ -1,28 +1,46 @@
+import operator
+import time
+from bisect import bisect_right
 from copy import deepcopy
+from fractions import Fraction
+from heapq import heappop, heappush
+from math import isqrt
 
 import numpy as np
 import pulp
 
+from bounds import CohortBounds
+from local_search import LocalSearchQCPP
+from metrics import Instrumented, measured, get_gap
+from seats import SeatTracker
+from sparse_model import SparseBackend, SparseModel
+from student_table import read_cohorts
+from symmetry import SymmetryBreaking
 
-class GreedyQCPP:
+
+class GreedyQCPP(Instrumented):
     def __init__(self,
                  student_2_group,
                  number_of_groups,
                  min_size,
                  max_size,
                  ):
-        self.student_2_group = student_2_group
+        self.table, self.student_2_group = read_cohorts(student_2_group)
         self.number_of_groups = number_of_groups
         self.min_size = min_size
         self.max_size = max_size
 
-        self.cliques = {g: [] for g in student_2_group.values()}
-        for s, g in student_2_group.items():
+        self.cliques = {g: [] for g in self.student_2_group.values()}
+        for s, g in self.student_2_group.items():
             self.cliques[g].append(s)
 
         self.group_2_students = {g: [] for g in range(self.number_of_groups)}
-        self.group_2_number_of_students = {g: 0 for g in
-                                           range(self.number_of_groups)}
+        self.seats = SeatTracker(len(self.student_2_group),
+                                 self.number_of_groups,
+                                 self.min_size,
+                                 self.max_size)
+        self.group_2_number_of_students = \
+            self.seats.group_2_number_of_students
 
     def get_density(self, quasi_clique):
         if len(quasi_clique) <= 1:
@@ -40,19 +58,80 @@ class GreedyQCPP:
                 / (sum(sizes) * (sum(sizes) - 1)))
 
     def get_remaining_seats(self, g):
-        return np.sum(np.clip(np.array(
-            [self.min_size - self.group_2_number_of_students[g_] for g_ in
-             self.group_2_students if g_ != g]),
-            min=0))
+        return self.seats.get_remaining_seats(g)
+
+    @measured
+    def run_bucketed(self):
+        # the same choices as run: cohorts wait in a bucket queue by the
+        # number of their students left, a heap of cohort indices per
+        # bucket keeping the first cohort of a tie on top, and each cohort
+        # counts its students per group, so the same-cohort pairs
+        # n * (n - 1) of every group after a trial chunk take O(1) each
+        cohorts = list(self.cliques)
+        remaining = [len(self.cliques[c]) for c in cohorts]
+        starts = [0] * len(cohorts)
+        buckets = [[] for _ in range(max(remaining, default=0) + 1)]
+        for i, size in enumerate(remaining):
+            buckets[size].append(i)
+        cohort_2_group_2_size = [{} for _ in cohorts]
+
+        sizes = np.zeros(self.number_of_groups, dtype=np.int64)
+        pairs = np.zeros(self.number_of_groups, dtype=np.int64)
+        counts = np.zeros(self.number_of_groups, dtype=np.int64)
+        top = len(buckets) - 1
+        while top > 0:
+            bucket = buckets[top]
+            while bucket and remaining[bucket[0]] != top:
+                heappop(bucket)
+            if not bucket:
+                top -= 1
+                continue
+            i = bucket[0]
+
+            deficits = np.maximum(self.min_size - sizes, 0)
+            chunks = np.minimum(
+                remaining[i],
+                np.minimum(self.seats.number_of_remaining_students
+                           - self.seats.deficit + deficits,
+                           self.max_size - sizes))
+            counts[:] = 0
+            for g, size in cohort_2_group_2_size[i].items():
+                counts[g] = size
+            trial_sizes = sizes + chunks
+            trial_pairs = pairs - counts * (counts - 1) \
+                + (counts + chunks) * (counts + chunks - 1)
+            densities = np.where(
+                chunks == 0, -1,
+                np.where(trial_sizes <= 1, 1,
+                         trial_pairs / np.maximum(trial_sizes
+                                                  * (trial_sizes - 1), 1)))
+            group = int(np.argmax(densities))
+            size = int(chunks[group])
+
+            self.group_2_students[group] += \
+                self.cliques[cohorts[i]][starts[i]:starts[i] + size]
+            sizes[group] = trial_sizes[group]
+            pairs[group] = trial_pairs[group]
+            cohort_2_group_2_size[i][group] = int(counts[group]) + size
+            starts[i] += size
+            remaining[i] -= size
+            if remaining[i] > 0:
+                heappush(buckets[remaining[i]], i)
+            self.seats.add(group, size)
+            self.count("iterations")
+            self.count("evaluations", self.number_of_groups)
+
+        return self.group_2_students
+
+    @measured
+    def run(self, bucketed=False):
+        if bucketed:
+            return self.run_bucketed()
 
-    def run(self):
         while sum(len(clique) for clique in self.cliques.values()) > 0:
             max_clique = max(self.cliques, key=lambda c: len(self.cliques[c]))
             allowable_sizes = [min(len(self.cliques[max_clique]),
-                                   sum(len(c) for c in self.cliques.values())
-                                   - self.get_remaining_seats(g),
-                                   self.max_size
-                                   - len(self.group_2_students[g]))
+                                   self.seats.get_allowable_size(g))
                                for g in self.group_2_students]
 
             self.group_2_students_pre = deepcopy(self.group_2_students)
@@ -70,21 +149,488 @@ class GreedyQCPP:
             self.cliques[max_clique] = self.cliques[max_clique][
                                        len(self.group_2_students_pre[group])
                                        - len(self.group_2_students[group]):]
+            self.seats.add(group, len(self.group_2_students_pre[group])
+                           - len(self.group_2_students[group]))
             self.group_2_students[group] = self.group_2_students_pre[group]
-            self.group_2_number_of_students[group] \
-                = len(self.group_2_students[group])
+            self.count("iterations")
+            self.count("evaluations", len(self.group_2_students_pre))
+
+        return self.group_2_students
+
+
+class BranchAndBoundQCPP(GreedyQCPP):
+    # depth-first search over the cohorts, largest first, each one placed in
+    # pieces of non-increasing size in different groups; only the cohort
+    # sizes matter. A search looks for a partition with every group above a
+    # threshold density: a node is pruned when a group cannot get there at
+    # any size it may still take, even with the largest cohorts left, when
+    # the groups together need more same-cohort pairs than the cohorts left
+    # have, or when more groups need a piece of some size than the cohorts
+    # left can cut. Groups with the same size and pairs are interchangeable
+    # and cohorts of one student are counted out at the end. The optimum
+    # lies between the incumbent and a bound, first the highest threshold
+    # the root is not pruned at; searches at thresholds in between raise
+    # the incumbent or lower the bound, and each state at the start of a
+    # cohort keeps the lowest threshold it failed at, which bounds what it
+    # can reach in every later search
+    probe_share = 0.1
+
+    def get_incumbent(self, initial_partition, timelimit):
+        partitions = [] if initial_partition is None else [initial_partition]
+        partitions.append(GreedyQCPP(self.student_2_group,
+                                     self.number_of_groups,
+                                     self.min_size,
+                                     self.max_size).run(bucketed=True))
+        best, best_value = None, None
+        for group_2_students in partitions:
+            local_search = LocalSearchQCPP(self.student_2_group,
+                                           self.number_of_groups,
+                                           self.min_size,
+                                           self.max_size)
+            group_2_students = local_search.run(group_2_students,
+                                                timelimit=timelimit)
+            value = self.get_min_density(group_2_students)
+            if best_value is None or value > best_value:
+                best, best_value = group_2_students, value
+        return best, best_value
+
+    def get_min_density(self, group_2_students):
+        # exact, so that the pairs a group needs are exact too
+        densities = []
+        for students in group_2_students.values():
+            cohort_2_size = {}
+            for s in students:
+                c = self.student_2_group[s]
+                cohort_2_size[c] = cohort_2_size.get(c, 0) + 1
+            max_pairs = len(students) * (len(students) - 1) // 2
+            densities.append(Fraction(sum(m * (m - 1) // 2 for m in
+                                          cohort_2_size.values()),
+                                      max_pairs) if max_pairs else 1)
+        return min(densities)
+
+    def get_value_at_most(self, value):
+        # the highest density a group of at least two students can have up
+        # to value, or None
+        values = [Fraction(value.numerator * max_pairs // value.denominator,
+                           max_pairs) for max_pairs in self.max_pairs]
+        return max(values, default=None)
+
+    def get_value_above(self, value):
+        # the lowest density a group of at least two students can have above
+        # value, or None
+        values = [Fraction(value.numerator * max_pairs // value.denominator
+                           + 1, max_pairs) for max_pairs in self.max_pairs
+                  if value * max_pairs < max_pairs]
+        return min(values, default=None)
+
+    def get_threshold(self, low, high):
+        # a density between low and high, at least low and below high, or
+        # None when no group density lies in (low, high]
+        above = self.get_value_above(low)
+        if above is None or above > high:
+            return None
+        threshold = self.get_value_at_most((low + high) / 2)
+        return low if threshold is None or threshold < low \
+            or threshold >= high else threshold
+
+    def is_root_pruned(self, threshold):
+        self.set_best_value(threshold)
+        self.sizes = [0] * self.number_of_groups
+        self.pairs = [0] * self.number_of_groups
+        return self.cohort_sizes[0] > 1 \
+            and self.is_pruned(0, self.cohort_sizes[0])
+
+    def get_root_bound(self, low):
+        # the lowest threshold the root is pruned at: no partition has every
+        # group above it
+        if self.is_root_pruned(low):
+            return low
+        high = Fraction(1)
+        while True:
+            threshold = self.get_threshold(low, high)
+            if threshold is None:
+                return high
+            if threshold == low:
+                threshold = self.get_value_above(low)
+                if threshold >= high:
+                    return high
+            if self.is_root_pruned(threshold):
+                high = threshold
+            else:
+                low = threshold
+
+    def set_best_value(self, best_value):
+        # the fewest same-cohort pairs of a group of each size above it;
+        # densities of different groups differ by more than the rounding
+        # error of a float, so the memo compares floats
+        self.best_value = best_value
+        self.best_float = float(best_value)
+        self.required_pairs = []
+        for size in range(self.max_size + 1):
+            max_pairs = size * (size - 1) // 2
+            if max_pairs == 0:
+                self.required_pairs.append(0 if best_value < 1 else 1)
+            else:
+                self.required_pairs.append(best_value.numerator * max_pairs
+                                           // best_value.denominator + 1)
+        self.state_2_piece = {}
+
+    def get_most_pairs(self, i, number_of_students):
+        # pairs of that many students of the cohorts from i on, largest first
+        start = self.cumulative_sizes[i]
+        j = bisect_right(self.cumulative_sizes,
+                         start + number_of_students) - 1
+        rest = start + number_of_students - self.cumulative_sizes[j]
+        return self.cumulative_pairs[j] - self.cumulative_pairs[i] \
+            + rest * (rest - 1) // 2
+
+    def get_missing_pairs(self, i, number_of_students, size, pairs):
+        # pairs a group still needs from the cohorts left, at the smallest
+        # size it can reach them at, or None
+        for final_size in range(max(size, self.min_size),
+                                min(self.max_size,
+                                    size + number_of_students) + 1):
+            missing = self.required_pairs[final_size] - pairs
+            if missing <= 0:
+                return 0
+            if self.get_most_pairs(i, final_size - size) >= missing:
+                return missing
+        return None
+
+    def get_piece(self, size, pairs, final_size):
+        # the smallest largest new piece that lifts the group above the
+        # incumbent at some size up to final_size: new pieces of at most m
+        # students add at most (x // m) * m * (m - 1) / 2 + (x % m) *
+        # (x % m - 1) / 2 pairs for x students
+        key = (size, pairs, final_size)
+        if key not in self.state_2_piece:
+            piece = None
+            for final in range(max(size, self.min_size), final_size + 1):
+                missing = self.required_pairs[final] - pairs
+                if missing <= 0:
+                    piece = 0
+                    break
+                x = final - size
+                for m in range(2, x + 1 if piece is None else piece):
+                    if (x // m) * m * (m - 1) // 2 \
+                            + (x % m) * (x % m - 1) // 2 >= missing:
+                        piece = m
+                        break
+            self.state_2_piece[key] = piece
+        return self.state_2_piece[key]
+
+    def get_number_of_pieces(self, i, left, piece):
+        # pieces of at least that many students the cohorts left can cut
+        return left // piece + self.suffix_pieces[i + 1][piece]
+
+    def get_piece_pairs(self, number_of_students, most, room):
+        # the most one cohort adds over its pieces of at most room students
+        # when a piece counts for at most `most` pairs: pieces just big
+        # enough, the rest in one piece
+        piece = (isqrt(8 * most - 7) + 1) // 2
+        if piece * (piece - 1) // 2 < most:
+            piece += 1
+        value = most
+        if piece > room:
+            piece = room
+            value = room * (room - 1) // 2
+        rest = number_of_students % piece
+        return number_of_students // piece * value + rest * (rest - 1) // 2
+
+    def get_useful_pairs(self, i, left, most, room):
+        # a group missing at most `most` pairs gains no more than that from
+        # any one piece, so the groups together gain at most the sum of
+        # min(pairs, most) over the pieces of the students left
+        if most <= 0 or room <= 1:
+            return 0
+        key = (i, most, room)
+        if key not in self.state_2_pairs:
+            self.state_2_pairs[key] = sum(
+                self.get_piece_pairs(m, most, room)
+                for m in self.cohort_sizes[i + 1:] if m > 1)
+        return self.get_piece_pairs(left, most, room) \
+            + self.state_2_pairs[key]
 
+    def get_fewest_max_pairs(self, number_of_students):
+        # the smallest sum of size * (size - 1) / 2 over the groups once the
+        # students left are seated, filling up the smallest groups first
+        sizes = [max(size, self.min_size) for size in self.sizes]
+        extra = number_of_students - sum(sizes) + sum(self.sizes)
+        low, high = min(sizes), self.max_size
+        while low < high:
+            level = (low + high + 1) // 2
+            if sum(max(0, level - size) for size in sizes) <= extra:
+                low = level
+            else:
+                high = level - 1
+        extra -= sum(max(0, low - size) for size in sizes)
+        return sum(max(size, low) * (max(size, low) - 1) // 2
+                   for size in sizes) + extra * low
+
+    def is_pruned(self, i, left):
+        number_of_students = left + self.cumulative_sizes[-1] \
+            - self.cumulative_sizes[i + 1]
+        number_of_pairs = left * (left - 1) // 2 + self.cumulative_pairs[-1] \
+            - self.cumulative_pairs[i + 1]
+        total = 0
+        state_2_missing = {}
+        for state in zip(self.sizes, self.pairs):
+            if state not in state_2_missing:
+                state_2_missing[state] = self.get_missing_pairs(
+                    i, number_of_students, *state)
+            if state_2_missing[state] is None:
+                return True
+            total += state_2_missing[state]
+        if total > self.get_useful_pairs(
+                i, left, max(state_2_missing.values()),
+                self.max_size - min(self.sizes)):
+            return True
+        # every group ends above the incumbent, so all of them together too
+        if self.min_size >= 2 \
+                and (number_of_pairs + sum(self.pairs)) \
+                * self.best_value.denominator \
+                <= self.best_value.numerator \
+                * self.get_fewest_max_pairs(number_of_students):
+            return True
+
+        pieces = sorted((self.get_piece(size, pairs,
+                                        min(self.max_size,
+                                            size + number_of_students))
+                         for size, pairs in zip(self.sizes, self.pairs)),
+                        reverse=True)
+        for number_of_groups, piece in enumerate(pieces, 1):
+            if piece is None:
+                return True
+            if piece == 0:
+                break
+            if (number_of_groups == len(pieces)
+                    or pieces[number_of_groups] != piece) \
+                    and self.get_number_of_pieces(i, left, piece) \
+                    < number_of_groups:
+                return True
+        return False
+
+    def place_singletons(self, i):
+        # the cohorts from i on have one student each: every group takes
+        # between what min_size needs and what keeps it above the incumbent
+        lows, highs = [], []
+        for size, pairs in zip(self.sizes, self.pairs):
+            low = max(0, self.min_size - size)
+            high = self.max_size - size
+            while high >= low and pairs < self.required_pairs[size + high]:
+                high -= 1
+            if high < low:
+                return False
+            lows.append(low)
+            highs.append(high)
+        extra = len(self.cohort_sizes) - i - sum(lows)
+        if extra < 0 or extra > sum(highs) - sum(lows):
+            return False
+        for g, (low, high) in enumerate(zip(lows, highs)):
+            number_of_singletons = low + min(extra, high - low)
+            extra -= number_of_singletons - low
+            for _ in range(number_of_singletons):
+                self.placements.append((i, g, 1))
+                i += 1
+        return True
+
+    def is_bounded(self, key, pairs):
+        # a state at the start of a cohort fails when one with the same
+        # group sizes and at least as many pairs in every group failed at a
+        # threshold up to best_value: its groups end with at least as many
+        # pairs from the same pieces
+        return any(bound <= self.best_float
+                   and all(map(operator.le, pairs, bound_pairs))
+                   for bound_pairs, bound in self.state_2_bounds.get(key, ()))
+
+    def add_bound(self, key, pairs):
+        # no partition from the state has every group above best_value
+        self.state_2_bounds[key] = [
+            (bound_pairs, bound) for bound_pairs, bound
+            in self.state_2_bounds.get(key, ())
+            if bound < self.best_float
+            or any(map(operator.gt, pairs, bound_pairs))
+        ] + [(pairs, self.best_float)]
+
+    def search(self, i, left, piece, used):
+        # places the left students of cohort i in pieces of at most piece
+        # students, in groups not used by it yet
+        fresh = left == 0
+        if fresh:
+            i += 1
+            if i == len(self.cohort_sizes) or self.cohort_sizes[i] == 1:
+                return self.place_singletons(i)
+            left = piece = self.cohort_sizes[i]
+            used = ()
+            states = sorted(zip(self.sizes, self.pairs))
+            key = (i, tuple(size for size, _ in states))
+            pairs = tuple(pairs for _, pairs in states)
+            if self.is_bounded(key, pairs):
+                return False
+
+        self.number_of_nodes += 1
+        if self.node_limit is not None \
+                and self.number_of_nodes >= self.node_limit \
+                or self.number_of_nodes % 1000 == 0 \
+                and time.perf_counter() > self.deadline:
+            self.complete = False
+        if not self.complete:
+            return False
+
+        if not self.is_pruned(i, left):
+            seen = set()
+            candidates = []
+            for g in range(self.number_of_groups):
+                state = (self.sizes[g], self.pairs[g])
+                if g not in used and state not in seen \
+                        and self.sizes[g] < self.max_size:
+                    seen.add(state)
+                    candidates.append(g)
+            # the group that needs the most pairs first
+            candidates.sort(key=lambda g: self.pairs[g] - self.required_pairs[
+                max(self.sizes[g], self.min_size)])
+            for m in range(min(left, piece), 0, -1):
+                for g in candidates:
+                    # equal pieces go to the groups in order
+                    if self.sizes[g] + m > self.max_size \
+                            or m == piece and used and g < used[-1]:
+                        continue
+                    self.count("evaluations")
+                    self.sizes[g] += m
+                    self.pairs[g] += m * (m - 1) // 2
+                    self.placements.append((i, g, m))
+                    if self.search(i, left - m, m, used + (g,)):
+                        return True
+                    self.placements.pop()
+                    self.sizes[g] -= m
+                    self.pairs[g] -= m * (m - 1) // 2
+                    if not self.complete:
+                        return False
+
+        if fresh:
+            self.add_bound(key, pairs)
+        return False
+
+    def set_placements(self):
+        cohorts = sorted(self.cliques, key=lambda c: len(self.cliques[c]),
+                         reverse=True)
+        starts = {c: 0 for c in cohorts}
+        self.group_2_students = {g: [] for g in range(self.number_of_groups)}
+        for i, g, m in self.placements:
+            c = cohorts[i]
+            self.group_2_students[g] += \
+                self.cliques[c][starts[c]:starts[c] + m]
+            starts[c] += m
+
+    def probe(self, threshold, deadline):
+        # a partition with every group above threshold, or None; complete
+        # tells whether None means that there is none
+        self.set_best_value(threshold)
+        self.sizes = [0] * self.number_of_groups
+        self.pairs = [0] * self.number_of_groups
+        self.placements = []
+        self.deadline = deadline
+        self.complete = True
+        self.count("probes")
+        if not self.search(-1, 0, 0, ()):
+            return None
+        self.set_placements()
+        return self.group_2_students
+
+    @measured
+    def run(self, timelimit=60, node_limit=None, initial_partition=None):
+        # searches above the incumbent raise it until one stops early, then
+        # searches halfway to the bound lower it, each one that stops early
+        # sending the next ones below its threshold; a search runs for at
+        # most probe_share of timelimit, twice that once every threshold
+        # left stopped early, and the last one possible for all the time
+        # left
+        start = time.perf_counter()
+        self.node_limit = node_limit
+        self.number_of_nodes = 0
+        self.state_2_bounds = {}
+        self.state_2_pairs = {}
+
+        self.cohort_sizes = sorted((len(clique) for clique in
+                                    self.cliques.values()), reverse=True)
+        self.cumulative_sizes = [0]
+        self.cumulative_pairs = [0]
+        for m in self.cohort_sizes:
+            self.cumulative_sizes.append(self.cumulative_sizes[-1] + m)
+            self.cumulative_pairs.append(self.cumulative_pairs[-1]
+                                         + m * (m - 1) // 2)
+        self.suffix_pieces = [[0] * (self.max_size + 1)]
+        for m in reversed(self.cohort_sizes):
+            self.suffix_pieces.insert(0, [
+                number + (m // piece if piece else 0) for piece, number in
+                enumerate(self.suffix_pieces[0])])
+
+        self.max_pairs = [size * (size - 1) // 2 for size in
+                          range(max(2, self.min_size), self.max_size + 1)]
+
+        incumbent, low = self.get_incumbent(initial_partition, timelimit / 10)
+        high = self.get_root_bound(low)
+        ceiling = high
+        improving = True
+        probe_timelimit = self.probe_share * timelimit
+        while self.get_threshold(low, high) is not None:
+            threshold = low if improving \
+                else self.get_threshold(low, ceiling)
+            if threshold is None or threshold == low and not improving:
+                ceiling = high
+                improving = True
+                probe_timelimit *= 2
+                continue
+            end = start + timelimit
+            if self.get_threshold(low, high) > low:
+                end = min(end, time.perf_counter() + probe_timelimit)
+            group_2_students = self.probe(threshold, end)
+            if group_2_students is not None:
+                incumbent = group_2_students
+                low = self.get_min_density(incumbent)
+                improving = True
+                self.count("incumbents")
+            elif self.complete:
+                high = threshold
+                ceiling = min(ceiling, high)
+            elif time.perf_counter() - start > timelimit \
+                    or self.node_limit is not None \
+                    and self.number_of_nodes >= self.node_limit:
+                break
+            elif improving:
+                improving = False
+            else:
+                ceiling = threshold
+
+        self.group_2_students = {g: list(students) for g, students in
+                                 incumbent.items()}
+        self.best_value = low
+        self.complete = self.get_threshold(low, high) is None
+        self.objective_value = float(low)
+        self.optimal = self.complete
+        self.best_bound = float(high)
+        self.gap = get_gap(self.objective_value, self.best_bound)
+        self.count("nodes", self.number_of_nodes)
+        if self.metrics is not None:
+            self.metrics.status = pulp.LpStatus[pulp.LpStatusOptimal
+                                                if self.complete else
+                                                pulp.LpStatusNotSolved]
+            self.metrics.sol_status = pulp.LpSolution[
+                pulp.LpSolutionOptimal if self.complete
+                else pulp.LpSolutionIntegerFeasible]
+            self.metrics.objective_value = self.objective_value
+            self.metrics.best_bound = self.best_bound
         return self.group_2_students
 
 
-class QCPPIP:
+class QCPPIP(SymmetryBreaking, SparseBackend, Instrumented):
     def __init__(self,
                  student_2_group,
                  number_of_groups,
                  min_size,
                  max_size,
                  ):
-        self.student_2_group = student_2_group
+        self.table, self.student_2_group = read_cohorts(student_2_group)
         self.number_of_groups = number_of_groups
         self.min_size = min_size
         self.max_size = max_size
@@ -92,13 +638,34 @@ class QCPPIP:
         self.students = list(self.student_2_group.keys())
         self.group_2_students = {g: [] for g in range(self.number_of_groups)}
 
-        self.cliques = {g: [] for g in student_2_group.values()}
-        for s, g in student_2_group.items():
+        self.cliques = {g: [] for g in self.student_2_group.values()}
+        for s, g in self.student_2_group.items():
             self.cliques[g].append(s)
 
-        self.big_M = 100_000
+        self.bounds = CohortBounds([len(clique) for clique in
+                                    self.cliques.values()],
+                                   self.min_size,
+                                   self.max_size)
+        self.big_M = {size: self.get_big_M(size) for size in
+                      range(self.min_size, self.max_size + 1)}
         self.model = pulp.LpProblem("QCPP", pulp.LpMaximize)
 
+    def get_big_M(self, size):
+        # gamma * size * (size - 1) / 2 - pairs <= M for the groups of every
+        # other size
+        return max([0] + [self.bounds.get_max_density()
+                          * self.bounds.get_max_pairs(size)
+                          - self.bounds.get_fewest_pairs(other)
+                          for other in self.bounds.sizes if other != size])
+
+    symmetry_breakings = ("size", "fix", "orbitope")
+
+    def get_ordered_students(self):
+        return [s for c in sorted(self.cliques,
+                                  key=lambda c: len(self.cliques[c]),
+                                  reverse=True)
+                for s in self.cliques[c]]
+
     def create_vars(self):
         x_indices = [(k, v) for k in range(self.number_of_groups)
                    for v in self.students]
@@ -121,7 +688,8 @@ class QCPPIP:
                                             indices=z_indices,
                                             cat=pulp.LpBinary)
 
-        self.gamma = pulp.LpVariable(name="gamma", lowBound=0, upBound=1,
+        self.gamma = pulp.LpVariable(name="gamma", lowBound=0,
+                                     upBound=self.bounds.get_max_density(),
                                      cat=pulp.LpContinuous)
 
     def create_of(self):
@@ -156,32 +724,323 @@ class QCPPIP:
 
     def create_density_con(self):
         for k in range(self.number_of_groups):
+            pairs = pulp.lpSum(self.o_vars[k, u, v] for clique in
+                               self.cliques.values() for i, u in
+                               enumerate(clique) for v in clique[i + 1:])
             for size in range(self.min_size, self.max_size + 1):
-                self.model += pulp.lpSum(self.o_vars[k, u, v] for clique in
-                                         self.cliques.values() for i, u in
-                                         enumerate(clique)
-                                         for v in clique[i + 1:]) \
+                self.model += pairs \
                               >= self.gamma * size * (size - 1) / 2 \
-                              - self.big_M * (1 - self.z_vars[k, size])
+                              - self.big_M[size] \
+                              * (1 - self.z_vars[k, size])
+
+    def create_model(self):
+        self.run_phase(self.create_vars)
+        self.run_phase(self.create_of)
+        self.run_phase(self.create_assignment_con)
+        self.run_phase(self.create_size_con)
+        self.run_phase(self.create_one_size_con)
+        self.run_phase(self.create_edge_con)
+        self.run_phase(self.create_density_con)
+
+    def get_density(self, quasi_clique):
+        if len(quasi_clique) <= 1:
+            return 1
+        cohort_2_size = {}
+        for s in quasi_clique:
+            cohort_2_size[self.student_2_group[s]] = \
+                cohort_2_size.get(self.student_2_group[s], 0) + 1
+
+        return (sum(size * (size - 1) for size in cohort_2_size.values())
+                / (len(quasi_clique) * (len(quasi_clique) - 1)))
+
+    def set_initial_values(self, group_2_students):
+        super().set_initial_values(group_2_students)
+        student_2_position = {s: i for i, s in enumerate(self.students)}
+        for k, students in group_2_students.items():
+            self.z_vars[k, len(students)].setInitialValue(1)
+            students = sorted(students, key=student_2_position.get)
+            for i, u in enumerate(students):
+                for v in students[i + 1:]:
+                    self.o_vars[k, u, v].setInitialValue(1)
+        self.gamma.setInitialValue(min(self.get_density(students) for
+                                       students in group_2_students.values()))
+
+    def get_sparse_students(self):
+        return self.students
+
+    def get_sparse_pairs(self):
+        student_2_position = {s: i for i, s in enumerate(self.students)}
+        pairs = [(student_2_position[u], student_2_position[v])
+                 for clique in self.cliques.values()
+                 for i, u in enumerate(clique) for v in clique[i + 1:]]
+        return np.array(pairs, dtype=int).reshape(-1, 2).T
+
+    def create_sparse_density_con(self, pair_cols, pair_vals):
+        # pairs - gamma * size * (size - 1) / 2 - M * z >= -M for each
+        # (group, size), where pair_cols[k] holds the pair count of group k
+        sizes = self.get_sparse_sizes()
+        k, m = pair_cols.shape
+        big_M = np.tile([self.big_M[size] for size in sizes.tolist()], k)
+        rows = np.arange(k * len(sizes)).reshape(k, len(sizes))
+        gamma = self.sparse_model.vars["gamma"][0]
+        self.sparse_model.add_cons(
+            np.concatenate((np.repeat(rows.ravel(), m), rows.ravel(),
+                            rows.ravel())),
+            np.concatenate((np.repeat(pair_cols, len(sizes), axis=0).ravel(),
+                            np.full(rows.size, gamma),
+                            self.sparse_z.ravel())),
+            np.concatenate((np.tile(pair_vals, rows.size),
+                            -np.tile(sizes * (sizes - 1) / 2, k),
+                            -big_M)),
+            "G", -big_M)
+
+    def create_sparse_model(self):
+        self.create_sparse_x_vars(pulp.LpMaximize)
+        self.create_sparse_z_vars()
+        u, v = self.get_sparse_pairs()
+        self.sparse_o = self.sparse_model.add_vars(
+            "o", (self.number_of_groups, len(u)), up=1, integer=True)
+        gamma = self.sparse_model.add_vars(
+            "gamma", 1, up=self.bounds.get_max_density())[0]
+        self.sparse_model.set_objective(gamma, 1)
 
-    def run(self, solver=pulp.COIN, timelimit=1800):
-        self.create_vars()
-        self.create_of()
-        self.create_assignment_con()
-        self.create_size_con()
-        self.create_one_size_con()
-        self.create_edge_con()
-        self.create_density_con()
+        self.create_sparse_assignment_con()
+        self.create_sparse_size_con()
+        self.create_sparse_one_size_con()
 
-        self.model.solve(solver(msg=True, timeLimit=timelimit))
+        # o[k, uv] <= x[k, u] and o[k, uv] <= x[k, v]
+        for ends in (u, v):
+            rows = np.arange(self.sparse_o.size)
+            self.sparse_model.add_cons(
+                np.concatenate((rows, rows)),
+                np.concatenate((self.sparse_o.ravel(),
+                                self.sparse_x[:, ends].ravel())),
+                np.concatenate((np.ones(rows.size), -np.ones(rows.size))),
+                "L", np.zeros(rows.size))
 
-        for (k, s), var in self.x_vars.items():
-            if round(var.varValue) == 1:
-                self.group_2_students[k].append(s)
+        self.create_sparse_density_con(self.sparse_o, np.ones(len(u)))
+
+    def set_sparse_initial_values(self, group_2_students):
+        x = super().set_sparse_initial_values(group_2_students)
+        u, v = self.get_sparse_pairs()
+        self.sparse_model.set_start(self.sparse_o, x[:, u] & x[:, v])
+
+    @measured
+    def run(self, solver=pulp.COIN, timelimit=1800, symmetry_breaking=None,
+            initial_partition=None, backend="pulp"):
+        if backend == "sparse":
+            return self.run_sparse(solver, timelimit, symmetry_breaking,
+                                   initial_partition)
+
+        self.create_model()
+        if symmetry_breaking is not None:
+            self.run_phase(self.create_symmetry_con, symmetry_breaking)
+        if initial_partition is not None:
+            self.run_phase(self.set_initial_values,
+                           self.order_groups(initial_partition,
+                                             symmetry_breaking))
+
+        self.solve(self.model.solve,
+                   self.get_solver(solver, msg=True, timeLimit=timelimit,
+                                   warmStart=initial_partition is not None))
+
+        self.run_phase(self.extract_solution)
 
         return self.group_2_students
 
 
+class CohortQCPPIP(QCPPIP):
+    # the density of a group only depends on how many students of each
+    # cohort it gets, so n[k, c] replaces the per-student x and o binaries
+    # and w[k, c, m] picks the count m to linearise its m * (m - 1) / 2 pairs
+    symmetry_breakings = ("size", "fix")
+
+    def get_big_M(self, size):
+        # CBC solves this formulation 2-4 times slower with the derived
+        # constants than with a loose one, valid up to 447 students a group
+        return 100_000
+
+    def get_group_size(self, k):
+        return pulp.lpSum(self.n_vars[k, c] for c in self.cliques)
+
+    def create_fix_con(self):
+        self.model += self.n_vars[0, max(self.cliques, key=lambda c:
+                                         len(self.cliques[c]))] >= 1
+
+    def get_counts(self, c):
+        return range(min(self.max_size, len(self.cliques[c])) + 1)
+
+    def create_vars(self):
+        n_indices = [(k, c) for k in range(self.number_of_groups)
+                     for c in self.cliques]
+        self.n_vars = pulp.LpVariable.dicts(name="n",
+                                            indices=n_indices,
+                                            lowBound=0,
+                                            upBound=self.max_size,
+                                            cat=pulp.LpInteger)
+
+        w_indices = [(k, c, m) for k, c in n_indices
+                     for m in self.get_counts(c)]
+        self.w_vars = pulp.LpVariable.dicts(name="w",
+                                            indices=w_indices,
+                                            cat=pulp.LpBinary)
+
+        z_indices = [(k, size) for k in range(self.number_of_groups)
+                     for size in range(self.min_size, self.max_size + 1)]
+        self.z_vars = pulp.LpVariable.dicts(name="z",
+                                            indices=z_indices,
+                                            cat=pulp.LpBinary)
+
+        self.gamma = pulp.LpVariable(name="gamma", lowBound=0,
+                                     upBound=self.bounds.get_max_density(),
+                                     cat=pulp.LpContinuous)
+
+    def create_assignment_con(self):
+        for c, clique in self.cliques.items():
+            self.model += pulp.lpSum(self.n_vars[k, c] for k in
+                                     range(self.number_of_groups)) \
+                          == len(clique)
+
+    def create_size_con(self):
+        for k in range(self.number_of_groups):
+            self.model += pulp.lpSum(self.n_vars[k, c] for c in
+                                     self.cliques) \
+                          == pulp.lpSum(size * self.z_vars[k, size] for size in
+                                        range(self.min_size, self.max_size + 1)
+                                        )
+
+    def create_count_con(self):
+        for k, c in self.n_vars:
+            self.model += pulp.lpSum(self.w_vars[k, c, m] for m in
+                                     self.get_counts(c)) == 1
+            self.model += pulp.lpSum(m * self.w_vars[k, c, m] for m in
+                                     self.get_counts(c)) == self.n_vars[k, c]
+
+    def create_density_con(self):
+        for k in range(self.number_of_groups):
+            pairs = pulp.lpSum(m * (m - 1) // 2 * self.w_vars[k, c, m] for c
+                               in self.cliques for m in self.get_counts(c))
+            for size in range(self.min_size, self.max_size + 1):
+                self.model += pairs \
+                              >= self.gamma * size * (size - 1) / 2 \
+                              - self.big_M[size] \
+                              * (1 - self.z_vars[k, size])
+
+    def create_model(self):
+        self.run_phase(self.create_vars)
+        self.run_phase(self.create_of)
+        self.run_phase(self.create_assignment_con)
+        self.run_phase(self.create_size_con)
+        self.run_phase(self.create_one_size_con)
+        self.run_phase(self.create_count_con)
+        self.run_phase(self.create_density_con)
+
+    def set_initial_values(self, group_2_students):
+        for var in self.model.variables():
+            var.setInitialValue(0)
+        for k, students in group_2_students.items():
+            self.z_vars[k, len(students)].setInitialValue(1)
+            cohort_2_size = {c: 0 for c in self.cliques}
+            for s in students:
+                cohort_2_size[self.student_2_group[s]] += 1
+            for c, size in cohort_2_size.items():
+                self.n_vars[k, c].setInitialValue(size)
+                self.w_vars[k, c, size].setInitialValue(1)
+        self.gamma.setInitialValue(min(self.get_density(students) for
+                                       students in group_2_students.values()))
+
+    def extract_solution(self):
+        for c, clique in self.cliques.items():
+            start = 0
+            for k in range(self.number_of_groups):
+                count = round(self.n_vars[k, c].varValue)
+                self.group_2_students[k] += clique[start:start + count]
+                start += count
+
+    def get_sparse_group_size(self):
+        return self.sparse_n, np.ones(self.sparse_n.shape)
+
+    def create_sparse_fix_con(self):
+        cohorts = list(self.cliques)
+        self.sparse_model.set_bounds(
+            self.sparse_n[0, cohorts.index(max(cohorts, key=lambda c:
+                                               len(self.cliques[c])))],
+            low=1)
+
+    def get_sparse_counts(self):
+        # cohort index and count m of every column of w
+        cohorts, counts = [], []
+        for i, c in enumerate(self.cliques):
+            cohorts += [i] * len(self.get_counts(c))
+            counts += list(self.get_counts(c))
+        return np.array(cohorts), np.array(counts)
+
+    def create_sparse_model(self):
+        self.sparse_model = SparseModel(pulp.LpMaximize)
+        number_of_cohorts = len(self.cliques)
+        cohorts, counts = self.get_sparse_counts()
+        self.sparse_n = self.sparse_model.add_vars(
+            "n", (self.number_of_groups, number_of_cohorts),
+            up=self.max_size, integer=True)
+        self.sparse_w = self.sparse_model.add_vars(
+            "w", (self.number_of_groups, len(counts)), up=1, integer=True)
+        self.create_sparse_z_vars()
+        gamma = self.sparse_model.add_vars(
+            "gamma", 1, up=self.bounds.get_max_density())[0]
+        self.sparse_model.set_objective(gamma, 1)
+
+        k = self.number_of_groups
+        self.sparse_model.add_cons(
+            np.tile(np.arange(number_of_cohorts), k), self.sparse_n, 1, "E",
+            [len(clique) for clique in self.cliques.values()])
+
+        sizes = self.get_sparse_sizes()
+        self.sparse_model.add_cons(
+            np.concatenate((np.repeat(np.arange(k), number_of_cohorts),
+                            np.repeat(np.arange(k), len(sizes)))),
+            np.concatenate((self.sparse_n.ravel(), self.sparse_z.ravel())),
+            np.concatenate((np.ones(self.sparse_n.size),
+                            -np.tile(sizes, k))),
+            "E", np.zeros(k))
+        self.create_sparse_one_size_con()
+
+        # one count per (group, cohort) and n equal to the chosen count
+        rows = (np.arange(k)[:, None] * number_of_cohorts
+                + cohorts[None, :]).ravel()
+        self.sparse_model.add_cons(rows, self.sparse_w, 1, "E",
+                                   np.ones(self.sparse_n.size))
+        self.sparse_model.add_cons(
+            np.concatenate((rows, np.arange(self.sparse_n.size))),
+            np.concatenate((self.sparse_w.ravel(), self.sparse_n.ravel())),
+            np.concatenate((np.tile(counts, k), -np.ones(self.sparse_n.size))),
+            "E", np.zeros(self.sparse_n.size))
+
+        self.create_sparse_density_con(self.sparse_w,
+                                       counts * (counts - 1) // 2)
+
+    def set_sparse_initial_values(self, group_2_students):
+        cohort_2_index = {c: i for i, c in enumerate(self.cliques)}
+        n = np.zeros(self.sparse_n.shape)
+        for k, students in group_2_students.items():
+            for s in students:
+                n[k, cohort_2_index[self.student_2_group[s]]] += 1
+        cohorts, counts = self.get_sparse_counts()
+        self.sparse_model.set_start(self.sparse_n, n)
+        self.sparse_model.set_start(self.sparse_w,
+                                    n[:, cohorts] == counts[None, :])
+        self.sparse_model.set_start(
+            self.sparse_z,
+            n.sum(axis=1)[:, None] == self.get_sparse_sizes()[None, :])
+
+    def extract_sparse_solution(self):
+        n = np.round(self.sparse_model.get_values("n")).astype(int)
+        for i, clique in enumerate(self.cliques.values()):
+            start = 0
+            for k in range(self.number_of_groups):
+                self.group_2_students[k] += clique[start:start + n[k, i]]
+                start += n[k, i]
+
+
 
 
 
@@ -0,0 +1,39 @@
+class SeatTracker:
+    def __init__(self,
+                 number_of_students,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 ):
+        self.number_of_students = number_of_students
+        self.number_of_groups = number_of_groups
+        self.min_size = min_size
+        self.max_size = max_size
+
+        self.group_2_number_of_students = {g: 0 for g in
+                                           range(self.number_of_groups)}
+        self.number_of_remaining_students = number_of_students
+        self.deficit = number_of_groups * min_size
+
+    def get_group_deficit(self, g):
+        return max(self.min_size - self.group_2_number_of_students[g], 0)
+
+    def get_remaining_seats(self, g):
+        return self.deficit - self.get_group_deficit(g)
+
+    def get_allowable_size(self, g):
+        return min(self.number_of_remaining_students
+                   - self.get_remaining_seats(g),
+                   self.max_size - self.group_2_number_of_students[g])
+
+    def can_receive(self, g):
+        return self.get_allowable_size(g) >= 1
+
+    def get_group_candidates(self):
+        return [g for g in self.group_2_number_of_students
+                if self.can_receive(g)]
+
+    def add(self, g, number=1):
+        self.deficit -= min(number, self.get_group_deficit(g))
+        self.group_2_number_of_students[g] += number
+        self.number_of_remaining_students -= number
@@ -0,0 +1,340 @@
+import heapq
+
+import pulp
+
+from metrics import Instrumented, measured
+
+
+class MinCostFlow:
+    # successive shortest paths, Dijkstra on the costs reduced by node
+    # potentials; Bellman-Ford gives the first potentials, so edge costs may
+    # be negative as long as there is no negative cycle
+    def __init__(self, number_of_nodes):
+        self.number_of_nodes = number_of_nodes
+        self.node_2_edges = [[] for _ in range(number_of_nodes)]
+        self.heads = []
+        self.capacities = []
+        self.costs = []
+        self.number_of_augmentations = 0
+
+    def add_edge(self, u, v, capacity, cost):
+        # edge e and its residual e ^ 1
+        for tail, head, edge_capacity, edge_cost in ((u, v, capacity, cost),
+                                                     (v, u, 0, -cost)):
+            self.node_2_edges[tail].append(len(self.heads))
+            self.heads.append(head)
+            self.capacities.append(edge_capacity)
+            self.costs.append(edge_cost)
+        return len(self.heads) - 2
+
+    def get_flow(self, e):
+        return self.capacities[e ^ 1]
+
+    def get_potentials(self, source):
+        potentials = [float("inf")] * self.number_of_nodes
+        potentials[source] = 0
+        for _ in range(self.number_of_nodes):
+            changed = False
+            for u in range(self.number_of_nodes):
+                if potentials[u] == float("inf"):
+                    continue
+                for e in self.node_2_edges[u]:
+                    v = self.heads[e]
+                    if self.capacities[e] > 0 \
+                            and potentials[u] + self.costs[e] < potentials[v]:
+                        potentials[v] = potentials[u] + self.costs[e]
+                        changed = True
+            if not changed:
+                break
+        return potentials
+
+    def run(self, source, sink):
+        # the residual graph reaches no new nodes, so the nodes without a
+        # potential stay out of the search
+        potentials = self.get_potentials(source)
+        flow = cost = 0
+        while True:
+            distances = [float("inf")] * self.number_of_nodes
+            distances[source] = 0
+            node_2_edge = [-1] * self.number_of_nodes
+            heap = [(0, source)]
+            while heap:
+                distance, u = heapq.heappop(heap)
+                if distance > distances[u]:
+                    continue
+                for e in self.node_2_edges[u]:
+                    v = self.heads[e]
+                    if self.capacities[e] <= 0 \
+                            or potentials[v] == float("inf"):
+                        continue
+                    reduced = distance + self.costs[e] + potentials[u] \
+                        - potentials[v]
+                    if reduced < distances[v]:
+                        distances[v] = reduced
+                        node_2_edge[v] = e
+                        heapq.heappush(heap, (reduced, v))
+            if distances[sink] == float("inf"):
+                break
+            for u, distance in enumerate(distances):
+                if distance < float("inf"):
+                    potentials[u] += distance
+
+            push = float("inf")
+            v = sink
+            while v != source:
+                e = node_2_edge[v]
+                push = min(push, self.capacities[e])
+                v = self.heads[e ^ 1]
+            v = sink
+            while v != source:
+                e = node_2_edge[v]
+                self.capacities[e] -= push
+                self.capacities[e ^ 1] += push
+                v = self.heads[e ^ 1]
+            flow += push
+            cost += push * (potentials[sink] - potentials[source])
+            self.number_of_augmentations += 1
+        return flow, cost
+
+
+class SimilarityAssignment(Instrumented):
+    # the similarity of a division to the previous one is the number of
+    # returning students who stay with their previous group. Groups are
+    # interchangeable, so the previous groups with the most returning
+    # students continue as the new groups, keeping their labels where they
+    # fit, and only the counts matter: students of a continuing group either
+    # stay or join the pool of new students and of dropped groups, which is
+    # spread freely. This is a min-cost flow over classes of groups instead
+    # of the students; together and apart pairs need a MILP, where only the
+    # students in a pair get their own variables
+    def __init__(self,
+                 previous_group_2_students,
+                 students,
+                 number_of_groups,
+                 min_size,
+                 max_size,
+                 together=(),
+                 apart=(),
+                 ):
+        self.previous_group_2_students = previous_group_2_students
+        self.students = list(students)
+        self.number_of_groups = number_of_groups
+        self.min_size = min_size
+        self.max_size = max_size
+        self.together = list(together)
+        self.apart = list(apart)
+
+        enrolled = set(self.students)
+        self.previous_2_returning = {
+            p: [s for s in students if s in enrolled]
+            for p, students in previous_group_2_students.items()}
+        continuing = sorted(self.previous_2_returning,
+                            key=lambda p: len(self.previous_2_returning[p]),
+                            reverse=True)[:self.number_of_groups]
+        self.group_2_previous = {p: p for p in continuing
+                                 if p in range(self.number_of_groups)}
+        free_groups = (g for g in range(self.number_of_groups)
+                       if g not in self.group_2_previous)
+        for p in continuing:
+            if p not in range(self.number_of_groups):
+                self.group_2_previous[next(free_groups)] = p
+        self.student_2_group = {s: g for g, p in self.group_2_previous.items()
+                                for s in self.previous_2_returning[p]}
+
+        self.group_2_students = {g: [] for g in range(self.number_of_groups)}
+        self.similarity = None
+        self.optimal = False
+        self.model = None
+
+    def get_similarity(self, group_2_students):
+        return sum(self.student_2_group.get(s) == g
+                   for g, students in group_2_students.items()
+                   for s in students)
+
+    def get_buckets(self, paired):
+        # returning students of each continuing group, and the pool, without
+        # the paired students
+        group_2_bucket = {g: [s for s in self.previous_2_returning[p]
+                              if s not in paired]
+                          for g, p in self.group_2_previous.items()}
+        pool = [s for s in self.students
+                if s not in self.student_2_group and s not in paired]
+        return group_2_bucket, pool
+
+    def check_sizes(self):
+        if not self.number_of_groups * self.min_size <= len(self.students) \
+                <= self.number_of_groups * self.max_size:
+            raise ValueError(f"{len(self.students)} students do not fit "
+                             f"{self.number_of_groups} groups of "
+                             f"{self.min_size} to {self.max_size}")
+
+    def create_network(self):
+        # groups with the same number of returning students are
+        # interchangeable, so one bucket node and one group node stand for
+        # all of them; a seat below min_size is worth more than all the
+        # returning students together
+        source, pool, sink = 0, 1, 2
+        group_2_bucket, pool_students = self.get_buckets(set())
+        self.size_2_groups = {}
+        for g in range(self.number_of_groups):
+            self.size_2_groups.setdefault(len(group_2_bucket.get(g, [])),
+                                          []).append(g)
+        self.network = MinCostFlow(3 + 2 * len(self.size_2_groups))
+        self.size_2_edges = {}
+        self.network.add_edge(source, pool, len(pool_students), 0)
+        for i, (size, groups) in enumerate(self.size_2_groups.items()):
+            bucket, group = 3 + 2 * i, 4 + 2 * i
+            m = len(groups)
+            self.network.add_edge(source, bucket, m * size, 0)
+            stay = self.network.add_edge(bucket, group, m * size, -1)
+            self.network.add_edge(bucket, pool, m * size, 0)
+            spread = self.network.add_edge(pool, group, m * self.max_size, 0)
+            self.network.add_edge(group, sink, m * self.min_size,
+                                  -len(self.students) - 1)
+            self.network.add_edge(group, sink,
+                                  m * (self.max_size - self.min_size), 0)
+            self.size_2_edges[size] = (stay, spread)
+        return source, sink
+
+    def extract_flow(self):
+        # the stays and the group sizes of a class are split as evenly as
+        # possible, larger shares first, so no group gets more stays than
+        # students
+        group_2_bucket, pool = self.get_buckets(set())
+        group_2_size = {}
+        moved = []
+        for size, groups in self.size_2_groups.items():
+            stay, spread = self.size_2_edges[size]
+            number_of_stays = self.network.get_flow(stay)
+            number_of_students = number_of_stays + self.network.get_flow(spread)
+            for i, g in enumerate(groups):
+                stays = number_of_stays // len(groups) \
+                    + (i < number_of_stays % len(groups))
+                group_2_size[g] = number_of_students // len(groups) \
+                    + (i < number_of_students % len(groups))
+                if g in group_2_bucket:
+                    self.group_2_students[g] += group_2_bucket[g][:stays]
+                    moved += group_2_bucket[g][stays:]
+        pool = moved + pool
+        start = 0
+        for g, size in group_2_size.items():
+            number_of_students = size - len(self.group_2_students[g])
+            self.group_2_students[g] += pool[start:start + number_of_students]
+            start += number_of_students
+
+    @measured
+    def run_flow(self):
+        source, sink = self.run_phase(self.create_network)
+        with self.phase("solve"):
+            self.network.run(source, sink)
+        self.count("augmentations", self.network.number_of_augmentations)
+        self.run_phase(self.extract_flow)
+        self.similarity = self.get_similarity(self.group_2_students)
+        self.optimal = True
+        return self.group_2_students
+
+    def create_vars(self):
+        paired = {s for pair in self.together + self.apart for s in pair}
+        self.group_2_bucket, self.pool = self.get_buckets(paired)
+        self.buckets = list(self.group_2_bucket) + [None]
+        self.paired_students = [s for s in self.students if s in paired]
+
+        x_indices = [(k, s) for k in range(self.number_of_groups)
+                     for s in self.paired_students]
+        self.x_vars = pulp.LpVariable.dicts(name="x",
+                                            indices=x_indices,
+                                            cat=pulp.LpBinary)
+
+        n_indices = [(k, b) for k in range(self.number_of_groups)
+                     for b in self.buckets]
+        self.n_vars = pulp.LpVariable.dicts(name="n",
+                                            indices=n_indices,
+                                            lowBound=0,
+                                            upBound=self.max_size,
+                                            cat=pulp.LpInteger)
+
+    def get_bucket(self, b):
+        return self.pool if b is None else self.group_2_bucket[b]
+
+    def create_of(self):
+        self.model += pulp.lpSum(self.n_vars[g, g] for g in
+                                 self.group_2_bucket) \
+                      + pulp.lpSum(self.x_vars[self.student_2_group[s], s]
+                                   for s in self.paired_students
+                                   if s in self.student_2_group)
+
+    def create_assignment_con(self):
+        for s in self.paired_students:
+            self.model += pulp.lpSum(self.x_vars[k, s] for k in
+                                     range(self.number_of_groups)) == 1
+        for b in self.buckets:
+            self.model += pulp.lpSum(self.n_vars[k, b] for k in
+                                     range(self.number_of_groups)) \
+                          == len(self.get_bucket(b))
+
+    def create_size_con(self):
+        for k in range(self.number_of_groups):
+            size = pulp.lpSum(self.n_vars[k, b] for b in self.buckets) \
+                   + pulp.lpSum(self.x_vars[k, s] for s in
+                                self.paired_students)
+            self.model += size >= self.min_size
+            self.model += size <= self.max_size
+
+    def create_together_con(self):
+        for k in range(self.number_of_groups):
+            for u, v in self.together:
+                self.model += self.x_vars[k, u] == self.x_vars[k, v]
+
+    def create_apart_con(self):
+        for k in range(self.number_of_groups):
+            for u, v in self.apart:
+                self.model += self.x_vars[k, u] + self.x_vars[k, v] <= 1
+
+    def create_model(self):
+        self.model = pulp.LpProblem("Similarity", pulp.LpMaximize)
+        self.run_phase(self.create_vars)
+        self.run_phase(self.create_of)
+        self.run_phase(self.create_assignment_con)
+        self.run_phase(self.create_size_con)
+        self.run_phase(self.create_together_con)
+        self.run_phase(self.create_apart_con)
+
+    def extract_solution(self):
+        for (k, s), var in self.x_vars.items():
+            if var.varValue > 0.5:
+                self.group_2_students[k].append(s)
+        # a continuing group's own students are the ones to stay
+        for b in self.buckets:
+            students = self.get_bucket(b)
+            groups = sorted(range(self.number_of_groups),
+                            key=lambda k: k != b)
+            start = 0
+            for k in groups:
+                count = round(self.n_vars[k, b].varValue)
+                self.group_2_students[k] += students[start:start + count]
+                start += count
+
+    @measured
+    def run_milp(self, solver=pulp.COIN, timelimit=1800):
+        self.create_model()
+        self.solve(self.model.solve,
+                   self.get_solver(solver, msg=True, timeLimit=timelimit))
+        self.run_phase(self.extract_solution)
+        self.similarity = self.get_similarity(self.group_2_students)
+        self.optimal = self.model.sol_status == pulp.LpSolutionOptimal
+        return self.group_2_students
+
+    def set_model_metrics(self):
+        super().set_model_metrics()
+        if self.model is None:
+            self.metrics.status = pulp.LpStatus[pulp.LpStatusOptimal]
+            self.metrics.sol_status = pulp.LpSolution[pulp.LpSolutionOptimal]
+            self.metrics.objective_value = self.similarity
+            self.metrics.best_bound = self.similarity
+
+    @measured
+    def run(self, solver=pulp.COIN, timelimit=1800):
+        self.check_sizes()
+        if self.together or self.apart:
+            return self.run_milp(solver, timelimit)
+        return self.run_flow()
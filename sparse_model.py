@@ -0,0 +1,363 @@
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+import pulp
+
+
+class SparseModel:
+    def __init__(self, sense=pulp.LpMinimize):
+        self.sense = sense
+
+        self.number_of_vars = 0
+        self.number_of_cons = 0
+        self.vars = {}
+        self.var_blocks = []
+
+        self.rows, self.cols, self.vals = [], [], []
+        self.senses, self.rhs = [], []
+        self.objective_cols, self.objective_vals = [], []
+        self.start_cols, self.start_vals = [], []
+
+        self.status = pulp.LpStatusNotSolved
+        self.sol_status = pulp.LpSolutionNoSolutionFound
+        self.values = None
+        self.objective_value = None
+
+    def add_vars(self, name, shape, low=0, up=np.inf, integer=False):
+        size = int(np.prod(shape))
+        cols = np.arange(self.number_of_vars,
+                         self.number_of_vars + size).reshape(shape)
+        self.var_blocks.append((self.number_of_vars,
+                                self.number_of_vars + size,
+                                np.full(size, low, dtype=float),
+                                np.full(size, up, dtype=float),
+                                integer))
+        self.number_of_vars += size
+        self.vars[name] = cols
+        return cols
+
+    def add_cons(self, rows, cols, vals, sense, rhs):
+        # rows are numbered from 0 within the family, sense is "L", "G" or "E"
+        rhs = np.atleast_1d(np.asarray(rhs, dtype=float))
+        cols = np.asarray(cols)
+        self.rows.append(np.asarray(rows).ravel() + self.number_of_cons)
+        self.cols.append(cols.ravel())
+        self.vals.append(np.broadcast_to(np.asarray(vals, dtype=float),
+                                         cols.shape).ravel())
+        self.senses.append(np.broadcast_to(np.asarray(sense), rhs.shape))
+        self.rhs.append(rhs)
+        self.number_of_cons += len(rhs)
+        return np.arange(self.number_of_cons - len(rhs), self.number_of_cons)
+
+    def set_objective(self, cols, vals):
+        cols = np.asarray(cols)
+        self.objective_cols.append(cols.ravel())
+        self.objective_vals.append(np.broadcast_to(np.asarray(vals,
+                                                              dtype=float),
+                                                   cols.shape).ravel())
+
+    def set_start(self, cols, vals):
+        cols = np.asarray(cols)
+        self.start_cols.append(cols.ravel())
+        self.start_vals.append(np.broadcast_to(np.asarray(vals, dtype=float),
+                                               cols.shape).ravel())
+
+    def set_bounds(self, cols, low=None, up=None):
+        cols = np.asarray(cols).ravel()
+        for first, last, lows, ups, _ in self.var_blocks:
+            block_cols = cols[(cols >= first) & (cols < last)] - first
+            if low is not None:
+                lows[block_cols] = low
+            if up is not None:
+                ups[block_cols] = up
+
+    def get_number_of_nonzeros(self):
+        return sum(len(cols) for cols in self.cols)
+
+    def get_matrix(self):
+        # COO triplets with the objective as row -1, duplicates summed
+        rows = np.concatenate(self.rows + [np.full(len(cols), -1) for cols
+                                           in self.objective_cols]
+                              + [np.full(self.number_of_vars, -1)])
+        cols = np.concatenate(self.cols + self.objective_cols
+                              + [np.arange(self.number_of_vars)])
+        vals = np.concatenate(self.vals + self.objective_vals
+                              + [np.zeros(self.number_of_vars)])
+
+        order = np.lexsort((rows, cols))
+        rows, cols, vals = rows[order], cols[order], vals[order]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        starts = np.flatnonzero(first)
+        vals = np.add.reduceat(vals, starts)
+        rows, cols = rows[starts], cols[starts]
+
+        # columns without any entry keep a zero objective entry so that
+        # they are still declared
+        empty = np.ones(len(rows), dtype=bool)
+        empty[np.unique(cols[vals != 0])] = False
+        keep = (vals != 0) | ((rows == -1) & empty[cols])
+        return rows[keep], cols[keep], vals[keep]
+
+    def write_mps(self, path):
+        rows, cols, vals = self.get_matrix()
+        senses = np.concatenate(self.senses) if self.senses \
+            else np.empty(0, dtype=str)
+        rhs = np.concatenate(self.rhs) if self.rhs else np.empty(0)
+
+        lines = ["NAME          MODEL", "ROWS", " N  OBJ"]
+        lines += [f" {sense}  R{i}" for i, sense in enumerate(senses.tolist())]
+
+        lines.append("COLUMNS")
+        bounds = []
+        col_starts = np.searchsorted(cols, np.arange(self.number_of_vars + 1))
+        for first, last, lows, ups, integer in self.var_blocks:
+            if integer:
+                lines.append("    MARK      'MARKER'"
+                             "                 'INTORG'")
+            entries = slice(col_starts[first], col_starts[last])
+            lines += [f"    {f'C{c}':<8}  {'OBJ' if r < 0 else f'R{r}':<8}  "
+                      f"{v: .12e}"
+                      for r, c, v in zip(rows[entries].tolist(),
+                                         cols[entries].tolist(),
+                                         vals[entries].tolist())]
+            if integer:
+                lines.append("    MARK      'MARKER'"
+                             "                 'INTEND'")
+            bounds += self.get_bound_lines(first, lows, ups, integer)
+
+        lines.append("RHS")
+        lines += [f"    RHS       {f'R{i}':<8}  {v: .12e}" for i, v in
+                  enumerate(rhs.tolist()) if v != 0]
+        lines.append("BOUNDS")
+        lines += bounds
+        lines.append("ENDATA")
+
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    @staticmethod
+    def get_bound_lines(first, lows, ups, integer):
+        lines = []
+        for c, (low, up) in enumerate(zip(lows.tolist(), ups.tolist()),
+                                      start=first):
+            name = f"C{c}"
+            if integer and low == 0 and up == 1:
+                lines.append(f" BV BND       {name:<8}")
+            elif low == up:
+                lines.append(f" FX BND       {name:<8}  {low: .12e}")
+            else:
+                if low == -np.inf:
+                    lines.append(f" MI BND       {name:<8}")
+                elif low != 0:
+                    lines.append(f" LO BND       {name:<8}  {low: .12e}")
+                if up != np.inf:
+                    lines.append(f" UP BND       {name:<8}  {up: .12e}")
+                elif integer:
+                    lines.append(f" PL BND       {name:<8}")
+        return lines
+
+    def write_start(self, path):
+        values = np.zeros(self.number_of_vars)
+        for cols, vals in zip(self.start_cols, self.start_vals):
+            values[cols] = vals
+        with open(path, "w") as f:
+            f.write("Stopped on time - objective value 0\n")
+            f.writelines(f"{c:>7} C{c} {v:>15.12g} {0:>23}\n"
+                         for c, v in enumerate(values.tolist()))
+
+    def read_solution(self, path, solver):
+        self.status, self.sol_status = solver.get_status(path)
+        self.values = np.zeros(self.number_of_vars)
+        with open(path) as f:
+            f.readline()
+            for line in f:
+                if len(line) <= 2:
+                    break
+                line = line.split()
+                if line[0] == "**":
+                    line = line[1:]
+                if line[1][0] == "C":
+                    self.values[int(line[1][1:])] = float(line[2])
+        self.objective_value = sum(
+            float(vals @ self.values[cols]) for cols, vals in
+            zip(self.objective_cols, self.objective_vals))
+
+    def solve(self, solver):
+        if not isinstance(solver, pulp.COIN_CMD):
+            raise ValueError("the sparse backend needs a CBC command solver, "
+                             f"not {type(solver).__name__}")
+
+        with tempfile.TemporaryDirectory() as directory:
+            mps_path = os.path.join(directory, "model.mps")
+            start_path = os.path.join(directory, "model.mst")
+            solution_path = os.path.join(directory, "model.sol")
+            self.write_mps(mps_path)
+
+            args = [solver.path, mps_path]
+            if self.sense == pulp.LpMaximize:
+                args.append("-max")
+            if solver.timeLimit is not None:
+                args += ["-sec", str(solver.timeLimit),
+                         "-timeMode", "elapsed"]
+            if self.start_cols:
+                self.write_start(start_path)
+                args += ["-mips", start_path]
+            args += ["-branch", "-printingOptions", "all",
+                     "-solution", solution_path]
+
+            log_path = solver.optionsDict.get("logPath")
+            with open(log_path if log_path else os.devnull, "w") as log:
+                pipe = log if log_path or not solver.msg else None
+                if subprocess.run(args, stdout=pipe, stderr=pipe,
+                                  stdin=subprocess.DEVNULL).returncode != 0 \
+                        or not os.path.exists(solution_path):
+                    raise pulp.PulpSolverError("Error while executing "
+                                               + solver.path)
+            self.read_solution(solution_path, solver)
+
+        return self.status
+
+    def get_values(self, name):
+        return self.values[self.vars[name]]
+
+
+class SparseBackend:
+    def get_sparse_students(self):
+        return list(self.student_2_score)
+
+    def get_sparse_sizes(self):
+        return np.arange(self.min_size, self.max_size + 1)
+
+    def create_sparse_x_vars(self, sense):
+        self.sparse_model = SparseModel(sense)
+        self.sparse_students = self.get_sparse_students()
+        self.sparse_x = self.sparse_model.add_vars(
+            "x", (self.number_of_groups, len(self.sparse_students)),
+            up=1, integer=True)
+
+    def create_sparse_z_vars(self):
+        self.sparse_z = self.sparse_model.add_vars(
+            "z", (self.number_of_groups, len(self.get_sparse_sizes())),
+            up=1, integer=True)
+
+    def create_sparse_assignment_con(self):
+        k, n = self.sparse_x.shape
+        self.sparse_model.add_cons(np.tile(np.arange(n), k), self.sparse_x,
+                                   1, "E", np.ones(n))
+
+    def create_sparse_size_con(self):
+        # sum of x over the group equals sum of size * z
+        sizes = self.get_sparse_sizes()
+        k, n = self.sparse_x.shape
+        self.sparse_model.add_cons(
+            np.concatenate((np.repeat(np.arange(k), n),
+                            np.repeat(np.arange(k), len(sizes)))),
+            np.concatenate((self.sparse_x.ravel(), self.sparse_z.ravel())),
+            np.concatenate((np.ones(k * n), -np.tile(sizes, k))),
+            "E", np.zeros(k))
+
+    def create_sparse_one_size_con(self):
+        k, number_of_sizes = self.sparse_z.shape
+        self.sparse_model.add_cons(np.repeat(np.arange(k), number_of_sizes),
+                                   self.sparse_z, 1, "E", np.ones(k))
+
+    def get_sparse_group_size(self):
+        return self.sparse_x, np.ones(self.sparse_x.shape)
+
+    def get_sparse_positions(self):
+        student_2_position = {s: i for i, s in
+                              enumerate(self.sparse_students)}
+        return np.array([student_2_position[s] for s in
+                         self.get_ordered_students()])
+
+    def create_sparse_order_con(self, cols, vals):
+        # the expression of group k - 1 is not below the one of group k
+        k, m = cols.shape
+        rows = np.repeat(np.arange(k - 1), m)
+        self.sparse_model.add_cons(
+            np.concatenate((rows, rows)),
+            np.concatenate((cols[:-1].ravel(), cols[1:].ravel())),
+            np.concatenate((vals[:-1].ravel(), -vals[1:].ravel())),
+            "G", np.zeros(k - 1))
+
+    def create_sparse_fix_con(self):
+        self.sparse_model.set_bounds(
+            self.sparse_x[0, self.get_sparse_positions()[0]], low=1)
+
+    def create_sparse_orbitope_con(self):
+        x = self.sparse_x[:, self.get_sparse_positions()]
+        k, n = x.shape
+        self.sparse_model.set_bounds(x[np.tril_indices(k, -1, n)], up=0)
+
+        later, earlier = np.tril_indices(n, -1)
+        rows, cols, vals, number_of_rows = [], [], [], 0
+        for g in range(1, k):
+            group_later = later[later >= g]
+            group_earlier = earlier[later >= g]
+            positions = np.arange(g, n)
+            rows += [positions - g + number_of_rows,
+                     group_later - g + number_of_rows]
+            cols += [x[g, positions], x[g - 1, group_earlier]]
+            vals += [np.ones(len(positions)), -np.ones(len(group_later))]
+            number_of_rows += len(positions)
+        if number_of_rows:
+            self.sparse_model.add_cons(np.concatenate(rows),
+                                       np.concatenate(cols),
+                                       np.concatenate(vals),
+                                       "L", np.zeros(number_of_rows))
+
+    def create_sparse_symmetry_con(self, symmetry_breaking):
+        if symmetry_breaking not in self.symmetry_breakings:
+            raise ValueError(f"{type(self).__name__} does not support "
+                             f"{symmetry_breaking!r} symmetry breaking")
+        if symmetry_breaking == "size":
+            self.create_sparse_order_con(*self.get_sparse_group_size())
+        elif symmetry_breaking == "total":
+            scores = np.array([self.student_2_score[s] for s in
+                               self.sparse_students], dtype=float)
+            self.create_sparse_order_con(
+                self.sparse_x, np.broadcast_to(scores, self.sparse_x.shape))
+        elif symmetry_breaking == "fix":
+            self.create_sparse_fix_con()
+        else:
+            self.create_sparse_orbitope_con()
+
+    def get_sparse_labels(self, group_2_students):
+        student_2_group = {s: k for k, students in group_2_students.items()
+                           for s in students}
+        return np.array([student_2_group[s] for s in self.sparse_students])
+
+    def set_sparse_initial_values(self, group_2_students):
+        labels = self.get_sparse_labels(group_2_students)
+        x = labels[None, :] == np.arange(self.number_of_groups)[:, None]
+        self.sparse_model.set_start(self.sparse_x, x)
+        if "z" in self.sparse_model.vars:
+            self.sparse_model.set_start(
+                self.sparse_z,
+                x.sum(axis=1)[:, None] == self.get_sparse_sizes()[None, :])
+        return x
+
+    def extract_sparse_solution(self):
+        x = np.round(self.sparse_model.get_values("x")).astype(bool)
+        for k, i in zip(*np.nonzero(x)):
+            self.group_2_students[int(k)].append(self.sparse_students[i])
+
+    def run_sparse(self, solver, timelimit, symmetry_breaking,
+                   initial_partition):
+        self.run_phase(self.create_sparse_model)
+        if symmetry_breaking is not None:
+            self.run_phase(self.create_sparse_symmetry_con, symmetry_breaking)
+        if initial_partition is not None:
+            self.run_phase(self.set_sparse_initial_values,
+                           self.order_groups(initial_partition,
+                                             symmetry_breaking))
+
+        self.solve(self.sparse_model.solve,
+                   self.get_solver(solver, msg=True, timeLimit=timelimit))
+
+        self.run_phase(self.extract_sparse_solution)
+
+        return self.group_2_students
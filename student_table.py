@@ -0,0 +1,119 @@
+import numpy as np
+
+
+def get_column(values):
+    # ids such as tuples, None or mixed types, which numpy would turn into a
+    # 2-d array or fail to sort, are kept as objects
+    values = list(values)
+    try:
+        column = np.asarray(values)
+    except ValueError:
+        column = None
+    if column is None or column.ndim != 1 or column.dtype == object:
+        column = np.fromiter(values, dtype=object, count=len(values))
+    return column
+
+
+class StudentTable:
+    # an instance as columns: student ids with their scores and cohorts,
+    # cohorts coded 0, ..., number_of_cohorts - 1 in order of appearance,
+    # so that any hashable label works; a partition is an int32 array of
+    # group labels in the order of ids, -1 for students without a group
+    def __init__(self, ids, scores=None, cohorts=None):
+        self.ids = get_column(ids)
+        self.scores = None if scores is None \
+            else np.asarray(scores, dtype=float)
+        self.cohorts = None
+        self.cohort_labels = None
+        if cohorts is not None:
+            label_2_cohort = {}
+            self.cohorts = np.fromiter(
+                (label_2_cohort.setdefault(label, len(label_2_cohort))
+                 for label in cohorts), dtype=np.int32, count=len(self.ids))
+            self.cohort_labels = list(label_2_cohort)
+            # students cohort by cohort, cohort c in
+            # cohort_order[cohort_starts[c]:cohort_starts[c + 1]]
+            self.cohort_order = np.argsort(self.cohorts, kind="stable")
+            self.cohort_starts = np.concatenate(
+                ([0], np.cumsum(self.get_cohort_sizes())))
+        # sorted ids for the reverse lookup, or a dict for object ids,
+        # built on first use
+        self.id_order = None
+        self.id_2_index = None
+
+    @classmethod
+    def from_scores(cls, student_2_score):
+        return cls(list(student_2_score),
+                   scores=np.fromiter(student_2_score.values(), dtype=float,
+                                      count=len(student_2_score)))
+
+    @classmethod
+    def from_groups(cls, student_2_group):
+        return cls(list(student_2_group),
+                   cohorts=list(student_2_group.values()))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_student_2_score(self):
+        return dict(zip(self.ids.tolist(), self.scores.tolist()))
+
+    def get_student_2_group(self):
+        return dict(zip(self.ids.tolist(),
+                        [self.cohort_labels[c]
+                         for c in self.cohorts.tolist()]))
+
+    def get_indices(self, students):
+        if self.ids.dtype == object:
+            if self.id_2_index is None:
+                self.id_2_index = {s: j for j, s in
+                                   enumerate(self.ids.tolist())}
+            return np.fromiter((self.id_2_index[s] for s in students),
+                               dtype=np.int64, count=len(students))
+        if self.id_order is None:
+            self.id_order = np.argsort(self.ids, kind="stable")
+        students = np.asarray(students, dtype=self.ids.dtype)
+        positions = np.searchsorted(self.ids, students, sorter=self.id_order)
+        indices = self.id_order[np.minimum(positions, len(self.ids) - 1)]
+        missing = self.ids[indices] != students
+        if np.any(missing):
+            raise KeyError(students[missing][0].item())
+        return indices
+
+    def get_scores(self, students):
+        return self.scores[self.get_indices(students)]
+
+    def get_cohort_sizes(self):
+        return np.bincount(self.cohorts, minlength=len(self.cohort_labels))
+
+    def get_cohort_students(self, c):
+        return self.ids[self.cohort_order[self.cohort_starts[c]:
+                                          self.cohort_starts[c + 1]]]
+
+    def get_labels(self, group_2_students):
+        labels = np.full(len(self.ids), -1, dtype=np.int32)
+        for g, students in group_2_students.items():
+            if len(students):
+                labels[self.get_indices(students)] = g
+        return labels
+
+    def get_group_2_students(self, labels, number_of_groups):
+        order = np.argsort(labels, kind="stable")
+        starts = np.searchsorted(labels[order],
+                                 np.arange(number_of_groups + 1))
+        return {g: self.ids[order[starts[g]:starts[g + 1]]].tolist()
+                for g in range(number_of_groups)}
+
+
+def read_scores(data):
+    # solvers take a StudentTable or a dict of scores and work on the dict; a
+    # dict is used as is, without building a table next to it
+    if isinstance(data, StudentTable):
+        return data, data.get_student_2_score()
+    return None, data
+
+
+def read_cohorts(data):
+    if isinstance(data, StudentTable):
+        return data, data.get_student_2_group()
+    return None, data
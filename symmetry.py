@@ -0,0 +1,84 @@
+import pulp
+
+
+class SymmetryBreaking:
+    symmetry_breakings = ("size", "total", "fix", "orbitope")
+
+    def get_ordered_students(self):
+        return sorted(self.student_2_score,
+                      key=lambda s: self.student_2_score[s],
+                      reverse=True)
+
+    def get_group_size(self, k):
+        return pulp.lpSum(self.x_vars[k, s] for s in
+                          self.get_ordered_students())
+
+    def get_group_total(self, k):
+        return pulp.lpSum(r * self.x_vars[k, s] for s, r in
+                          self.student_2_score.items())
+
+    def create_size_order_con(self):
+        for k in range(1, self.number_of_groups):
+            self.model += self.get_group_size(k - 1) \
+                          >= self.get_group_size(k)
+
+    def create_total_order_con(self):
+        for k in range(1, self.number_of_groups):
+            self.model += self.get_group_total(k - 1) \
+                          >= self.get_group_total(k)
+
+    def create_fix_con(self):
+        self.model += self.x_vars[0, self.get_ordered_students()[0]] == 1
+
+    def create_orbitope_con(self):
+        # groups are labelled by the first of their students in the order,
+        # so group k may take the i-th student only if group k - 1 took an
+        # earlier one
+        students = self.get_ordered_students()
+        for k in range(self.number_of_groups):
+            for i, s in enumerate(students):
+                if k > i:
+                    self.model += self.x_vars[k, s] == 0
+                elif k > 0:
+                    self.model += self.x_vars[k, s] \
+                                  <= pulp.lpSum(self.x_vars[k - 1, c]
+                                                for c in students[:i])
+
+    def order_groups(self, group_2_students, symmetry_breaking):
+        # relabels a partition so that it satisfies the chosen constraints
+        groups = list(group_2_students.values())
+        if symmetry_breaking == "size":
+            groups.sort(key=len, reverse=True)
+        elif symmetry_breaking == "total":
+            groups.sort(key=lambda students: sum(self.student_2_score[s]
+                                                 for s in students),
+                        reverse=True)
+        elif symmetry_breaking in ("fix", "orbitope"):
+            student_2_position = {s: i for i, s in
+                                  enumerate(self.get_ordered_students())}
+            # empty groups go last
+            groups.sort(key=lambda students: min(
+                (student_2_position[s] for s in students),
+                default=len(student_2_position)))
+        return dict(enumerate(groups))
+
+    def set_initial_values(self, group_2_students):
+        for var in self.model.variables():
+            var.setInitialValue(0)
+        for k, students in group_2_students.items():
+            for s in students:
+                self.x_vars[k, s].setInitialValue(1)
+
+    def create_symmetry_con(self, symmetry_breaking):
+        if symmetry_breaking not in self.symmetry_breakings:
+            raise ValueError(f"{type(self).__name__} does not support "
+                             f"{symmetry_breaking!r} symmetry breaking")
+        {"size": self.create_size_order_con,
+         "total": self.create_total_order_con,
+         "fix": self.create_fix_con,
+         "orbitope": self.create_orbitope_con}[symmetry_breaking]()
+
+    def extract_solution(self):
+        for (k, s), var in self.x_vars.items():
+            if round(var.varValue) == 1:
+                self.group_2_students[k].append(s)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from evaluation import PartitionEvaluator
+from portfolio import criterion_2_evaluator
+from student_table import StudentTable
+
+
+def get_instance(seed):
+    # a random instance with a random partition of it into non-empty groups
+    rng = np.random.default_rng(seed)
+    number_of_groups = int(rng.integers(2, 6))
+    number_of_students = int(rng.integers(number_of_groups, 30))
+    ids = rng.permutation(1_000)[:number_of_students]
+    scores = np.round(rng.normal(1500, 500, number_of_students)).clip(1)
+    cohorts = rng.integers(0, 6, number_of_students)
+    labels = rng.permutation(np.concatenate((
+        np.arange(number_of_groups),
+        rng.integers(0, number_of_groups,
+                     number_of_students - number_of_groups))))
+    return StudentTable(ids, scores, cohorts), number_of_groups, labels
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_metrics_match_per_group_formulas(seed):
+    table, number_of_groups, labels = get_instance(seed)
+    evaluator = PartitionEvaluator(table, number_of_groups, 1,
+                                   len(table))
+    metrics = evaluator.evaluate(labels)
+    for g in range(number_of_groups):
+        scores = table.scores[labels == g]
+        cohorts = table.cohorts[labels == g]
+        size = len(scores)
+        pairs = sum(int(c) * (int(c) - 1) // 2
+                    for c in np.bincount(cohorts))
+        assert metrics["sizes"][0, g] == size
+        assert metrics["totals"][0, g] == pytest.approx(scores.sum())
+        assert metrics["means"][0, g] == pytest.approx(scores.mean())
+        assert metrics["gini_indices"][0, g] == pytest.approx(
+            np.abs(scores[:, None] - scores).sum()
+            / (2 * size * scores.sum()))
+        assert metrics["densities"][0, g] == pytest.approx(
+            2 * pairs / (size * (size - 1)) if size > 1 else 1)
+
+
+@pytest.mark.parametrize("seed", range(200))
+@pytest.mark.parametrize("criterion", list(criterion_2_evaluator))
+def test_objective_values_match_local_search_evaluators(seed, criterion):
+    table, number_of_groups, labels = get_instance(seed)
+    evaluator = PartitionEvaluator(table, number_of_groups, 1,
+                                   len(table))
+    student_2_data = table.get_student_2_group() \
+        if criterion == "density" else table.get_student_2_score()
+    reference = criterion_2_evaluator[criterion](
+        student_2_data, number_of_groups, 1, len(table))
+    reference.set_partition(table.get_group_2_students(labels,
+                                                       number_of_groups))
+    assert evaluator.get_objective_values(labels[None, :], criterion)[0] \
+        == pytest.approx(reference.get_objective_value())
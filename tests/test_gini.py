@@ -0,0 +1,34 @@
+import itertools
+
+import numpy as np
+import pulp
+import pytest
+
+from gini import ParametricGiniMinimization
+
+
+def get_min_max_gini_index(student_2_score, number_of_groups, min_size,
+                           max_size):
+    scores = np.array(list(student_2_score.values()), dtype=float)
+    best = np.inf
+    for labels in itertools.product(range(number_of_groups),
+                                    repeat=len(scores)):
+        labels = np.array(labels)
+        groups = [scores[labels == g] for g in range(number_of_groups)]
+        if all(min_size <= len(group) <= max_size for group in groups):
+            best = min(best, max(np.abs(group[:, None] - group).sum()
+                                 / (2 * len(group) * group.sum())
+                                 for group in groups))
+    return best
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_parametric_gini_minimization_is_optimal(seed):
+    rng = np.random.default_rng(seed)
+    student_2_score = dict(zip(range(7), np.round(
+        rng.normal(1500, 500, 7)).clip(1).tolist()))
+    model = ParametricGiniMinimization(student_2_score, 2, 3, 4)
+    group_2_students = model.run(solver=pulp.PULP_CBC_CMD, timelimit=60)
+    assert model.optimal
+    assert model.get_max_gini_index(group_2_students) == pytest.approx(
+        get_min_max_gini_index(student_2_score, 2, 3, 4), rel=1e-5)
@@ -0,0 +1,45 @@
+import numpy as np
+import pulp
+import pytest
+
+from lns import LargeNeighbourhoodSearch, criterion_2_lns
+from portfolio import criterion_2_evaluator
+
+
+def get_instance(criterion, seed=0):
+    # 20 students in 4 groups of 4 to 6, where every greedy start is
+    # suboptimal
+    rng = np.random.default_rng(seed)
+    student_2_score = dict(zip(range(20), np.round(
+        rng.normal(1500, 500, 20)).clip(1).tolist()))
+    student_2_group = dict(zip(range(20), rng.integers(0, 3, 20).tolist()))
+    return (student_2_group if criterion == "density" else student_2_score,
+            4, 4, 6)
+
+
+@pytest.mark.parametrize("criterion", list(criterion_2_lns))
+def test_lns_improves_the_greedy_start(criterion):
+    instance = get_instance(criterion)
+    cls, kwargs, _ = criterion_2_lns[criterion]
+    evaluator = criterion_2_evaluator[criterion](*instance)
+    evaluator.set_partition(cls(*instance).run(**kwargs))
+    greedy_of = evaluator.get_objective_value()
+
+    lns = LargeNeighbourhoodSearch(*instance, criterion)
+    group_2_students = lns.run(solver=pulp.PULP_CBC_CMD, timelimit=10,
+                               sub_timelimit=2, max_iterations=2,
+                               number_of_workers=1)
+    assert lns.errors == []
+    assert sorted(s for students in group_2_students.values()
+                  for s in students) == list(range(20))
+    assert all(4 <= len(students) <= 6
+               for students in group_2_students.values())
+
+    evaluator = criterion_2_evaluator[criterion](*instance)
+    evaluator.set_partition(group_2_students)
+    assert lns.objective_value == pytest.approx(
+        evaluator.get_objective_value())
+    if criterion == "gini":
+        assert lns.objective_value < greedy_of
+    else:
+        assert lns.objective_value > greedy_of
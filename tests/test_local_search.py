@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from local_search import LocalSearchNPPTotal, LocalSearchNPPMean, \
+    LocalSearchGini, LocalSearchQCPP
+
+
+@pytest.mark.parametrize("cls", [LocalSearchNPPTotal, LocalSearchNPPMean,
+                                 LocalSearchGini])
+def test_partition_with_empty_group(cls):
+    student_2_score = {0: 5.0, 1: 3.0, 2: 1.0}
+    local_search = cls(student_2_score, 3, 0, 3)
+    group_2_students = local_search.run({0: [0, 1, 2], 1: [], 2: []})
+    assert sorted(s for students in group_2_students.values()
+                  for s in students) == [0, 1, 2]
+
+
+def test_qcpp_partition_with_empty_group():
+    local_search = LocalSearchQCPP({0: 0, 1: 1, 2: 0}, 2, 0, 3)
+    local_search.run({0: [0, 1, 2], 1: []})
+    assert local_search.get_objective_value() == 1
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_partitions_terminate(seed):
+    rng = np.random.default_rng(seed)
+    number_of_students = int(rng.integers(1, 12))
+    number_of_groups = int(rng.integers(1, 5))
+    student_2_score = dict(enumerate(rng.integers(1, 50, number_of_students)
+                                     .astype(float).tolist()))
+    labels = rng.integers(0, number_of_groups, number_of_students)
+    group_2_students = {g: [s for s in range(number_of_students)
+                            if labels[s] == g]
+                        for g in range(number_of_groups)}
+    for cls in (LocalSearchNPPTotal, LocalSearchNPPMean, LocalSearchGini):
+        local_search = cls(student_2_score, number_of_groups, 0,
+                           number_of_students)
+        local_search.run(group_2_students, max_iterations=1000)
+        assert local_search.number_of_moves \
+            + local_search.number_of_swaps < 1000
@@ -0,0 +1,37 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from number_partition_problem import GreedyNPPMean, BranchAndBoundNPPTotal
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_batched_mean_matches_loop_on_fractional_scores(seed):
+    rng = np.random.default_rng(seed)
+    student_2_score = dict(zip(range(20),
+                               np.round(rng.uniform(0, 1, 20), 1).tolist()))
+    loop = GreedyNPPMean(student_2_score, 3, 5, 8).run()
+    batched = GreedyNPPMean(student_2_score, 3, 5, 8).run(batched=True)
+    assert batched == loop
+
+
+def get_max_min_total(scores, number_of_groups, min_size, max_size):
+    best = -np.inf
+    for labels in itertools.product(range(number_of_groups),
+                                    repeat=len(scores)):
+        sizes = np.bincount(labels, minlength=number_of_groups)
+        if sizes.min() >= min_size and sizes.max() <= max_size:
+            best = max(best, np.bincount(labels, weights=scores,
+                                         minlength=number_of_groups).min())
+    return best
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_branch_and_bound_with_negative_scores(seed):
+    rng = np.random.default_rng(seed)
+    scores = np.round(rng.normal(50, 150, 8))
+    bb = BranchAndBoundNPPTotal(dict(enumerate(scores.tolist())), 3, 2, 3)
+    bb.run(timelimit=20)
+    assert bb.optimal
+    assert bb.objective_value == get_max_min_total(scores, 3, 2, 3)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from online import GroupHeap, OnlineNPPTotal, OnlineNPPMean, OnlineQCPP
+
+
+@pytest.mark.parametrize("cls, high", [(OnlineNPPTotal, 100),
+                                       (OnlineNPPMean, 100),
+                                       (OnlineQCPP, 4)])
+def test_stream_from_empty_enrolment(cls, high):
+    rng = np.random.default_rng(0)
+    assigner = cls({}, 4, 2, 5, rebalance_every=2, rebalance_steps=3)
+    for s in range(18):
+        assigner.add(s, int(rng.integers(0, high)))
+    sizes = [len(students) for students in
+             assigner.group_2_students.values()]
+    assert sum(sizes) == 18
+    assert all(2 <= size <= 5 for size in sizes)
+
+
+@pytest.mark.parametrize("cls, high", [(OnlineNPPTotal, 100),
+                                       (OnlineNPPMean, 100),
+                                       (OnlineQCPP, 4)])
+def test_constructor_students_are_seated(cls, high):
+    rng = np.random.default_rng(0)
+    student_2_data = {s: int(rng.integers(0, high)) for s in range(10)}
+    assigner = cls(student_2_data, 3, 2, 5,
+                   initial_partition={0: [0, 1], 2: [2]})
+    assert assigner.group_2_students[0][:2] == [0, 1]
+    assert assigner.group_2_students[2][0] == 2
+    for s in range(10, 15):
+        assigner.add(s, int(rng.integers(0, high)))
+    sizes = [len(students) for students in
+             assigner.group_2_students.values()]
+    assert sorted(s for students in assigner.group_2_students.values()
+                  for s in students) == list(range(15))
+    assert all(2 <= size <= 5 for size in sizes)
+
+
+@pytest.mark.parametrize("cls, high", [(OnlineNPPTotal, 100),
+                                       (OnlineNPPMean, 100),
+                                       (OnlineQCPP, 4)])
+def test_heaps_stay_small(cls, high):
+    rng = np.random.default_rng(0)
+    assigner = cls({}, 4, 1, 1_000)
+    for s in range(2_000):
+        assigner.add(s, int(rng.integers(0, high)))
+    if cls is OnlineNPPTotal:
+        heaps = [assigner.deficit_heap, assigner.open_heap]
+    elif cls is OnlineNPPMean:
+        heaps = [*assigner.deficit_heaps, *assigner.open_heaps]
+    else:
+        heaps = [*assigner.size_heaps, *(
+            heap for pair in assigner.cohort_2_heaps.values()
+            for heap in pair)]
+    assert all(len(heap.heap) <= 2 * GroupHeap.min_capacity
+               for heap in heaps)
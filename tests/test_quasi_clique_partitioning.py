@@ -0,0 +1,66 @@
+import itertools
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from quasi_clique_partitioning import BranchAndBoundQCPP
+
+
+def get_max_min_density(cohorts, number_of_groups, min_size, max_size):
+    best = None
+    for labels in itertools.product(range(number_of_groups),
+                                    repeat=len(cohorts)):
+        if labels[0] != 0:
+            continue
+        labels = np.array(labels)
+        sizes = np.bincount(labels, minlength=number_of_groups)
+        if sizes.min() < min_size or sizes.max() > max_size:
+            continue
+        densities = []
+        for g in range(number_of_groups):
+            size = int(sizes[g])
+            counts = np.bincount(cohorts[labels == g])
+            pairs = int((counts * (counts - 1) // 2).sum())
+            densities.append(Fraction(pairs, size * (size - 1) // 2)
+                             if size > 1 else Fraction(1))
+        if best is None or min(densities) > best:
+            best = min(densities)
+    return best
+
+
+def get_instance(seed):
+    rng = np.random.default_rng(seed)
+    number_of_students = int(rng.integers(4, 10))
+    number_of_groups = int(rng.integers(2, 4))
+    cohorts = rng.integers(0, int(rng.integers(1, 5)), number_of_students)
+    size = number_of_students // number_of_groups
+    min_size = max(1, size - int(rng.integers(0, 2)))
+    max_size = -(-number_of_students // number_of_groups) \
+        + int(rng.integers(0, 2))
+    return cohorts, number_of_groups, min_size, max_size
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_branch_and_bound_matches_brute_force(seed):
+    cohorts, number_of_groups, min_size, max_size = get_instance(seed)
+    best = get_max_min_density(cohorts, number_of_groups, min_size,
+                               max_size)
+    bb = BranchAndBoundQCPP(dict(enumerate(cohorts.tolist())),
+                            number_of_groups, min_size, max_size)
+    group_2_students = bb.run(timelimit=20)
+    assert bb.optimal
+    assert bb.get_min_density(group_2_students) == best
+    assert bb.best_bound == pytest.approx(float(best))
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_branch_and_bound_bound_when_stopped(seed):
+    cohorts, number_of_groups, min_size, max_size = get_instance(seed)
+    best = get_max_min_density(cohorts, number_of_groups, min_size,
+                               max_size)
+    bb = BranchAndBoundQCPP(dict(enumerate(cohorts.tolist())),
+                            number_of_groups, min_size, max_size)
+    group_2_students = bb.run(timelimit=20, node_limit=1)
+    assert bb.get_min_density(group_2_students) <= best
+    assert bb.best_bound >= float(best)
@@ -0,0 +1,29 @@
+import pytest
+
+from evaluation import get_evaluator
+from quasi_clique_partitioning import GreedyQCPP
+from student_table import StudentTable
+
+
+student_2_groups = [
+    {0: (1, 2), 1: (1, 3), 2: (1, 2), 3: (0, 0)},
+    {0: None, 1: "a", 2: None, 3: 1},
+    {(0, "x"): 2, (1, "y"): 1, (2, "x"): 2, (3, "y"): 0},
+]
+
+
+@pytest.mark.parametrize("student_2_group", student_2_groups)
+def test_greedy_qcpp_with_any_hashable_labels(student_2_group):
+    from_dict = GreedyQCPP(student_2_group, 2, 2, 2).run()
+    table = StudentTable.from_groups(student_2_group)
+    assert table.get_student_2_group() == student_2_group
+    assert GreedyQCPP(table, 2, 2, 2).run() == from_dict
+
+
+@pytest.mark.parametrize("student_2_group", student_2_groups)
+def test_densities_with_any_hashable_labels(student_2_group):
+    students = list(student_2_group)
+    evaluator = get_evaluator(student_2_group, 2, 2, 2, "density")
+    metrics = evaluator.evaluate({0: [students[0], students[2]],
+                                  1: [students[1], students[3]]})
+    assert metrics["densities"].tolist() == [[1, 0]]
@@ -0,0 +1,20 @@
+import pulp
+import pytest
+
+from number_partition_problem import NPPIPTotal
+
+
+@pytest.mark.parametrize("symmetry_breaking", ["size", "total", "fix",
+                                               "orbitope"])
+@pytest.mark.parametrize("backend", ["pulp", "sparse"])
+def test_warm_start_with_empty_group(symmetry_breaking, backend):
+    student_2_score = {0: 5, 1: 3, 2: 4}
+    model = NPPIPTotal(student_2_score, 3, 0, 3)
+    group_2_students = model.run(
+        solver=pulp.PULP_CBC_CMD, timelimit=10,
+        symmetry_breaking=symmetry_breaking,
+        initial_partition={0: [0, 1, 2], 1: [], 2: []}, backend=backend)
+    assert sorted(s for students in group_2_students.values()
+                  for s in students) == [0, 1, 2]
+    assert min(sum(student_2_score[s] for s in students)
+               for students in group_2_students.values()) == 3